@@ -1,5 +1,5 @@
 
-import os, joblib, numpy as np
+import os, numpy as np
 from itertools import product
 from collections import Counter
 def _kmer_freqs(seq, k):
@@ -31,61 +31,85 @@ def _scalar_feats(seq):
     entropy = sum(freqs)
     return np.array([L, gc, n_frac, countA/L if L>0 else 0.0, countC/L if L>0 else 0.0, entropy], dtype=np.float32)
 
-def predict_sequences(seqs):
-    # Get the directory where this script is located
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    
-    # load artifacts
-    meta_path = os.path.join(script_dir, 'stack_meta_clf.pkl')
-    le_path = os.path.join(script_dir, 'stack_label_encoder.pkl')
-    lgb_path = os.path.join(script_dir, 'lgb_models_list.pkl')
-    xgb_path = os.path.join(script_dir, 'xgb_models_list.pkl')
+REQUIRED_FILES = ['stack_meta_clf.pkl', 'stack_label_encoder.pkl', 'lgb_models_list.pkl', 'xgb_models_list.pkl']
+ARTIFACT_FILES = {'meta': 'stack_meta_clf.pkl', 'le': 'stack_label_encoder.pkl',
+                  'lgb_models': 'lgb_models_list.pkl', 'xgb_models': 'xgb_models_list.pkl'}
+
+def load_artifacts(model_dir=None, measure=False):
+    # Defaults to the directory where this script is located
+    model_dir = model_dir or os.path.dirname(os.path.abspath(__file__))
     
+    meta_path = os.path.join(model_dir, 'stack_meta_clf.pkl')
     if not os.path.exists(meta_path):
         raise RuntimeError(f"stack_meta_clf.pkl not found at {meta_path}")
     
-    meta = joblib.load(meta_path)
-    le = joblib.load(le_path)
-    lgb_models = joblib.load(lgb_path)
-    xgb_models = joblib.load(xgb_path)
-    import xgboost as xgb
+    import joblib
+    if measure:
+        # measure=True comes from ml-models/scripts/memory_accounting.py, so it is importable here
+        from memory_accounting import rss_bytes
+        # import the libraries unpickling needs first so their code is not counted against an artifact
+        for mod in ('sklearn.linear_model', 'sklearn.preprocessing', 'lightgbm', 'xgboost'):
+            try: __import__(mod)
+            except ImportError: pass
+    artifacts = {'model_dir': model_dir}
+    load_rss = {}
+    for key, name in ARTIFACT_FILES.items():
+        before = rss_bytes() if measure else 0
+        artifacts[key] = joblib.load(os.path.join(model_dir, name))
+        if measure: load_rss[key] = rss_bytes() - before
     # embeddings: transformer inference not included in this helper (user should create embeddings or have X_full)
     # Here we will attempt to use encoder_embeddings.npy if it matches the number of seqs, otherwise zero-embeds
-    emb_path = os.path.join(script_dir, 'encoder_embeddings.npy')
+    emb_path = os.path.join(model_dir, 'encoder_embeddings.npy')
+    artifacts['emb'] = np.load(emb_path, mmap_mode='r') if os.path.exists(emb_path) else None
+    if measure: artifacts['load_rss_bytes'] = load_rss
+    return artifacts
+
+def featurize(seqs, emb=None):
     Nq = len(seqs)
-    if os.path.exists(emb_path):
-        emb = np.load(emb_path)
-        if emb.shape[0] == Nq:
-            emb_use = emb
-        else:
-            emb_use = np.zeros((Nq, 256), dtype=np.float32)
+    if emb is not None and emb.shape[0] == Nq:
+        emb_use = np.asarray(emb)
     else:
         emb_use = np.zeros((Nq, 256), dtype=np.float32)
     k3 = np.vstack([_kmer_freqs(s,3) for s in seqs]).astype(np.float32)
     k4 = np.vstack([_kmer_freqs(s,4) for s in seqs]).astype(np.float32)
     scal = np.vstack([_scalar_feats(s) for s in seqs]).astype(np.float32)
-    Xq = np.hstack([emb_use, k3, k4, scal])
+    return np.hstack([emb_use, k3, k4, scal])
+
+def predict_proba(artifacts, seqs):
+    import xgboost as xgb
+    meta = artifacts['meta']
+    lgb_models = artifacts['lgb_models']; xgb_models = artifacts['xgb_models']
+    Xq = featurize(seqs, artifacts['emb'])
     # get base preds avg
-    p_l = []
+    # deduplicated fold models share one object: score each object once
+    p_l = []; seen = {}
     for m in lgb_models:
-        try:
-            p = m.predict(Xq, num_iteration=getattr(m,'best_iteration',None) or None)
-        except Exception:
-            p = m.predict(Xq)
-        p_l.append(p)
+        if id(m) not in seen:
+            try:
+                seen[id(m)] = m.predict(Xq, num_iteration=getattr(m,'best_iteration',None) or None)
+            except Exception:
+                seen[id(m)] = m.predict(Xq)
+        p_l.append(seen[id(m)])
     p_lgb = np.mean(p_l, axis=0)
+    dq = xgb.DMatrix(Xq)
+    seen = {}
     p_x = []
     for m in xgb_models:
-        try:
-            p = m.predict(xgb.DMatrix(Xq))
-        except Exception:
-            p = m.predict(xgb.DMatrix(Xq))
-        p_x.append(p)
+        if id(m) not in seen:
+            seen[id(m)] = m.predict(dq)
+        p_x.append(seen[id(m)])
     p_xgb = np.mean(p_x, axis=0)
     meta_in = np.hstack([p_lgb, p_xgb])
-    probs = meta.predict_proba(meta_in)
+    return meta.predict_proba(meta_in)
+
+def predict_with_artifacts(artifacts, seqs):
+    le = artifacts['le']
+    probs = predict_proba(artifacts, seqs)
     preds = probs.argmax(axis=1)
     out = []
     for i,pred in enumerate(preds):
         out.append({'pred_label': le.classes_[pred], 'prob_vector': probs[i].tolist()})
     return out
+
+def predict_sequences(seqs, model_dir=None):
+    return predict_with_artifacts(load_artifacts(model_dir), seqs)
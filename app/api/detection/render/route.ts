@@ -0,0 +1,25 @@
+import { NextRequest, NextResponse } from "next/server"
+import { isRenderId, readRenderJob, startRenderJob } from "@/lib/render-jobs"
+
+// Full-quality render of a video that was answered with a preview (see lib/render-jobs.ts).
+// POST { id } starts it (or reports on it if it is already running or done); GET ?id= only reports.
+
+export async function POST(req: NextRequest) {
+  try {
+    const { id } = await req.json()
+    if (!isRenderId(id)) return NextResponse.json({ error: "Invalid render id" }, { status: 400 })
+    const job = await startRenderJob(process.cwd(), id)
+    if (!job) return NextResponse.json({ error: "Render job not found" }, { status: 404 })
+    return NextResponse.json(job)
+  } catch (e: any) {
+    return NextResponse.json({ error: e?.message || "Unexpected error" }, { status: 500 })
+  }
+}
+
+export async function GET(req: NextRequest) {
+  const id = req.nextUrl.searchParams.get("id")
+  if (!isRenderId(id)) return NextResponse.json({ error: "Invalid render id" }, { status: 400 })
+  const job = await readRenderJob(process.cwd(), id)
+  if (!job) return NextResponse.json({ error: "Render job not found" }, { status: 404 })
+  return NextResponse.json(job)
+}
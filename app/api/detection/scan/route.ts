@@ -0,0 +1,11 @@
+import { NextRequest } from "next/server"
+import { handleDetection } from "@/lib/detection-route"
+
+// Threat scan: divers, mines and submarines in one pass over the upload
+export async function POST(req: NextRequest) {
+  return handleDetection(req, {
+    weights: { divers: "divers", mines: "mines", submarines: "sub" },
+    label: "scan",
+    summarize: (_detection, detectors, missing) => ({ detectors, missingDetectors: missing }),
+  })
+}
@@ -14,19 +14,35 @@ export default function DetectionPage() {
   const [resultUrl, setResultUrl] = useState<string | null>(null)
   const [error, setError] = useState<string | null>(null)
   const [originalUrl, setOriginalUrl] = useState<string | null>(null)
+  // Videos come back as a sheet of a few annotated frames first; the full render is on request
+  const [previewUrl, setPreviewUrl] = useState<string | null>(null)
+  const [renderId, setRenderId] = useState<string | null>(null)
+  const [rendering, setRendering] = useState(false)
   const fileInputRef = useRef<HTMLInputElement | null>(null)
+  // Bumped on every reset so a poll for an abandoned render stops
+  const renderRun = useRef(0)
+
+  function resetResult() {
+    renderRun.current += 1
+    setResultUrl(null)
+    setPreviewUrl(null)
+    setRenderId(null)
+    setRendering(false)
+    setError(null)
+  }
 
   const endpoint = `/api/detection/${model}`
 
   async function onSubmit(e: React.FormEvent) {
     e.preventDefault()
-    setError(null)
-    setResultUrl(null)
+    resetResult()
     if (!selectedFile) return
     setProcessing(true)
     try {
+      const isVideo = selectedFile.type.startsWith("video/")
       const form = new FormData()
       form.append("file", selectedFile)
+      if (isVideo) form.append("preview", "1")
       const res = await fetch(endpoint, { method: "POST", body: form })
       const txt = await res.text()
       if (!res.ok) throw new Error(txt || "Failed to run detection")
@@ -37,7 +53,12 @@ export default function DetectionPage() {
         throw new Error("Invalid response from server")
       }
       if (!data?.outputUrl) throw new Error("No output returned")
-      setResultUrl(`${data.outputUrl}?v=${Date.now()}`)
+      if (isVideo && data.renderId) {
+        setPreviewUrl(`${data.outputUrl}?v=${Date.now()}`)
+        setRenderId(data.renderId)
+      } else {
+        setResultUrl(`${data.outputUrl}?v=${Date.now()}`)
+      }
     } catch (err: any) {
       setError(err?.message || "Unexpected error")
     } finally {
@@ -45,6 +66,34 @@ export default function DetectionPage() {
     }
   }
 
+  async function renderFull() {
+    if (!renderId) return
+    const run = renderRun.current
+    setRendering(true)
+    setError(null)
+    try {
+      // The same call starts the render and reports on it
+      while (run === renderRun.current) {
+        const res = await fetch("/api/detection/render", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify({ id: renderId }),
+        })
+        const job = await res.json()
+        if (!res.ok || job.status === "error") throw new Error(job.error || "Render failed")
+        if (job.status === "done") {
+          if (run === renderRun.current) setResultUrl(`${job.outputUrl}?v=${Date.now()}`)
+          break
+        }
+        await new Promise((resolve) => setTimeout(resolve, 2000))
+      }
+    } catch (err: any) {
+      if (run === renderRun.current) setError(err?.message || "Render failed")
+    } finally {
+      if (run === renderRun.current) setRendering(false)
+    }
+  }
+
   return (
     <div className="min-h-screen pt-24 px-6">
       <div className="max-w-4xl mx-auto bg-slate-900/70 backdrop-blur-sm border border-slate-700 rounded-xl p-6">
@@ -69,7 +118,7 @@ export default function DetectionPage() {
           {(["divers","mines","submarines"] as ModelKey[]).map((key) => (
             <button
               key={key}
-              onClick={() => { setModel(key); setResultUrl(null); setError(null) }}
+              onClick={() => { setModel(key); resetResult() }}
               className={`px-3 py-1.5 rounded border text-sm ${model===key?"bg-cyan-600 border-cyan-500 text-white":"bg-white/5 border-white/10 text-cyan-100 hover:bg-white/10"}`}
             >
               {key.charAt(0).toUpperCase()+key.slice(1)}
@@ -100,8 +149,7 @@ export default function DetectionPage() {
                 onChange={(e) => {
                   const f = e.target.files?.[0] ?? null
                   setSelectedFile(f)
-                  setResultUrl(null)
-                  setError(null)
+                  resetResult()
                   if (originalUrl) URL.revokeObjectURL(originalUrl)
                   setOriginalUrl(f ? URL.createObjectURL(f) : null)
                 }}
@@ -124,6 +172,21 @@ export default function DetectionPage() {
 
         {error && <div className="mt-4 text-red-400">{error}</div>}
 
+        {previewUrl && !resultUrl && (
+          <div className="mt-6">
+            <h2 className="text-lg font-semibold text-cyan-200 mb-3">Preview</h2>
+            <div className="text-slate-400 text-sm mb-2">Detections on evenly spaced frames of the video</div>
+            <img src={previewUrl} alt="Preview detections" className="rounded border border-slate-700 w-full" />
+            <button
+              onClick={renderFull}
+              disabled={rendering}
+              className="mt-3 px-5 py-3 rounded bg-cyan-600 hover:bg-cyan-500 disabled:opacity-50 text-white font-medium"
+            >
+              {rendering ? "Rendering full video..." : "Render full video"}
+            </button>
+          </div>
+        )}
+
         {resultUrl && selectedFile && selectedFile.type.startsWith("video/") && (
           <div className="mt-6">
             <h2 className="text-lg font-semibold text-cyan-200 mb-3">Result</h2>
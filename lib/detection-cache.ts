@@ -0,0 +1,114 @@
+import path from "path"
+import fs from "fs/promises"
+import { createHash } from "crypto"
+import { createReadStream } from "fs"
+
+// Detection results keyed by the upload bytes, the weights and the inference parameters.
+// Each entry is a folder under temp/detection-cache holding result.json and the annotated
+// output; the folder's mtime is its last use, and the least recently used entries are
+// removed once the cache grows past DETECTION_CACHE_MAX_MB (default 1024, 0 disables it).
+
+// Bump when the detector's output changes so old entries are not served
+const CACHE_VERSION = 1
+const DEFAULT_MAX_MB = 1024
+
+const weightsHashes = new Map<string, { size: number; mtimeMs: number; hash: string }>()
+
+function cacheDir(repoRoot: string) {
+  return path.join(repoRoot, "temp", "detection-cache")
+}
+
+function maxBytes(): number {
+  const fromEnv = process.env.DETECTION_CACHE_MAX_MB
+  const mb = fromEnv && fromEnv.trim().length > 0 ? Number(fromEnv) : DEFAULT_MAX_MB
+  return (Number.isFinite(mb) ? mb : DEFAULT_MAX_MB) * 1024 * 1024
+}
+
+async function hashFile(filePath: string): Promise<string> {
+  // Weights are tens of MB: hash once per process, again only when the file changes
+  const stat = await fs.stat(filePath)
+  const known = weightsHashes.get(filePath)
+  if (known && known.size === stat.size && known.mtimeMs === stat.mtimeMs) return known.hash
+  const hash = await new Promise<string>((resolve, reject) => {
+    const h = createHash("sha256")
+    createReadStream(filePath).on("data", (d) => h.update(d)).on("end", () => resolve(h.digest("hex"))).on("error", reject)
+  })
+  weightsHashes.set(filePath, { size: stat.size, mtimeMs: stat.mtimeMs, hash })
+  return hash
+}
+
+export async function detectionCacheKey(media: Buffer, weights: string[], params: Record<string, unknown>): Promise<string | null> {
+  if (maxBytes() <= 0) return null
+  const h = createHash("sha256")
+  h.update(`v${CACHE_VERSION}\0`)
+  h.update(createHash("sha256").update(media).digest("hex"))
+  for (const w of weights) {
+    // "name=path" for the multi-detector
+    const eq = w.indexOf("=")
+    const name = eq > 0 ? w.slice(0, eq + 1) : ""
+    h.update(`\0${name}${await hashFile(eq > 0 ? w.slice(eq + 1) : w)}`)
+  }
+  h.update(`\0${JSON.stringify(params)}`)
+  return h.digest("hex")
+}
+
+// On a hit, copies the cached output into public/ under `${prefix}_<time>` and returns the route response
+export async function readCachedDetection(repoRoot: string, key: string | null, prefix: string): Promise<any | null> {
+  if (!key) return null
+  const entryDir = path.join(cacheDir(repoRoot), key)
+  try {
+    const entry = JSON.parse(await fs.readFile(path.join(entryDir, "result.json"), "utf8"))
+    const publicName = `${prefix}_${Date.now()}${entry.outputExt}`
+    const publicDir = path.join(repoRoot, "public")
+    await fs.mkdir(publicDir, { recursive: true })
+    await fs.copyFile(path.join(entryDir, `output${entry.outputExt}`), path.join(publicDir, publicName))
+    const now = new Date()
+    await fs.utimes(entryDir, now, now)
+    return { ...entry.response, outputUrl: `/${publicName}`, cached: true }
+  } catch {
+    return null
+  }
+}
+
+export async function storeCachedDetection(repoRoot: string, key: string | null, outputPath: string, response: any) {
+  if (!key) return
+  const root = cacheDir(repoRoot)
+  const entryDir = path.join(root, key)
+  const tmpDir = `${entryDir}.${process.pid}.${Date.now()}.tmp`
+  try {
+    await fs.mkdir(tmpDir, { recursive: true })
+    const outputExt = path.extname(outputPath)
+    await fs.copyFile(outputPath, path.join(tmpDir, `output${outputExt}`))
+    await fs.writeFile(path.join(tmpDir, "result.json"), JSON.stringify({ outputExt, response }))
+    // Readers only ever see complete entries
+    await fs.rm(entryDir, { recursive: true, force: true })
+    await fs.rename(tmpDir, entryDir)
+    await evict(root)
+  } catch {
+    // A failed cache write must not fail the request
+    await fs.rm(tmpDir, { recursive: true, force: true }).catch(() => {})
+  }
+}
+
+async function evict(root: string) {
+  const limit = maxBytes()
+  const entries: { dir: string; size: number; used: number }[] = []
+  let total = 0
+  for (const name of await fs.readdir(root)) {
+    if (name.endsWith(".tmp")) continue
+    const dir = path.join(root, name)
+    try {
+      const stat = await fs.stat(dir)
+      let size = 0
+      for (const file of await fs.readdir(dir)) size += (await fs.stat(path.join(dir, file))).size
+      entries.push({ dir, size, used: stat.mtimeMs })
+      total += size
+    } catch {}
+  }
+  entries.sort((a, b) => a.used - b.used)
+  for (const entry of entries) {
+    if (total <= limit) break
+    await fs.rm(entry.dir, { recursive: true, force: true })
+    total -= entry.size
+  }
+}
@@ -0,0 +1,55 @@
+// Client for scripts/detection_server.py, which keeps the detectors loaded between requests.
+// Returns the same JSON scripts/yolo_detect.py prints (images also carry the annotated JPEG as
+// image_base64), or null when no server is running or it cannot serve the request (it answers 503
+// while busy with a full video), so callers fall back to spawning the CLI. A full video the server
+// does not finish in time throws instead: the server keeps rendering it, and running it again in
+// the CLI would double the work. DETECTION_SERVER_URL=off disables it.
+
+const DEFAULT_URL = "http://127.0.0.1:8765"
+// A wedged server must not hang the route: past this the CLI takes over (DETECTION_SERVER_TIMEOUT_MS overrides)
+const IMAGE_TIMEOUT_MS = 30_000
+// Full videos run the detector on every frame; past this the render fails
+const VIDEO_TIMEOUT_MS = 15 * 60_000
+
+function isFullVideo(mediaType: string, options: string[]): boolean {
+  return mediaType === "video" && !options.includes("--preview")
+}
+
+function timeoutMs(mediaType: string, options: string[]): number {
+  const fromEnv = Number(process.env.DETECTION_SERVER_TIMEOUT_MS)
+  if (fromEnv > 0) return fromEnv
+  return isFullVideo(mediaType, options) ? VIDEO_TIMEOUT_MS : IMAGE_TIMEOUT_MS
+}
+
+export async function detectWithServer(
+  media: Buffer,
+  detectors: string[],
+  weights: string[],
+  mediaType: string,
+  options: string[],
+): Promise<any | null> {
+  const base = process.env.DETECTION_SERVER_URL?.trim() || DEFAULT_URL
+  if (base === "off") return null
+  const params = new URLSearchParams({ detectors: detectors.join(","), media: mediaType })
+  // The server refuses (409) when it has other weights loaded than the route resolved
+  for (const w of weights) params.append("weights", w)
+  if (options.includes("--track")) params.set("track", "1")
+  if (options.includes("--preview")) params.set("preview", "1")
+  const timeout = timeoutMs(mediaType, options)
+  try {
+    const res = await fetch(`${base.replace(/\/$/, "")}/detect?${params}`, {
+      method: "POST",
+      body: media,
+      headers: { "Content-Type": "application/octet-stream" },
+      signal: AbortSignal.timeout(timeout),
+    })
+    const json = await res.json()
+    return res.ok && json.success ? json : null
+  } catch (e: any) {
+    if (e?.name === "TimeoutError" && isFullVideo(mediaType, options)) {
+      throw new Error(`Detection server did not finish the video within ${Math.ceil(timeout / 1000)} s`)
+    }
+    // Not running, refused the connection or timed out (AbortSignal): the caller falls back to the CLI
+    return null
+  }
+}
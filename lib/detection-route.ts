@@ -0,0 +1,158 @@
+import { NextRequest, NextResponse } from "next/server"
+import path from "path"
+import fs from "fs/promises"
+import { runPythonCommand } from "@/lib/python-runner"
+import { moveFile, transcodeToMp4 } from "@/lib/video-transcode"
+import { detectionCacheKey, readCachedDetection, storeCachedDetection } from "@/lib/detection-cache"
+import { detectWithServer } from "@/lib/detection-client"
+import { createRenderJob } from "@/lib/render-jobs"
+
+// The detection routes (app/api/detection/{divers,mines,submarines,scan}) differ only in
+// which detectors they run and what they add to the summary; the upload handling lives here.
+
+export interface DetectionRoute {
+  // Detector name -> folder under "Detection model", e.g. { submarines: "sub" }; several are merged
+  weights: Record<string, string>
+  // File name prefix and cache namespace
+  label: string
+  // Extra summary fields, given the detectors that ran and those without weights
+  summarize?: (detection: any, detectors: string[], missing: string[]) => Record<string, unknown>
+}
+
+// best.pt, else the first .pt in the folder
+export async function resolveWeights(weightsDir: string): Promise<string | null> {
+  const best = path.join(weightsDir, "best.pt")
+  try {
+    await fs.stat(best)
+    return best
+  } catch {
+    try {
+      const files = await fs.readdir(weightsDir)
+      const pt = files.find(f => f.toLowerCase().endsWith('.pt'))
+      return pt ? path.join(weightsDir, pt) : null
+    } catch {
+      return null
+    }
+  }
+}
+
+export async function handleDetection(req: NextRequest, { weights, label, summarize }: DetectionRoute) {
+  try {
+    const form = await req.formData()
+    const file = form.get("file") as File | null
+    if (!file) return NextResponse.json({ error: "No file uploaded" }, { status: 400 })
+
+    const repoRoot = process.cwd()
+    const detectors: string[] = []
+    const weightsPaths: string[] = []
+    const missing: string[] = []
+    for (const [name, dir] of Object.entries(weights)) {
+      const weightsPath = await resolveWeights(path.join(repoRoot, "Detection model", dir))
+      if (weightsPath) {
+        detectors.push(name)
+        weightsPaths.push(weightsPath)
+      } else {
+        missing.push(name)
+      }
+    }
+    if (detectors.length === 0) {
+      const dirs = Object.values(weights)
+      const error = dirs.length === 1
+        ? `No .pt weights found in ${path.join(repoRoot, "Detection model", dirs[0])}`
+        : "No .pt weights found for any detector"
+      return NextResponse.json({ error }, { status: 404 })
+    }
+    // scripts/yolo_detect.py takes a bare path for one detector and name=path pairs (prefixed class
+    // names) for a multi-detector route, even when only one of its detectors has weights
+    const merged = Object.keys(weights).length > 1
+    const cliWeights = merged ? detectors.map((name, i) => `${name}=${weightsPaths[i]}`) : weightsPaths
+
+    const tmpDir = path.join(repoRoot, "temp")
+    await fs.mkdir(tmpDir, { recursive: true })
+    const arrayBuffer = await file.arrayBuffer()
+    const buffer = Buffer.from(arrayBuffer)
+    const media = (file as any).type && (file as any).type.startsWith("video/") ? "video" : "image"
+    // Track objects in videos so counts are per object, not per frame
+    const fullOptions = media === "video" ? ["--track"] : []
+    // preview=1: answer a video with a few annotated frames now and leave the full render for later
+    const preview = media === "video" && form.get("preview") === "1"
+    const options = preview ? ["--preview"] : fullOptions
+    // The same upload with the same weights and options as an earlier request: reuse its result
+    const cacheKey = await detectionCacheKey(buffer, cliWeights, { media, options })
+    // The full render waits until the page asks for it: POST /api/detection/render { id: renderId }.
+    // Render jobs expire, so ids are not cached; every preview response, cached or not, gets a new job
+    const renderJob = async () => preview ? await createRenderJob(repoRoot, buffer, {
+      prefix: label, detectors, weights: weightsPaths, cliWeights, options: fullOptions,
+      cacheKey: await detectionCacheKey(buffer, cliWeights, { media, options: fullOptions }),
+    }) : undefined
+    const cached = await readCachedDetection(repoRoot, cacheKey, label)
+    if (cached) return NextResponse.json({ ...cached, renderId: await renderJob() })
+    // A running scripts/detection_server.py has the models loaded already: no temp files, no Python start-up
+    let detection: any = await detectWithServer(buffer, detectors, weightsPaths, media, options)
+    let outputPath: string = detection?.path || ""
+    if (!detection) {
+      const inputName = `${label}_${Date.now()}` + (file.type.startsWith("video/") ? ".mp4" : ".jpg")
+      const inputPath = path.join(tmpDir, inputName)
+      await fs.writeFile(inputPath, buffer)
+
+      const outDir = path.join(tmpDir, `yolo_${label}`)
+      await fs.mkdir(outDir, { recursive: true })
+
+      const scriptPath = path.join(repoRoot, "scripts", "yolo_detect.py")
+      const args = [scriptPath, "--weights", ...cliWeights, "--input", inputPath, "--outdir", outDir, "--media", media, ...options]
+      const { stdout, stderr, code } = await runPythonCommand(args, repoRoot)
+      if (code !== 0) {
+        return NextResponse.json({ error: stderr || stdout || "Detection failed" }, { status: 500 })
+      }
+
+      outputPath = stdout.trim().split(/\r?\n/).pop() || ""
+      try {
+        detection = JSON.parse(outputPath)
+        outputPath = detection.path
+      } catch {}
+    }
+    // Structured results from scripts/yolo_detect.py (full per-frame detections stay in detections_path);
+    // merged detectors prefix class names with the detector, e.g. "mines:mine"
+    const summary = detection ? {
+      media: detection.media,
+      count: detection.count ?? detection.total_detections,
+      detections: detection.detections,
+      classCounts: detection.class_counts,
+      frames: detection.frames,
+      uniqueCounts: detection.unique_counts,
+      framesSampled: detection.frames_sampled,
+      ...summarize?.(detection, detectors, missing),
+    } : undefined
+
+    const absoluteOutputPath = path.isAbsolute(outputPath) ? outputPath : path.join(repoRoot, outputPath)
+    const isVideo = media === "video" && !preview
+    let publicName = `${label}_${Date.now()}` + (isVideo ? ".mp4" : path.extname(absoluteOutputPath) || ".jpg")
+    const publicDir = path.join(repoRoot, "public")
+    await fs.mkdir(publicDir, { recursive: true })
+    const publicPath = path.join(publicDir, publicName)
+    if (isVideo && detection?.browser_ready) {
+      await moveFile(absoluteOutputPath, publicPath)
+    } else if (isVideo) {
+      const result = await transcodeToMp4(absoluteOutputPath, publicPath)
+      if (!result.transcoded) {
+        // Fall back to serving original file if transcode unavailable
+        const origExt = path.extname(absoluteOutputPath)
+        publicName = `${label}_${Date.now()}${origExt || ".avi"}`
+        const fallbackPath = path.join(publicDir, publicName)
+        const bytes = await fs.readFile(absoluteOutputPath)
+        await fs.writeFile(fallbackPath, bytes)
+        await storeCachedDetection(repoRoot, cacheKey, fallbackPath, { detection: summary })
+        return NextResponse.json({ outputUrl: `/${publicName}`, detection: summary })
+      }
+    } else {
+      // The server answers images in memory
+      const bytes = detection?.image_base64 ? Buffer.from(detection.image_base64, "base64") : await fs.readFile(absoluteOutputPath)
+      await fs.writeFile(publicPath, bytes)
+    }
+
+    await storeCachedDetection(repoRoot, cacheKey, publicPath, { detection: summary })
+    return NextResponse.json({ outputUrl: `/${publicName}`, detection: summary, renderId: await renderJob() })
+  } catch (e: any) {
+    return NextResponse.json({ error: e?.message || "Unexpected error" }, { status: 500 })
+  }
+}
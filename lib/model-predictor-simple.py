@@ -119,14 +119,20 @@ def get_model_info() -> Dict[str, Any]:
         ]
     }
 
+
 if __name__ == "__main__":
     # Command line interface for testing
     import argparse
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml-models', 'scripts'))
+    from cli_profiling import add_profile_arguments, exit_if_profiling_startup, predict_profiled
+    
+    exit_if_profiling_startup(__file__)
     
     parser = argparse.ArgumentParser(description="Gene Sequence Predictor")
     parser.add_argument("--test", action="store_true", help="Test with sample sequence")
     parser.add_argument("--info", action="store_true", help="Show model info")
     parser.add_argument("--sequences", nargs="+", help="DNA sequences to predict")
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
     
@@ -137,7 +143,7 @@ if __name__ == "__main__":
         result = predict_species(["ATGCGATCGATCGATCGATCGATCGATCGATCGATCGATCG"])
         print(json.dumps(result, indent=2))
     elif args.sequences:
-        result = predict_species(args.sequences)
+        result = predict_profiled(predict_species, args.profile, os.path.basename(__file__), args.sequences)
         print(json.dumps(result, indent=2))
     else:
         print("Use --help for usage information")
@@ -7,131 +7,48 @@ This script can be called directly from Node.js without needing a separate Flask
 import os
 import sys
 import json
-import traceback
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
 
-# Add the Model directory to the path
+# Add the Model directory and the ml-models scripts to the path
 model_dir = os.path.join(os.path.dirname(__file__), '..', 'Model')
+scripts_dir = os.path.join(os.path.dirname(__file__), '..', 'ml-models', 'scripts')
 sys.path.insert(0, model_dir)
+sys.path.insert(0, scripts_dir)
+
+# GeneSequencePredictor owns loading, validation and formatting; it only pulls
+# in numpy/joblib on the prediction path. The router picks the ensemble for
+# each sequence's marker (Model/markers/<MARKER>/, falling back to Model/).
+from marker_router import MarkerRouter
+
+predictor = MarkerRouter(model_dir)
 
-try:
-    from infer_helper import predict_sequences
-except ImportError as e:
-    print(f"Warning: Could not import infer_helper: {e}")
-    predict_sequences = None
 
 def is_model_available() -> bool:
     """Check if the model files are available."""
-    required_files = [
-        'stack_meta_clf.pkl',
-        'stack_label_encoder.pkl', 
-        'lgb_models_list.pkl',
-        'xgb_models_list.pkl'
-    ]
-    
-    for file in required_files:
-        file_path = os.path.join(model_dir, file)
-        if not os.path.exists(file_path):
-            return False
-    return True
+    return predictor.is_available()
 
-def predict_species(sequences: List[str]) -> Dict[str, Any]:
+def predict_species(sequences: List[str], sequence_type: Union[None, str, List[str]] = None) -> Dict[str, Any]:
     """Predict species from gene sequences."""
-    if not is_model_available():
-        return {
-            "success": False,
-            "error": "Model files not found",
-            "message": "Please ensure all model files are in the Model directory"
-        }
-    
-    if not predict_sequences:
-        return {
-            "success": False,
-            "error": "Model inference function not available",
-            "message": "Could not import predict_sequences function"
-        }
-    
-    try:
-        # Validate sequences
-        valid_sequences = []
-        for seq in sequences:
-            if seq and isinstance(seq, str) and len(seq.strip()) > 0:
-                # Basic validation - should contain only ATGC characters
-                seq_clean = seq.strip().upper()
-                if all(c in 'ATGC' for c in seq_clean):
-                    valid_sequences.append(seq_clean)
-        
-        if not valid_sequences:
-            return {
-                "success": False,
-                "error": "No valid sequences provided",
-                "message": "Sequences must contain only A, T, G, C characters"
-            }
-        
-        # Make predictions
-        predictions = predict_sequences(valid_sequences)
-        
-        # Format results
-        results = []
-        for i, pred in enumerate(predictions):
-            result = {
-                "sequence_id": f"seq_{i+1}",
-                "sequence_length": len(valid_sequences[i]),
-                "predicted_species": pred.get('pred_label', 'Unknown'),
-                "confidence": max(pred.get('prob_vector', [0.0])),
-                "probability_distribution": pred.get('prob_vector', []),
-                "sequence_preview": valid_sequences[i][:50] + "..." if len(valid_sequences[i]) > 50 else valid_sequences[i]
-            }
-            results.append(result)
-        
-        return {
-            "success": True,
-            "predictions": results,
-            "model_info": {
-                "name": "Gene Sequence Species Classifier",
-                "version": "1.0.0",
-                "description": "Stacked ensemble model for species identification from gene sequences",
-                "supported_genes": ["COI", "16S", "18S", "ITS", "General"],
-                "model_type": "Stacked Ensemble (LightGBM + XGBoost + Meta Classifier)"
-            },
-            "total_sequences": len(results)
-        }
-        
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "message": "Prediction failed",
-            "traceback": traceback.format_exc()
-        }
+    return predictor.predict_batch(sequences, sequence_type=sequence_type)
 
 def get_model_info() -> Dict[str, Any]:
     """Get model information."""
-    return {
-        "model_info": {
-            "name": "Gene Sequence Species Classifier",
-            "version": "1.0.0",
-            "description": "Stacked ensemble model for species identification from gene sequences",
-            "supported_genes": ["COI", "16S", "18S", "ITS", "General"],
-            "model_type": "Stacked Ensemble (LightGBM + XGBoost + Meta Classifier)"
-        },
-        "model_available": is_model_available(),
-        "required_files": [
-            'stack_meta_clf.pkl',
-            'stack_label_encoder.pkl',
-            'lgb_models_list.pkl', 
-            'xgb_models_list.pkl'
-        ]
-    }
+    return predictor.get_model_info()
 
 if __name__ == "__main__":
     # Command line interface for testing
     import argparse
+    from cli_profiling import add_profile_arguments, exit_if_profiling_startup, predict_profiled
+    
+    exit_if_profiling_startup(__file__)
     
     parser = argparse.ArgumentParser(description="Gene Sequence Predictor")
     parser.add_argument("--test", action="store_true", help="Test with sample sequence")
     parser.add_argument("--info", action="store_true", help="Show model info")
     parser.add_argument("--sequences", nargs="+", help="DNA sequences to predict")
+    parser.add_argument("--sequence-type", nargs="+",
+                        help="Gene marker (COI, 16S, 18S, ITS, General) for all sequences, or one per sequence")
+    add_profile_arguments(parser)
     
     args = parser.parse_args()
     
@@ -142,7 +59,10 @@ if __name__ == "__main__":
         result = predict_species(["ATGCGATCGATCGATCGATCGATCGATCGATCGATCGATCG"])
         print(json.dumps(result, indent=2))
     elif args.sequences:
-        result = predict_species(args.sequences)
+        markers = args.sequence_type
+        if markers and len(markers) == 1:
+            markers = markers[0]
+        result = predict_profiled(predict_species, args.profile, os.path.basename(__file__), args.sequences, markers)
         print(json.dumps(result, indent=2))
     else:
         print("Use --help for usage information")
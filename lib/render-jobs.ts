@@ -0,0 +1,171 @@
+import path from "path"
+import fs from "fs/promises"
+import { randomUUID } from "crypto"
+import { runPythonCommand } from "@/lib/python-runner"
+import { moveFile, transcodeToMp4 } from "@/lib/video-transcode"
+import { readCachedDetection, storeCachedDetection } from "@/lib/detection-cache"
+import { detectWithServer } from "@/lib/detection-client"
+
+// Deferred full-quality video renders. A video preview request (form field preview=1) only
+// runs the detector on a few frames and records here how to run the full render; the page
+// starts it with POST /api/detection/render { id } and repeats that call to poll. Each job is a folder
+// under temp/render-jobs holding the upload and job.json, whose status is pending, running,
+// done (with outputUrl and detection) or error. Creating a job removes the folders of jobs
+// idle for longer than RENDER_JOB_TTL_HOURS (default 24): finished, failed or never started.
+
+export interface RenderSpec {
+  // Public file name prefix, e.g. "divers"
+  prefix: string
+  // Detector names and weights paths for scripts/detection_server.py
+  detectors: string[]
+  weights: string[]
+  // --weights values for scripts/yolo_detect.py
+  cliWeights: string[]
+  // Detector options of the full render, e.g. ["--track"]
+  options: string[]
+  // detection-cache key of the full render
+  cacheKey: string | null
+}
+
+const DEFAULT_TTL_HOURS = 24
+
+// Renders started by this process; a job left "running" by a previous process can be restarted
+const running = new Set<string>()
+
+function jobsDir(repoRoot: string) {
+  return path.join(repoRoot, "temp", "render-jobs")
+}
+
+function jobDir(repoRoot: string, id: string) {
+  return path.join(jobsDir(repoRoot), id)
+}
+
+function ttlMs(): number {
+  const fromEnv = process.env.RENDER_JOB_TTL_HOURS
+  const hours = fromEnv && fromEnv.trim().length > 0 ? Number(fromEnv) : DEFAULT_TTL_HOURS
+  return (Number.isFinite(hours) ? hours : DEFAULT_TTL_HOURS) * 60 * 60 * 1000
+}
+
+async function loadJob(repoRoot: string, id: string): Promise<any | null> {
+  try {
+    return JSON.parse(await fs.readFile(path.join(jobDir(repoRoot, id), "job.json"), "utf8"))
+  } catch {
+    return null
+  }
+}
+
+async function saveJob(repoRoot: string, id: string, job: any) {
+  const file = path.join(jobDir(repoRoot, id), "job.json")
+  await fs.writeFile(`${file}.tmp`, JSON.stringify(job))
+  await fs.rename(`${file}.tmp`, file)
+}
+
+// Job ids come back from the browser; only ever use them as a folder name once they look like ours
+export function isRenderId(id: unknown): id is string {
+  return typeof id === "string" && /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/.test(id)
+}
+
+export async function createRenderJob(repoRoot: string, upload: Buffer, spec: RenderSpec): Promise<string> {
+  await sweep(repoRoot)
+  const id = randomUUID()
+  await fs.mkdir(jobDir(repoRoot, id), { recursive: true })
+  // OpenCV and ffmpeg go by the content, not the extension
+  await fs.writeFile(path.join(jobDir(repoRoot, id), "input.mp4"), upload)
+  await saveJob(repoRoot, id, { spec, input: "input.mp4", status: "pending", createdAt: Date.now() })
+  return id
+}
+
+// The job as the page sees it (without how it is run)
+export async function readRenderJob(repoRoot: string, id: string): Promise<any | null> {
+  const job = await loadJob(repoRoot, id)
+  if (!job) return null
+  const { spec, input, ...status } = job
+  return { id, ...status }
+}
+
+// Starts the full render in the background unless it is running or done; returns the job's status
+export async function startRenderJob(repoRoot: string, id: string): Promise<any | null> {
+  const job = await loadJob(repoRoot, id)
+  if (!job) return null
+  if (job.status !== "done" && !running.has(id)) {
+    running.add(id)
+    const started = { ...job, status: "running", startedAt: Date.now(), error: undefined }
+    await saveJob(repoRoot, id, started)
+    render(repoRoot, id, started).finally(() => running.delete(id))
+  }
+  return readRenderJob(repoRoot, id)
+}
+
+async function render(repoRoot: string, id: string, job: any) {
+  const spec: RenderSpec = job.spec
+  const dir = jobDir(repoRoot, id)
+  const inputPath = path.join(dir, job.input)
+  try {
+    // Someone rendered the same upload in full already
+    const cached = await readCachedDetection(repoRoot, spec.cacheKey, spec.prefix)
+    if (cached) {
+      await saveJob(repoRoot, id, { ...job, status: "done", finishedAt: Date.now(), outputUrl: cached.outputUrl, detection: cached.detection })
+      await fs.rm(inputPath, { force: true })
+      return
+    }
+
+    let detection: any = await detectWithServer(await fs.readFile(inputPath), spec.detectors, spec.weights, "video", spec.options)
+    if (!detection) {
+      const scriptPath = path.join(repoRoot, "scripts", "yolo_detect.py")
+      const args = [scriptPath, "--weights", ...spec.cliWeights, "--input", inputPath, "--outdir", dir, "--media", "video", ...spec.options]
+      const { stdout, stderr, code } = await runPythonCommand(args, repoRoot)
+      if (code !== 0) throw new Error(stderr || stdout || "Detection failed")
+      detection = JSON.parse(stdout.trim().split(/\r?\n/).pop() || "")
+    }
+    const summary = {
+      media: detection.media,
+      count: detection.count ?? detection.total_detections,
+      classCounts: detection.class_counts,
+      frames: detection.frames,
+      uniqueCounts: detection.unique_counts,
+    }
+
+    const outputPath = path.isAbsolute(detection.path) ? detection.path : path.join(repoRoot, detection.path)
+    const publicDir = path.join(repoRoot, "public")
+    await fs.mkdir(publicDir, { recursive: true })
+    let publicName = `${spec.prefix}_${Date.now()}.mp4`
+    if (detection.browser_ready) {
+      await moveFile(outputPath, path.join(publicDir, publicName))
+    } else if (!(await transcodeToMp4(outputPath, path.join(publicDir, publicName))).transcoded) {
+      publicName = `${spec.prefix}_${Date.now()}${path.extname(outputPath) || ".avi"}`
+      await fs.copyFile(outputPath, path.join(publicDir, publicName))
+    }
+
+    await storeCachedDetection(repoRoot, spec.cacheKey, path.join(publicDir, publicName), { detection: summary })
+    await saveJob(repoRoot, id, { ...job, status: "done", finishedAt: Date.now(), outputUrl: `/${publicName}`, detection: summary })
+    await fs.rm(inputPath, { force: true })
+  } catch (e: any) {
+    // The upload stays, so asking again retries
+    await saveJob(repoRoot, id, { ...job, status: "error", finishedAt: Date.now(), error: e?.message || "Render failed" }).catch(() => {})
+  }
+}
+
+// Removes the folders of jobs idle for longer than the TTL; the rendered videos live in public/
+async function sweep(repoRoot: string) {
+  const cutoff = Date.now() - ttlMs()
+  let ids: string[]
+  try {
+    ids = await fs.readdir(jobsDir(repoRoot))
+  } catch {
+    return
+  }
+  for (const id of ids) {
+    if (running.has(id)) continue
+    const job = await loadJob(repoRoot, id)
+    let lastActive: number | undefined = job ? job.finishedAt ?? job.startedAt ?? job.createdAt : undefined
+    if (lastActive === undefined) {
+      // No job.json yet (or unreadable): go by the folder
+      try {
+        lastActive = (await fs.stat(jobDir(repoRoot, id))).mtimeMs
+      } catch {
+        continue
+      }
+    }
+    if (lastActive < cutoff) await fs.rm(jobDir(repoRoot, id), { recursive: true, force: true }).catch(() => {})
+  }
+}
@@ -150,15 +150,19 @@ def get_model_info() -> Dict[str, Any]:
 
 if __name__ == "__main__":
     import argparse
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'ml-models', 'scripts'))
+    from cli_profiling import add_profile_arguments, exit_if_profiling_startup, predict_profiled
+    exit_if_profiling_startup(__file__)
     parser = argparse.ArgumentParser(description="SIH Gene Sequence Predictor")
     parser.add_argument("--info", action="store_true", help="Show model info")
     parser.add_argument("--sequences", nargs="+", help="DNA sequences to predict")
+    add_profile_arguments(parser)
     args = parser.parse_args()
 
     if args.info:
         print(json.dumps(get_model_info(), indent=2))
     elif args.sequences:
-        print(json.dumps(predict_species(args.sequences), indent=2))
+        print(json.dumps(predict_profiled(predict_species, args.profile, os.path.basename(__file__), args.sequences), indent=2))
     else:
         print("Use --help for usage information")
 
@@ -47,4 +47,16 @@ export async function transcodeToMp4(inputPath: string, outputMp4Path: string):
   return { transcoded: false }
 }
 
+// scripts/yolo_detect.py reports browser_ready when it already streamed a faststart H.264 MP4
+// through ffmpeg; such output only needs moving into public/, not a second encode.
+export async function moveFile(src: string, dest: string): Promise<void> {
+  try {
+    await fs.rename(src, dest)
+  } catch (e: any) {
+    // rename cannot cross filesystems
+    if (e?.code !== "EXDEV") throw e
+    await fs.copyFile(src, dest)
+    await fs.unlink(src)
+  }
+}
 
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+ASGI variant of the gene sequence prediction API.
+CPU-bound scoring runs in a process pool behind a bounded queue. Requests are
+rejected with 429 + Retry-After when the queue is full, dropped before scoring
+when their deadline has passed, and cancelled when the client disconnects.
+
+Run with: uvicorn asgi_app:app --app-dir ml-models/scripts
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Any, Optional
+from urllib.parse import parse_qs
+
+# Scoring pool and queue sizing, overridable through the environment
+POOL_WORKERS = int(os.environ.get('ASGI_POOL_WORKERS', os.cpu_count() or 2))
+QUEUE_SIZE = int(os.environ.get('ASGI_QUEUE_SIZE', 64))
+DEFAULT_DEADLINE_MS = float(os.environ.get('ASGI_DEFAULT_DEADLINE_MS', 0)) or None
+MAX_BODY_BYTES = 8 * 1024 * 1024
+
+
+# ----- process pool side -----
+
+def _init_worker():
+    """Load the active model once per pool process."""
+    import model_wrapper
+    registry = model_wrapper.model_wrapper.registry
+    if registry.is_available():
+        registry.active.load()
+
+
+def _score(sequences: List[str], sequence_type=None) -> Dict[str, Any]:
+    import model_wrapper
+    return model_wrapper.model_wrapper.predict_species(sequences, sequence_type)
+
+
+# ----- event loop side -----
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Job:
+    """One queued scoring request."""
+
+    __slots__ = ('sequences', 'sequence_type', 'deadline', 'future', 'enqueued_at')
+
+    def __init__(self, sequences: List[str], deadline: Optional[float], loop: asyncio.AbstractEventLoop,
+                 sequence_type=None):
+        self.sequences = sequences
+        self.sequence_type = sequence_type
+        self.deadline = deadline
+        self.future = loop.create_future()
+        self.enqueued_at = time.monotonic()
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+
+class ScoringService:
+    """Bounded queue in front of a process pool."""
+
+    def __init__(self, workers: int = POOL_WORKERS, queue_size: int = QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.queue: Optional[asyncio.Queue] = None
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.dispatchers: List[asyncio.Task] = []
+        self.in_flight = 0
+        self.avg_service_seconds = 0.5
+        self.stats = {"accepted": 0, "completed": 0, "rejected": 0, "expired": 0,
+                      "cancelled": 0, "failed": 0}
+
+    @property
+    def started(self) -> bool:
+        return self.pool is not None
+
+    async def start(self):
+        if self.started:
+            return
+        # spawn, not fork: forking a process that runs an event loop and threads is unsafe
+        ctx = multiprocessing.get_context('spawn')
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx, initializer=_init_worker)
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.dispatchers:
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, return_exceptions=True)
+        self.dispatchers = []
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        backlog = (self.queue.qsize() if self.queue else 0) + self.in_flight
+        return max(1, int(round(backlog * self.avg_service_seconds / self.workers)))
+
+    def submit(self, sequences: List[str], deadline: Optional[float],
+               sequence_type=None) -> Job:
+        """Queue a job; raises asyncio.QueueFull when admission is refused."""
+        job = Job(sequences, deadline, asyncio.get_running_loop(), sequence_type)
+        self.queue.put_nowait(job)
+        self.stats["accepted"] += 1
+        return job
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                if job.future.done():
+                    # Client went away while the job was queued
+                    self.stats["cancelled"] += 1
+                    continue
+                if job.expired():
+                    self.stats["expired"] += 1
+                    job.future.set_exception(DeadlineExceeded())
+                    continue
+
+                self.in_flight += 1
+                start = time.monotonic()
+                try:
+                    result = await loop.run_in_executor(self.pool, _score, job.sequences, job.sequence_type)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                    continue
+                finally:
+                    self.in_flight -= 1
+                elapsed = time.monotonic() - start
+                self.avg_service_seconds = 0.9 * self.avg_service_seconds + 0.1 * elapsed
+                self.stats["completed"] += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            finally:
+                self.queue.task_done()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pool_workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": self.queue.qsize() if self.queue else 0,
+            "in_flight": self.in_flight,
+            "avg_service_ms": self.avg_service_seconds * 1000.0,
+            **self.stats
+        }
+
+
+service = ScoringService()
+
+
+# ----- HTTP helpers -----
+
+async def _send_json(send, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+    body = json.dumps(payload).encode()
+    raw_headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    for key, value in (headers or {}).items():
+        raw_headers.append((key.lower().encode(), str(value).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _read_body(receive) -> Optional[bytes]:
+    """Read the request body; returns None if the client disconnected."""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def _deadline_from(scope, data: Dict[str, Any]) -> Optional[float]:
+    """Absolute monotonic deadline from the X-Request-Deadline-Ms header, ?deadline_ms= or the body.
+
+    Raises ValueError when the budget is not a positive number of milliseconds.
+    """
+    headers = {k.decode().lower(): v.decode() for k, v in scope.get("headers", [])}
+    query = parse_qs(scope.get("query_string", b"").decode())
+    sources = (headers.get('x-request-deadline-ms'), (query.get('deadline_ms') or [None])[0],
+               data.get('deadline_ms'), DEFAULT_DEADLINE_MS)
+    budget_ms = next((s for s in sources if s is not None and s != ""), None)
+    if budget_ms is None:
+        return None
+    try:
+        budget = float(budget_ms)
+    except (TypeError, ValueError):
+        budget = math.nan
+    if isinstance(budget_ms, bool) or not math.isfinite(budget) or budget <= 0:
+        raise ValueError(f"deadline_ms must be a positive number of milliseconds, got {budget_ms!r}")
+    return time.monotonic() + budget / 1000.0
+
+
+async def _wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+# ----- endpoints -----
+
+def _model_wrapper_module():
+    import model_wrapper
+    return model_wrapper
+
+
+def _model_wrapper():
+    return _model_wrapper_module().model_wrapper
+
+
+async def health(scope, receive, send):
+    wrapper = _model_wrapper()
+    await _send_json(send, 200, {
+        "status": "healthy",
+        "model_available": wrapper.is_model_available(),
+        "model_info": wrapper.model_info,
+        "queue": service.status()
+    })
+
+
+async def model_info(scope, receive, send):
+    import model_wrapper
+    await _send_json(send, 200, model_wrapper.get_model_info())
+
+
+async def predict(scope, receive, send):
+    try:
+        body = await _read_body(receive)
+    except ValueError as e:
+        await _send_json(send, 413, {"success": False, "error": str(e)})
+        return
+    if body is None:
+        return
+
+    try:
+        data = json.loads(body or b"null")
+    except ValueError:
+        data = None
+    if not data:
+        await _send_json(send, 400, {"success": False, "error": "No JSON data provided"})
+        return
+    if not isinstance(data, dict):
+        await _send_json(send, 400, {"success": False, "error": "JSON body must be an object"})
+        return
+
+    sequences = data.get('sequences', [])
+    if isinstance(sequences, str):
+        sequences = [sequences]
+    if not sequences:
+        await _send_json(send, 400, {"success": False, "error": "No sequences provided"})
+        return
+    try:
+        deadline = _deadline_from(scope, data)
+    except ValueError as e:
+        await _send_json(send, 400, {"success": False, "error": str(e)})
+        return
+
+    if not _model_wrapper().is_model_available():
+        await _send_json(send, 503, {"success": False, "error": "Model files not found",
+                                     "message": "Please ensure all model files are in the Model directory"},
+                         headers={"Retry-After": 30})
+        return
+
+    if not service.started:
+        await service.start()
+
+    try:
+        job = service.submit(sequences, deadline, _model_wrapper_module().request_markers(data))
+    except asyncio.QueueFull:
+        service.stats["rejected"] += 1
+        await _send_json(send, 429, {"success": False, "error": "Server busy",
+                                     "message": "Scoring queue is full, retry later"},
+                         headers={"Retry-After": service.retry_after()})
+        return
+
+    disconnect = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        done, _ = await asyncio.wait({job.future, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+        if job.future not in done:
+            # Client is gone; a queued job is skipped by the dispatcher, a running one is discarded
+            job.future.cancel()
+            return
+        result = job.future.result()
+    except DeadlineExceeded:
+        await _send_json(send, 504, {"success": False, "error": "Deadline exceeded",
+                                     "message": "Request expired before it could be scored"})
+        return
+    except BrokenProcessPool:
+        await _send_json(send, 503, {"success": False, "error": "Scoring pool unavailable"},
+                         headers={"Retry-After": 5})
+        return
+    except Exception as e:
+        await _send_json(send, 500, {"success": False, "error": str(e), "message": "Internal server error"})
+        return
+    finally:
+        disconnect.cancel()
+
+    await _send_json(send, 200 if result.get('success') else 500, result)
+
+
+ROUTES = {
+    ('GET', '/health'): health,
+    ('GET', '/model-info'): model_info,
+    ('POST', '/predict'): predict,
+}
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await service.start()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await service.stop()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """ASGI entry point."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+
+    handler = ROUTES.get((scope["method"], scope["path"].rstrip('/') or '/'))
+    if handler is None:
+        await _send_json(send, 404, {"success": False, "error": "Not found"})
+        return
+    await handler(scope, receive, send)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ASGI Gene Sequence Prediction API")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind (0.0.0.0 to serve other machines)")
+    parser.add_argument("--port", type=int, default=5000, help="Port to bind")
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("uvicorn is required to run the ASGI server: pip install uvicorn", file=sys.stderr)
+        sys.exit(1)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Startup regression check for CI.
+Profiles `--info` of every per-request entry point (see startup_profile.py) and
+fails when one of them imports a heavy module or takes longer than the budget.
+Prints a report per entry point and a JSON summary on the last stdout line.
+
+    python ml-models/scripts/check_startup.py
+    python ml-models/scripts/check_startup.py --budget-ms 500
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from startup_profile import LIGHT_ARGS, format_report, profile_startup
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+# Spawned by the Next.js routes per request, so their startup is request latency
+ENTRY_POINTS = [
+    'lib/model-predictor.py',
+    'lib/model-predictor-simple.py',
+    'lib/sih-model-predictor.py',
+    'ml-models/scripts/model_wrapper.py',
+]
+DEFAULT_BUDGET_MS = 300.0
+
+
+def check(budget_ms: float = DEFAULT_BUDGET_MS, scripts=None) -> dict:
+    """Profile each entry point's `--info` path; success only if all are light and within budget."""
+    results = []
+    for script in scripts or ENTRY_POINTS:
+        report = profile_startup(os.path.join(REPO_ROOT, script), LIGHT_ARGS, budget_ms=budget_ms)
+        print(format_report(report))
+        print()
+        results.append({
+            "script": script,
+            "wall_ms": round(report["wall_ms"], 1),
+            "heavy_modules_loaded": report["heavy_modules_loaded"],
+            "exit_code": report["exit_code"],
+            "ok": report["within_budget"] and report["exit_code"] == 0
+        })
+    return {"success": all(r["ok"] for r in results), "budget_ms": budget_ms, "results": results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fail if an entry point's --info startup is heavy or slow")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Wall-time budget per entry point")
+    parser.add_argument("scripts", nargs="*", help="Entry points relative to the repo root (default: all)")
+    args = parser.parse_args()
+
+    summary = check(args.budget_ms, args.scripts)
+    print(json.dumps(summary))
+    sys.exit(0 if summary["success"] else 1)
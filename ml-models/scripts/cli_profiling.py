@@ -0,0 +1,41 @@
+"""
+Profiling flags shared by the command-line predictors (lib/*-predictor.py and model_wrapper.py).
+`--profile-startup` re-runs the script under `-X importtime`; `--profile` runs one
+prediction under request_profiler. Only the standard library is imported here, so
+the predictors' `--info` path stays light.
+"""
+
+import os
+import sys
+from typing import Any, Callable, Dict, List, Optional
+
+
+def add_profile_arguments(parser: Any, predict: bool = True) -> None:
+    """Add --profile (when the script predicts), --profile-startup and --startup-budget-ms to an argparse parser."""
+    if predict:
+        parser.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "pyinstrument"],
+                            help="Profile the prediction (stacks + allocations) into ml-models/profiles")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print an import-time breakdown of the remaining arguments (default: --info)")
+    parser.add_argument("--startup-budget-ms", type=float, help="With --profile-startup, fail if startup exceeds this budget")
+
+
+def exit_if_profiling_startup(script_path: str, argv: Optional[List[str]] = None) -> None:
+    """Handle `--profile-startup` before the script parses or imports anything else."""
+    argv = sys.argv[1:] if argv is None else argv
+    if '--profile-startup' in argv:
+        from startup_profile import run_from_cli
+        sys.exit(run_from_cli(script_path, argv))
+
+
+def predict_profiled(predict: Callable[..., Dict[str, Any]], mode: Optional[str], label: str,
+                     sequences: List[str], *args) -> Dict[str, Any]:
+    """predict(sequences, *args), profiled when --profile or MODEL_PROFILE_SAMPLE_RATE selects it."""
+    if not mode and not os.environ.get('MODEL_PROFILE_SAMPLE_RATE'):
+        return predict(sequences, *args)
+    from request_profiler import profiler
+    result, profile_id = profiler.call(predict, sequences, *args, mode=mode, label=label,
+                                       metadata={"sequences": len(sequences)})
+    if profile_id:
+        result["profile_id"] = profile_id
+    return result
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Load test for the pre-fork server.
+Starts serve_prefork.py with an increasing number of workers, drives it with
+concurrent clients and reports throughput, latency, total RSS and total PSS.
+PSS counts shared copy-on-write pages once, so a flat PSS total as workers are
+added shows the models are shared rather than copied.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import signal
+import subprocess
+import threading
+import urllib.request
+from typing import Dict, List, Any
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLE_SEQUENCE = "ATGCGATCGATCGATCGATCGATCGATCGATCGATCGATCGTTAGCCGATAGCTAGCTAGGCTAACGT" * 4
+
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_kb(pid: int) -> Dict[str, int]:
+    """RSS and PSS of one process in kB (Linux only)."""
+    usage = {"rss_kb": 0, "pss_kb": 0}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    usage["rss_kb"] = int(line.split()[1])
+                elif line.startswith("Pss:"):
+                    usage["pss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return usage
+
+
+def _start_server(workers: int) -> Dict[str, Any]:
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPT_DIR, 'serve_prefork.py'), '--host', '127.0.0.1',
+         '--port', '0', '--workers', str(workers)],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        line = proc.stdout.readline()
+        if not line:
+            break
+        match = re.search(r'serving on http://([\d.]+):(\d+)', line)
+        if match:
+            # Keep draining output so the server never blocks on a full pipe
+            threading.Thread(target=proc.stdout.read, daemon=True).start()
+            return {"proc": proc, "url": f"http://{match.group(1)}:{match.group(2)}"}
+    proc.kill()
+    raise RuntimeError("Server did not start")
+
+
+def _drive(url: str, endpoint: str, concurrency: int, duration: float, batch: int) -> Dict[str, Any]:
+    body = json.dumps({"sequences": [SAMPLE_SEQUENCE] * batch}).encode()
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.time() + duration
+
+    def client():
+        local = []
+        while time.time() < stop_at:
+            if endpoint == '/predict':
+                req = urllib.request.Request(url + endpoint, data=body,
+                                             headers={"Content-Type": "application/json"})
+            else:
+                req = urllib.request.Request(url + endpoint)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=60) as resp:
+                    resp.read()
+            except urllib.error.HTTPError as e:
+                e.read()
+                with lock:
+                    errors[0] += 1
+                continue
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000.0 if latencies else None
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99)
+    }
+
+
+def run_load_test(worker_counts: List[int], endpoint: str = '/predict', duration: float = 10.0,
+                  concurrency_per_worker: int = 2, batch: int = 8) -> List[Dict[str, Any]]:
+    results = []
+    for workers in worker_counts:
+        server = _start_server(workers)
+        try:
+            # Warm up every worker once
+            _drive(server["url"], endpoint, workers, 1.0, batch)
+            load = _drive(server["url"], endpoint, workers * concurrency_per_worker, duration, batch)
+
+            master = server["proc"].pid
+            pids = [master] + _children(master)
+            memory = [_memory_kb(pid) for pid in pids]
+            results.append({
+                "workers": workers,
+                **load,
+                "total_rss_mb": sum(m["rss_kb"] for m in memory) / 1024.0,
+                "total_pss_mb": sum(m["pss_kb"] for m in memory) / 1024.0,
+                "master_rss_mb": memory[0]["rss_kb"] / 1024.0
+            })
+        finally:
+            server["proc"].send_signal(signal.SIGTERM)
+            server["proc"].wait(timeout=60)
+
+    base = results[0]["throughput_rps"] if results and results[0]["throughput_rps"] else None
+    for row in results:
+        row["scaling"] = (row["throughput_rps"] / base) if base else None
+        row["scaling_efficiency"] = (row["scaling"] / (row["workers"] / results[0]["workers"])) if base else None
+    return results
+
+
+def format_results(results: List[Dict[str, Any]]) -> str:
+    lines = [f"{'workers':>7} {'req/s':>9} {'scale':>6} {'p50 ms':>8} {'p99 ms':>8} "
+             f"{'errors':>6} {'RSS MB':>8} {'PSS MB':>8}"]
+    for r in results:
+        lines.append(
+            f"{r['workers']:>7} {r['throughput_rps']:>9.1f} {(r['scaling'] or 0):>6.2f} "
+            f"{(r['p50_ms'] or 0):>8.1f} {(r['p99_ms'] or 0):>8.1f} {r['errors']:>6} "
+            f"{r['total_rss_mb']:>8.1f} {r['total_pss_mb']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Throughput and memory scaling of serve_prefork.py")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to test")
+    parser.add_argument("--endpoint", default="/predict", choices=["/predict", "/health"],
+                        help="Endpoint to load (/health works without model files)")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per worker count")
+    parser.add_argument("--concurrency-per-worker", type=int, default=2, help="Client threads per worker")
+    parser.add_argument("--batch", type=int, default=8, help="Sequences per /predict request")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    rows = run_load_test(args.workers, args.endpoint, args.duration, args.concurrency_per_worker, args.batch)
+    print(json.dumps(rows, indent=2) if args.json else format_results(rows))
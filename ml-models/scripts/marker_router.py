@@ -0,0 +1,340 @@
+"""
+Marker-aware routing for gene sequence prediction.
+Each gene marker (COI, 16S, 18S, ITS) can have its own stacked ensemble in
+<model dir>/markers/<MARKER>/. Markers without one fall back to
+markers/General/ and then to the artifacts in the model directory itself.
+Ensembles load on first use and the least recently used ones are evicted
+when the loaded total exceeds the memory budget. Where each marker is routed
+is cached and re-checked on disk at most every STATUS_TTL_SECONDS.
+"""
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Sequence, Tuple, Union
+
+from model_interface import GeneSequencePredictor, MODEL_INFO, REQUIRED_FILES, build_response, NO_VALID_SEQUENCES
+
+DEFAULT_MARKER = "General"
+
+# Loaded-artifact budget per process; 0 disables eviction
+MEMORY_BUDGET_MB = float(os.environ.get('MODEL_MEMORY_BUDGET_MB', 2048))
+
+# How long a cached availability check (marker routes, version status) stays valid
+STATUS_TTL_SECONDS = 30.0
+
+_MARKER_ALIASES = {m.upper(): m for m in MODEL_INFO["supported_genes"]}
+
+
+def normalize_marker(marker: Optional[str]) -> str:
+    """Canonical marker name ('coi' -> 'COI', '16s rRNA' -> '16S'); unknown markers map to General."""
+    if not marker:
+        return DEFAULT_MARKER
+    parts = str(marker).upper().split()
+    return _MARKER_ALIASES.get(parts[0] if parts else '', DEFAULT_MARKER)
+
+
+def _has_artifacts(path: str) -> bool:
+    return all(os.path.exists(os.path.join(path, name)) for name in REQUIRED_FILES)
+
+
+def _artifact_bytes(path: str) -> int:
+    """On-disk size of an artifact set, used as the estimate of its in-memory size."""
+    total = 0
+    for name in REQUIRED_FILES:
+        try:
+            total += os.path.getsize(os.path.join(path, name))
+        except OSError:
+            pass
+    return total
+
+
+class MarkerStats:
+    """Load and scoring counters for one marker."""
+
+    def __init__(self, marker: str):
+        self.marker = marker
+        self.requests = 0
+        self.sequences = 0
+        self.score_seconds = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "sequences": self.sequences,
+            "score_seconds": self.score_seconds,
+            "mean_ms_per_sequence": (self.score_seconds / self.sequences * 1000.0) if self.sequences else None
+        }
+
+
+class _Slot:
+    """One artifact directory, shared by every marker that resolves to it."""
+
+    def __init__(self, model_dir: str, version: Optional[str]):
+        self.model_dir = model_dir
+        self.predictor = GeneSequencePredictor(model_dir=model_dir, version=version)
+        self.size_bytes = _artifact_bytes(model_dir)
+        self.loads = 0
+        self.evictions = 0
+        self.last_load_seconds = None
+        self.total_load_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "model_directory": self.model_dir,
+            "loaded": self.predictor.loaded,
+            "size_mb": self.size_bytes / (1024.0 * 1024.0),
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "last_load_seconds": self.last_load_seconds,
+            "total_load_seconds": self.total_load_seconds,
+            "memory": self.predictor.memory
+        }
+
+
+class MarkerRouter:
+    """Routes sequences to per-marker ensembles, loading lazily under a memory budget."""
+
+    def __init__(self, model_dir: str, version: Optional[str] = None,
+                 memory_budget_mb: float = MEMORY_BUDGET_MB):
+        self.model_dir = os.path.abspath(model_dir)
+        self.version = version
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        self._slots: Dict[str, _Slot] = {}
+        # Loaded slots, least recently used first
+        self._lru: "OrderedDict[str, _Slot]" = OrderedDict()
+        self._stats: Dict[str, MarkerStats] = {}
+        self._lock = threading.Lock()
+        # (checked_at, marker -> artifact directory), replaced as one tuple by refresh()
+        self._routes: Optional[Tuple[float, Dict[str, Optional[str]]]] = None
+
+    # ----- resolution -----
+
+    def refresh(self) -> Dict[str, Optional[str]]:
+        """Stat the artifact directories and cache where each supported marker is routed."""
+        markers_dir = os.path.join(self.model_dir, 'markers')
+        base = self.model_dir if _has_artifacts(self.model_dir) else None
+        general = os.path.join(markers_dir, DEFAULT_MARKER)
+        general = general if _has_artifacts(general) else base
+        routes = {}
+        for marker in MODEL_INFO["supported_genes"]:
+            path = os.path.join(markers_dir, marker)
+            routes[marker] = path if _has_artifacts(path) else general
+        self._routes = (time.monotonic(), routes)
+        return routes
+
+    def _route_table(self) -> Dict[str, Optional[str]]:
+        cached = self._routes
+        if cached is None or time.monotonic() - cached[0] > STATUS_TTL_SECONDS:
+            return self.refresh()
+        return cached[1]
+
+    def resolve(self, marker: Optional[str]) -> Optional[str]:
+        """Artifact directory serving `marker` (cached), or None when nothing is deployed."""
+        return self._route_table()[normalize_marker(marker)]
+
+    def is_available(self, marker: Optional[str] = None) -> bool:
+        """Whether `marker` (any marker when None) has a deployed ensemble."""
+        if marker is not None:
+            return self.resolve(marker) is not None
+        return any(path is not None for path in self._route_table().values())
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._lru)
+
+    def markers(self) -> Dict[str, Optional[str]]:
+        """Where each supported marker is currently routed."""
+        return dict(self._route_table())
+
+    # ----- loading and eviction -----
+
+    def _slot(self, model_dir: str) -> _Slot:
+        with self._lock:
+            slot = self._slots.get(model_dir)
+            if slot is None:
+                slot = self._slots[model_dir] = _Slot(model_dir, self.version)
+            return slot
+
+    def predictor_for(self, marker: Optional[str]) -> GeneSequencePredictor:
+        """Loaded predictor serving `marker`, loading it (and evicting cold ones) if needed."""
+        model_dir = self.resolve(marker)
+        if model_dir is None:
+            raise FileNotFoundError(f"Model files not found for marker {normalize_marker(marker)}")
+        slot = self._slot(model_dir)
+
+        if not slot.predictor.loaded:
+            with slot.lock:
+                if not slot.predictor.loaded:
+                    start = time.perf_counter()
+                    slot.predictor.load_model()
+                    slot.last_load_seconds = time.perf_counter() - start
+                    slot.total_load_seconds += slot.last_load_seconds
+                    slot.loads += 1
+
+        with self._lock:
+            self._lru[model_dir] = slot
+            self._lru.move_to_end(model_dir)
+            self._evict(keep=model_dir)
+        return slot.predictor
+
+    def _evict(self, keep: str):
+        """Unload least recently used slots until the budget is met (caller holds the lock)."""
+        if self.memory_budget_bytes <= 0:
+            return
+        total = sum(slot.size_bytes for slot in self._lru.values())
+        for model_dir in list(self._lru):
+            if total <= self.memory_budget_bytes:
+                break
+            if model_dir == keep:
+                continue
+            slot = self._lru.pop(model_dir)
+            # Requests already holding this predictor finish on their own reference
+            slot.predictor = GeneSequencePredictor(model_dir=model_dir, version=self.version)
+            slot.evictions += 1
+            total -= slot.size_bytes
+
+    def load(self, marker: Optional[str] = None) -> "MarkerRouter":
+        """Warm the ensemble for `marker` (the General route, else the first deployed one, when None)."""
+        if marker is None and self.resolve(DEFAULT_MARKER) is None:
+            marker = next((m for m, d in self.markers().items() if d), DEFAULT_MARKER)
+        self.predictor_for(marker)
+        return self
+
+    def unload(self):
+        """Drop every loaded ensemble."""
+        with self._lock:
+            for model_dir, slot in self._lru.items():
+                slot.predictor = GeneSequencePredictor(model_dir=model_dir, version=self.version)
+            self._lru.clear()
+
+    # ----- scoring -----
+
+    def predict(self, sequences: List[str],
+                sequence_type: Union[None, str, Sequence[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """Score cleaned sequences, grouped by marker, returning results in input order.
+
+        `sequence_type` is one marker for the whole batch or one marker per sequence.
+        """
+        if sequence_type is None or isinstance(sequence_type, str):
+            markers = [sequence_type] * len(sequences)
+        else:
+            markers = list(sequence_type)
+            if len(markers) != len(sequences):
+                raise ValueError("sequence_type must have one entry per sequence")
+
+        groups: Dict[str, List[int]] = {}
+        for i, marker in enumerate(markers):
+            groups.setdefault(normalize_marker(marker), []).append(i)
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(sequences)
+        for marker, indices in groups.items():
+            predictor = self.predictor_for(marker)
+            start = time.perf_counter()
+            scored = list(predictor.predict_many([sequences[i] for i in indices], sequence_type=marker))
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                stats = self._stats.setdefault(marker, MarkerStats(marker))
+                stats.requests += 1
+                stats.sequences += len(indices)
+                stats.score_seconds += elapsed
+
+            route = self.route_name(predictor.model_dir)
+            for i, result in zip(indices, scored):
+                result["sequence_id"] = f"seq_{i + 1}"
+                result["model_route"] = route
+                results[i] = result
+        return results
+
+    def predict_batch(self, sequences: List[str],
+                      sequence_type: Union[None, str, Sequence[Optional[str]]] = None) -> Dict[str, Any]:
+        """Validate, route and score a request, in the response shape used by the API routes."""
+        if not self.is_available():
+            return {
+                "success": False,
+                "error": "Model files not found",
+                "message": "Please ensure all model files are in the Model directory"
+            }
+
+        pairs = clean_marked_sequences(sequences, sequence_type)
+        if not pairs:
+            return dict(NO_VALID_SEQUENCES)
+
+        try:
+            results = self.predict([s for s, _ in pairs], [m for _, m in pairs])
+        except ImportError as e:
+            return {
+                "success": False,
+                "error": f"Model inference function not available: {e}",
+                "message": "Could not import the inference dependencies"
+            }
+        except Exception as e:
+            import traceback
+            return {
+                "success": False,
+                "error": str(e),
+                "message": "Prediction failed",
+                "traceback": traceback.format_exc()
+            }
+        return build_response(results, self.model_info())
+
+    # ----- reporting -----
+
+    def route_name(self, model_dir: Optional[str]) -> Optional[str]:
+        """Short name of an artifact directory: the marker, or "default" for the model directory itself."""
+        if model_dir is None:
+            return None
+        return "default" if os.path.abspath(model_dir) == self.model_dir else os.path.basename(model_dir)
+
+    def model_info(self) -> Dict[str, Any]:
+        info = dict(MODEL_INFO)
+        if self.version:
+            info["version"] = self.version
+        return info
+
+    def get_model_info(self) -> Dict[str, Any]:
+        """Model information without loading anything."""
+        return {
+            "model_info": self.model_info(),
+            "model_available": self.is_available(),
+            "required_files": REQUIRED_FILES,
+            "markers": self.markers()
+        }
+
+    def memory(self) -> Dict[str, Any]:
+        """Per-artifact memory of each loaded ensemble, by route."""
+        with self._lock:
+            return {self.route_name(d): slot.predictor.memory for d, slot in self._lru.items()}
+
+    def status(self) -> Dict[str, Any]:
+        """Routing table, loaded ensembles and per-marker timings."""
+        with self._lock:
+            loaded_bytes = sum(slot.size_bytes for slot in self._lru.values())
+            return {
+                "memory_budget_mb": self.memory_budget_bytes / (1024.0 * 1024.0),
+                "loaded_mb": loaded_bytes / (1024.0 * 1024.0),
+                "lru_order": [self.route_name(d) for d in self._lru],
+                "routes": {m: self.route_name(d) for m, d in self.markers().items()},
+                "ensembles": {self.route_name(d): slot.describe() for d, slot in self._slots.items()},
+                "scoring": {m: stats.to_dict() for m, stats in self._stats.items()}
+            }
+
+
+def clean_marked_sequences(sequences: List[Any],
+                           sequence_type: Union[None, str, Sequence[Optional[str]]] = None) -> List[tuple]:
+    """(sequence, marker) pairs for the valid sequences, keeping per-sequence markers aligned."""
+    if sequence_type is None or isinstance(sequence_type, str):
+        markers = [sequence_type] * len(sequences or [])
+    else:
+        markers = list(sequence_type) + [None] * max(0, len(sequences or []) - len(sequence_type))
+
+    pairs = []
+    for seq, marker in zip(sequences or [], markers):
+        try:
+            pairs.append((GeneSequencePredictor.clean_sequence(seq), marker))
+        except ValueError:
+            continue
+    return pairs
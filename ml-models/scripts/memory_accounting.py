@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Memory accounting and footprint reduction for the stacked-ensemble artifacts.
+Reports how much of the process RSS each artifact accounts for after load and
+applies optional reductions:
+
+- free_training_state: drop LightGBM training/validation datasets and predict buffers
+- dedupe: share one object between byte-identical fold models (scored once)
+- float32: store the numpy-held weights (meta classifier, in-memory embeddings) as float32
+
+LightGBM and XGBoost keep their tree leaf values as doubles in native memory and
+expose no option to change that, so float32 only applies to numpy-held arrays.
+
+Run directly to print before/after numbers for sizing worker counts per node.
+"""
+
+import os
+import gc
+import sys
+import json
+import hashlib
+from typing import Dict, List, Any, Optional
+
+# Footprint options applied on model load (GeneSequencePredictor.load_model)
+FREE_TRAINING_STATE = os.environ.get('MODEL_FREE_TRAINING_STATE', '1') == '1'
+DEDUPE_FOLDS = os.environ.get('MODEL_DEDUPE_FOLDS', '1') == '1'
+FLOAT32_WEIGHTS = os.environ.get('MODEL_FLOAT32', '0') == '1'
+
+ARTIFACT_KEYS = ['meta', 'le', 'lgb_models', 'xgb_models', 'emb']
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (Linux); 0 where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def release_freed_memory():
+    """Collect garbage and hand freed heap pages back to the OS so RSS reflects the change."""
+    gc.collect()
+    try:
+        import ctypes
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def _model_fingerprint(model) -> Optional[str]:
+    """Hash of a booster's serialized trees, or None for unknown model types."""
+    if hasattr(model, 'model_to_string'):
+        data = model.model_to_string().encode()
+    elif hasattr(model, 'save_raw'):
+        data = bytes(model.save_raw())
+    else:
+        return None
+    return hashlib.sha1(data).hexdigest()
+
+
+def _array_bytes(obj) -> int:
+    """Bytes held in numpy arrays directly on `obj` (e.g. a fitted sklearn estimator)."""
+    total = 0
+    for value in getattr(obj, '__dict__', {}).values():
+        total += getattr(value, 'nbytes', 0) if hasattr(value, 'dtype') else 0
+    return total
+
+
+def artifact_report(artifacts: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-artifact memory: RSS growth while loading, on-disk size and model counts."""
+    from infer_helper import ARTIFACT_FILES
+
+    model_dir = artifacts.get('model_dir') or ''
+    load_rss = artifacts.get('load_rss_bytes') or {}
+    report: Dict[str, Any] = {}
+    for key in ARTIFACT_KEYS:
+        obj = artifacts.get(key)
+        if obj is None:
+            continue
+        entry: Dict[str, Any] = {}
+        if key in ARTIFACT_FILES:
+            try:
+                entry["file_bytes"] = os.path.getsize(os.path.join(model_dir, ARTIFACT_FILES[key]))
+            except OSError:
+                pass
+        if key in load_rss:
+            entry["load_rss_bytes"] = load_rss[key]
+        if isinstance(obj, list):
+            entry["models"] = len(obj)
+            entry["unique_models"] = len({id(m) for m in obj})
+        elif hasattr(obj, 'nbytes'):
+            entry["array_bytes"] = int(obj.nbytes)
+            entry["dtype"] = str(obj.dtype)
+            # A memmap is paged in on demand and shared between processes
+            entry["memory_mapped"] = type(obj).__name__ == 'memmap'
+        else:
+            entry["array_bytes"] = _array_bytes(obj)
+        report[key] = entry
+    return report
+
+
+def free_training_state(artifacts: Dict[str, Any]) -> int:
+    """Free LightGBM datasets and predict buffers; returns the number of boosters touched."""
+    freed = 0
+    for model in artifacts.get('lgb_models') or []:
+        if hasattr(model, 'free_dataset'):
+            model.free_dataset()
+            freed += 1
+    return freed
+
+
+def dedupe_models(artifacts: Dict[str, Any]) -> int:
+    """Replace byte-identical fold models with one shared object; returns the number removed."""
+    removed = 0
+    for key in ('lgb_models', 'xgb_models'):
+        models = artifacts.get(key)
+        if not models:
+            continue
+        seen: Dict[str, Any] = {}
+        deduped = []
+        for model in models:
+            fingerprint = _model_fingerprint(model)
+            if fingerprint is None:
+                deduped.append(model)
+            elif fingerprint in seen:
+                deduped.append(seen[fingerprint])
+                removed += 1
+            else:
+                seen[fingerprint] = model
+                deduped.append(model)
+        # Same length and order, so the fold average is unchanged
+        artifacts[key] = deduped
+    return removed
+
+
+def to_float32(artifacts: Dict[str, Any]) -> int:
+    """Downcast float64 numpy weights; returns the number of arrays converted."""
+    import numpy as np
+
+    converted = 0
+    meta = artifacts.get('meta')
+    for attr in ('coef_', 'intercept_'):
+        value = getattr(meta, attr, None)
+        if value is not None and getattr(value, 'dtype', None) == np.float64:
+            setattr(meta, attr, value.astype(np.float32))
+            converted += 1
+    emb = artifacts.get('emb')
+    # Memory-mapped embeddings stay on disk; converting would load them into RAM
+    if emb is not None and type(emb).__name__ != 'memmap' and emb.dtype == np.float64:
+        artifacts['emb'] = emb.astype(np.float32)
+        converted += 1
+    return converted
+
+
+def reduce_footprint(artifacts: Dict[str, Any], free_state: bool = FREE_TRAINING_STATE,
+                     dedupe: bool = DEDUPE_FOLDS, float32: bool = FLOAT32_WEIGHTS) -> Dict[str, Any]:
+    """Apply the selected reductions in place and report RSS before and after."""
+    before = rss_bytes()
+    applied: Dict[str, Any] = {}
+    if free_state:
+        applied["boosters_freed"] = free_training_state(artifacts)
+    if dedupe:
+        applied["duplicate_models_removed"] = dedupe_models(artifacts)
+    if float32:
+        applied["arrays_to_float32"] = to_float32(artifacts)
+    if applied:
+        release_freed_memory()
+    after = rss_bytes()
+    return {**applied, "rss_before_bytes": before, "rss_after_bytes": after, "rss_saved_bytes": before - after}
+
+
+def load_and_account(model_dir: str, free_state: bool = FREE_TRAINING_STATE, dedupe: bool = DEDUPE_FOLDS,
+                     float32: bool = FLOAT32_WEIGHTS) -> Dict[str, Any]:
+    """Load an artifact set with per-artifact accounting and the selected reductions.
+
+    Returns the artifacts dict with a 'memory' report added.
+    """
+    from infer_helper import load_artifacts
+
+    baseline = rss_bytes()
+    artifacts = load_artifacts(model_dir, measure=True)
+    loaded = rss_bytes()
+    memory = {
+        "artifacts": artifact_report(artifacts),
+        "rss_before_load_bytes": baseline,
+        "rss_after_load_bytes": loaded,
+        "model_rss_bytes": loaded - baseline
+    }
+    memory["reductions"] = reduce_footprint(artifacts, free_state, dedupe, float32)
+    memory["model_rss_after_reductions_bytes"] = memory["reductions"]["rss_after_bytes"] - baseline
+    if dedupe:
+        # Model counts change after deduplication
+        for key in ('lgb_models', 'xgb_models'):
+            if key in memory["artifacts"] and artifacts.get(key):
+                memory["artifacts"][key]["unique_models"] = len({id(m) for m in artifacts[key]})
+    artifacts['memory'] = memory
+    return artifacts
+
+
+def _mb(value: Optional[int]) -> str:
+    return f"{(value or 0) / (1024.0 * 1024.0):8.1f}"
+
+
+def format_report(memory: Dict[str, Any], node_memory_gb: Optional[float] = None) -> str:
+    lines = [f"{'artifact':<12} {'file MB':>8} {'load RSS MB':>11} {'models':>7}"]
+    for key, entry in memory["artifacts"].items():
+        models = f"{entry.get('unique_models', '')}/{entry['models']}" if 'models' in entry else ''
+        lines.append(f"{key:<12} {_mb(entry.get('file_bytes'))} {_mb(entry.get('load_rss_bytes')):>11} {models:>7}")
+    reductions = memory["reductions"]
+    lines.append("")
+    lines.append(f"process RSS before load   {_mb(memory['rss_before_load_bytes'])} MB")
+    lines.append(f"process RSS after load    {_mb(memory['rss_after_load_bytes'])} MB")
+    lines.append(f"after reductions          {_mb(reductions['rss_after_bytes'])} MB "
+                 f"(saved {_mb(reductions['rss_saved_bytes']).strip()} MB)")
+    if node_memory_gb:
+        node = node_memory_gb * 1024 ** 3
+        for label, rss in (("before", memory['rss_after_load_bytes']), ("after", reductions['rss_after_bytes'])):
+            lines.append(f"workers per {node_memory_gb:g} GB node ({label} reductions, no sharing): "
+                         f"{int(node // rss) if rss else 0}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    import argparse
+    from model_interface import DEFAULT_MODEL_DIR
+
+    parser = argparse.ArgumentParser(description="Per-artifact memory of the stacked ensemble, before/after reductions")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR, help="Artifact directory")
+    parser.add_argument("--no-free-training-state", action="store_true", help="Keep LightGBM training state")
+    parser.add_argument("--no-dedupe", action="store_true", help="Do not share identical fold models")
+    parser.add_argument("--float32", action="store_true", help="Downcast numpy-held weights to float32")
+    parser.add_argument("--node-memory-gb", type=float, help="Estimate how many worker processes fit on a node")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        result = load_and_account(args.model_dir, free_state=not args.no_free_training_state,
+                                  dedupe=not args.no_dedupe, float32=args.float32)
+    except (RuntimeError, FileNotFoundError) as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        sys.exit(1)
+    memory = result['memory']
+    print(json.dumps(memory, indent=2) if args.json else format_report(memory, args.node_memory_gb))
@@ -1,97 +1,308 @@
 """
 Model interface for gene sequence prediction.
 This script provides the interface between the web application and the ML model.
+GeneSequencePredictor is the single supported in-process API: the Flask/ASGI
+services, the model registry and lib/model-predictor.py all delegate to it.
 """
 
 import os
+import sys
 import json
-import numpy as np
-import pandas as pd
-from typing import Dict, List, Tuple, Optional
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    # numpy is only imported on the code paths that need it
+    import numpy as np
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CONFIG_PATH = os.path.join(SCRIPTS_DIR, '..', 'config', 'model_config.json')
+DEFAULT_MODEL_DIR = os.path.abspath(os.path.join(SCRIPTS_DIR, '..', '..', 'Model'))
+
+# infer_helper (featurizer + artifact loading) lives next to the artifacts
+sys.path.insert(0, DEFAULT_MODEL_DIR)
+
+REQUIRED_FILES = [
+    'stack_meta_clf.pkl',
+    'stack_label_encoder.pkl',
+    'lgb_models_list.pkl',
+    'xgb_models_list.pkl'
+]
+
+MODEL_INFO = {
+    "name": "Gene Sequence Species Classifier",
+    "version": "1.0.0",
+    "description": "Stacked ensemble model for species identification from gene sequences",
+    "supported_genes": ["COI", "16S", "18S", "ITS", "General"],
+    "model_type": "Stacked Ensemble (LightGBM + XGBoost + Meta Classifier)"
+}
+
+VALID_BASES = frozenset('ATGC')
+
+NO_VALID_SEQUENCES = {
+    "success": False,
+    "error": "No valid sequences provided",
+    "message": "Sequences must contain only A, T, G, C characters"
+}
+
+
+def clean_sequences(sequences: Iterable[Any]) -> List[str]:
+    """Normalize sequences, dropping invalid ones (matches the Next.js route validation)."""
+    valid_sequences = []
+    for seq in sequences or []:
+        try:
+            valid_sequences.append(GeneSequencePredictor.clean_sequence(seq))
+        except ValueError:
+            continue
+    return valid_sequences
+
+
+def build_response(predictions: List[Dict[str, Any]], model_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Successful prediction response in the shape used by the API routes."""
+    return {
+        "success": True,
+        "predictions": predictions,
+        "model_info": model_info,
+        "total_sequences": len(predictions)
+    }
+
 
 class GeneSequencePredictor:
     """Interface for gene sequence species prediction model."""
-    
-    def __init__(self, config_path: str = "config/model_config.json"):
+
+    def __init__(self, config_path: str = DEFAULT_CONFIG_PATH, model_dir: Optional[str] = None,
+                 version: Optional[str] = None):
         """Initialize the predictor with configuration."""
         self.config_path = config_path
         self.config = None
+        self.model_dir = os.path.abspath(model_dir) if model_dir else None
+        self.version = version
         self.model = None
         self.encoder = None
         self.scaler = None
         self.species_db = None
-        
+        self.memory = None
+
     def load_config(self) -> Dict:
         """Load model configuration."""
         if not os.path.exists(self.config_path):
             raise FileNotFoundError(f"Configuration file not found: {self.config_path}")
-            
+
         with open(self.config_path, 'r') as f:
             self.config = json.load(f)
         return self.config
-    
-    def load_model(self):
+
+    def resolve_model_dir(self) -> str:
+        """Directory holding the stacked-ensemble artifacts."""
+        if self.model_dir:
+            return self.model_dir
+        configured = None
+        if os.path.exists(self.config_path):
+            if not self.config:
+                self.load_config()
+            configured = self.config.get('model_directory')
+        if configured:
+            base = os.path.dirname(os.path.abspath(self.config_path))
+            self.model_dir = os.path.abspath(os.path.join(base, configured))
+        else:
+            self.model_dir = DEFAULT_MODEL_DIR
+        return self.model_dir
+
+    def is_available(self) -> bool:
+        """Check if the model files are available."""
+        if self.model is not None:
+            return True
+        model_dir = self.resolve_model_dir()
+        return all(os.path.exists(os.path.join(model_dir, name)) for name in REQUIRED_FILES)
+
+    @property
+    def loaded(self) -> bool:
+        return self.model is not None
+
+    def load_model(self) -> "GeneSequencePredictor":
         """Load the trained model and associated components."""
-        if not self.config:
-            self.load_config()
-            
-        # This will be implemented when the actual model files are uploaded
-        # Example implementation:
-        # import tensorflow as tf
-        # self.model = tf.keras.models.load_model(self.config['model_files']['primary_model'])
-        # 
-        # import joblib
-        # self.encoder = joblib.load(self.config['model_files']['encoder'])
-        # self.scaler = joblib.load(self.config['model_files']['scaler'])
-        
-        raise NotImplementedError("Model loading will be implemented when model files are uploaded")
-    
-    def preprocess_sequence(self, sequence: str) -> np.ndarray:
-        """Preprocess DNA sequence for model input."""
+        if self.model is not None:
+            return self
+        from memory_accounting import load_and_account
+
+        model_dir = self.resolve_model_dir()
+        missing = [name for name in REQUIRED_FILES if not os.path.exists(os.path.join(model_dir, name))]
+        if missing:
+            raise FileNotFoundError(f"Model files not found in {model_dir}: {', '.join(missing)}")
+
+        # Loads with per-artifact accounting and the MODEL_* footprint options
+        artifacts = load_and_account(model_dir)
+        self.memory = artifacts.pop('memory')
+        self.encoder = artifacts['le']
+        self.model = artifacts
+        return self
+
+    def unload(self):
+        """Drop the in-memory model."""
+        self.model = None
+        self.encoder = None
+        self.memory = None
+
+    @staticmethod
+    def clean_sequence(sequence: str) -> str:
+        """Normalize a DNA sequence and validate it contains only A, T, G, C."""
+        if not isinstance(sequence, str):
+            raise ValueError("Sequence must be a string.")
         # Remove whitespace and convert to uppercase
-        sequence = sequence.replace(' ', '').replace('\n', '').upper()
-        
-        # Validate sequence contains only ATGC
-        valid_bases = set('ATGC')
-        if not set(sequence).issubset(valid_bases):
+        sequence = ''.join(sequence.split()).upper()
+        if not sequence:
+            raise ValueError("Sequence is empty.")
+        if not VALID_BASES.issuperset(sequence):
             raise ValueError("Sequence contains invalid characters. Only A, T, G, C are allowed.")
-        
-        # This will be implemented based on the actual model requirements
-        # Example preprocessing steps:
-        # 1. One-hot encoding
-        # 2. Sequence padding/truncation
-        # 3. Normalization
-        
-        return np.array([])  # Placeholder
-    
+        return sequence
+
+    def preprocess_sequence(self, sequence: str) -> "np.ndarray":
+        """Preprocess DNA sequence into the ensemble's feature vector."""
+        return self.featurize([sequence])[0]
+
+    def featurize(self, sequences: List[str]) -> "np.ndarray":
+        """Feature matrix (embeddings, 3-mer, 4-mer and scalar features) for a batch."""
+        from infer_helper import featurize
+        cleaned = [self.clean_sequence(s) for s in sequences]
+        emb = self.model['emb'] if self.model is not None else None
+        return featurize(cleaned, emb)
+
+    def predict_proba(self, sequences: List[str]) -> "np.ndarray":
+        """Class probabilities for a batch of already-cleaned sequences."""
+        from infer_helper import predict_proba
+        if self.model is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        return predict_proba(self.model, sequences)
+
+    def _format(self, index: int, sequence: str, probs, sequence_type: Optional[str]) -> Dict[str, Any]:
+        classes = self.encoder.classes_
+        order = probs.argsort()[::-1]
+        best = int(order[0])
+        confidence = float(probs[best])
+        result = {
+            "sequence_id": f"seq_{index + 1}",
+            "sequence_length": len(sequence),
+            "predicted_species": str(classes[best]),
+            "confidence": confidence,
+            "probability_distribution": probs.tolist(),
+            "sequence_preview": sequence[:50] + "..." if len(sequence) > 50 else sequence,
+            "alternatives": [
+                {"species": str(classes[int(i)]), "confidence": float(probs[int(i)])} for i in order[1:4]
+            ],
+            "novelty_score": 1.0 - confidence
+        }
+        if sequence_type:
+            result["sequence_type"] = sequence_type
+        return result
+
+    def predict_many(self, sequences: Iterable[str], batch_size: int = 256,
+                     sequence_type: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Score an iterable of sequences in batches, yielding one result per sequence.
+
+        Input is consumed lazily, so arbitrarily long streams use bounded memory.
+        Invalid sequences yield a result with an "error" key instead of a prediction.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.load_model()
+
+        iterator = iter(sequences)
+        offset = 0
+        while True:
+            chunk = list(islice(iterator, batch_size))
+            if not chunk:
+                return
+            cleaned: List[Tuple[int, str]] = []
+            errors: Dict[int, str] = {}
+            for i, seq in enumerate(chunk):
+                try:
+                    cleaned.append((i, self.clean_sequence(seq)))
+                except ValueError as e:
+                    errors[i] = str(e)
+
+            scored: Dict[int, Dict[str, Any]] = {}
+            if cleaned:
+                probs = self.predict_proba([s for _, s in cleaned])
+                for row, (i, seq) in enumerate(cleaned):
+                    scored[i] = self._format(offset + i, seq, probs[row], sequence_type)
+
+            for i in range(len(chunk)):
+                if i in scored:
+                    yield scored[i]
+                else:
+                    yield {"sequence_id": f"seq_{offset + i + 1}", "error": errors[i]}
+            offset += len(chunk)
+
     def predict_species(self, sequence: str, sequence_type: str = "COI") -> Dict:
         """Predict species from gene sequence."""
         if not self.model:
             raise RuntimeError("Model not loaded. Call load_model() first.")
-        
-        # Preprocess sequence
-        processed_sequence = self.preprocess_sequence(sequence)
-        
-        # Make prediction
-        # prediction = self.model.predict(processed_sequence)
-        # confidence = float(np.max(prediction))
-        # species_idx = np.argmax(prediction)
-        # species_name = self.encoder.inverse_transform([species_idx])[0]
-        
-        # Placeholder return
+
+        result = next(self.predict_many([sequence], batch_size=1, sequence_type=sequence_type))
+        if "error" in result:
+            raise ValueError(result["error"])
         return {
-            "species": "Species prediction pending model upload",
-            "confidence": 0.0,
+            "species": result["predicted_species"],
+            "confidence": result["confidence"],
             "sequence_type": sequence_type,
-            "alternatives": [],
-            "novelty_score": 0.0
+            "alternatives": result["alternatives"],
+            "novelty_score": result["novelty_score"]
+        }
+
+    def model_info(self) -> Dict[str, Any]:
+        """Model description, including the artifact version when known."""
+        info = dict(MODEL_INFO)
+        if self.version:
+            info["version"] = self.version
+        return info
+
+    def get_model_info(self) -> Dict[str, Any]:
+        """Model information without loading the model."""
+        return {
+            "model_info": self.model_info(),
+            "model_available": self.is_available(),
+            "required_files": REQUIRED_FILES
         }
-    
+
+    def predict_batch(self, sequences: List[str], sequence_type: Optional[str] = None,
+                      batch_size: int = 256) -> Dict[str, Any]:
+        """Validate, score and format a request, in the response shape used by the API routes."""
+        if not self.is_available():
+            return {
+                "success": False,
+                "error": "Model files not found",
+                "message": "Please ensure all model files are in the Model directory"
+            }
+
+        valid_sequences = clean_sequences(sequences)
+        if not valid_sequences:
+            return dict(NO_VALID_SEQUENCES)
+
+        try:
+            results = list(self.predict_many(valid_sequences, batch_size=batch_size,
+                                             sequence_type=sequence_type))
+        except ImportError as e:
+            return {
+                "success": False,
+                "error": f"Model inference function not available: {e}",
+                "message": "Could not import the inference dependencies"
+            }
+        except Exception as e:
+            import traceback
+            return {
+                "success": False,
+                "error": str(e),
+                "message": "Prediction failed",
+                "traceback": traceback.format_exc()
+            }
+
+        return build_response(results, self.model_info())
+
     def get_species_info(self, species_name: str) -> Optional[Dict]:
         """Get additional information about predicted species."""
         if self.species_db is None:
             return None
-            
+
         # Query species database for additional information
         # This would include taxonomy, habitat, conservation status, etc.
         return None
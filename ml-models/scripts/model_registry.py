@@ -0,0 +1,283 @@
+"""
+Versioned model registry for the gene sequence prediction service.
+Loads artifact sets side by side, switches the active version atomically and
+shadow-scores a sampled fraction of traffic on a candidate version.
+"""
+
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Sequence, Tuple, Union
+
+from model_interface import DEFAULT_MODEL_DIR
+from marker_router import STATUS_TTL_SECONDS, MarkerRouter
+
+# Shadow jobs queued or running at once; sampled requests beyond this are skipped, not queued
+MAX_SHADOW_PENDING = 1
+
+# Version of the artifacts that live directly in Model/
+LEGACY_VERSION = "1.0.0"
+
+
+class ModelVersion:
+    """One versioned artifact set (optionally with per-marker ensembles under markers/)."""
+
+    def __init__(self, version: str, model_dir: str):
+        self.version = version
+        self.model_dir = os.path.abspath(model_dir)
+        self.router = MarkerRouter(self.model_dir, version=version)
+        self.loaded_at = None
+        self.load_seconds = None
+        self._available = False
+        self._checked_at = 0.0
+        self._load_lock = threading.Lock()
+        self.refresh_status()
+
+    def refresh_status(self) -> bool:
+        """Stat the artifact files (and re-route the markers) and cache the result."""
+        self.router.refresh()
+        self._available = self.router.is_available()
+        self._checked_at = time.monotonic()
+        return self._available
+
+    def is_available(self) -> bool:
+        """Cached availability, re-checked at most every STATUS_TTL_SECONDS."""
+        if self.router.loaded:
+            return True
+        if time.monotonic() - self._checked_at > STATUS_TTL_SECONDS:
+            self.refresh_status()
+        return self._available
+
+    @property
+    def loaded(self) -> bool:
+        return self.router.loaded
+
+    def load(self) -> "ModelVersion":
+        """Load the artifacts into memory (once)."""
+        if self.router.loaded:
+            return self
+        with self._load_lock:
+            if not self.router.loaded:
+                start = time.perf_counter()
+                self.router.load()
+                self.load_seconds = time.perf_counter() - start
+                self.loaded_at = time.time()
+        return self
+
+    def unload(self):
+        """Drop the in-memory artifacts."""
+        self.router.unload()
+        self.loaded_at = None
+
+    def predict(self, sequences: List[str],
+                sequence_type: Union[None, str, Sequence[Optional[str]]] = None) -> List[Dict[str, Any]]:
+        """Score cleaned sequences with this version, routed by marker."""
+        return self.router.predict(sequences, sequence_type)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "model_directory": self.model_dir,
+            "available": self.is_available(),
+            "loaded": self.loaded,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "markers": self.router.status()
+        }
+
+
+class ShadowStats:
+    """Latency and agreement counters for shadow scoring."""
+
+    def __init__(self, version: str, fraction: float):
+        self.version = version
+        self.fraction = fraction
+        self.started_at = time.time()
+        self.requests = 0
+        self.sequences = 0
+        self.agreements = 0
+        self.errors = 0
+        # Sampled while the shadow was still busy, so never scored
+        self.skipped = 0
+        self.primary_seconds = 0.0
+        self.shadow_seconds = 0.0
+        self.max_shadow_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, primary: List[Dict[str, Any]], shadow: List[Dict[str, Any]],
+               primary_seconds: float, shadow_seconds: float):
+        agree = sum(
+            1 for p, s in zip(primary, shadow) if p.get('predicted_species') == s.get('predicted_species')
+        )
+        with self._lock:
+            self.requests += 1
+            self.sequences += len(primary)
+            self.agreements += agree
+            self.primary_seconds += primary_seconds
+            self.shadow_seconds += shadow_seconds
+            self.max_shadow_seconds = max(self.max_shadow_seconds, shadow_seconds)
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def record_skipped(self):
+        with self._lock:
+            self.skipped += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.requests
+            return {
+                "version": self.version,
+                "fraction": self.fraction,
+                "started_at": self.started_at,
+                "requests": requests,
+                "sequences": self.sequences,
+                "errors": self.errors,
+                "skipped_busy": self.skipped,
+                "agreement_rate": (self.agreements / self.sequences) if self.sequences else None,
+                "primary_mean_ms": (self.primary_seconds / requests * 1000.0) if requests else None,
+                "shadow_mean_ms": (self.shadow_seconds / requests * 1000.0) if requests else None,
+                "shadow_max_ms": self.max_shadow_seconds * 1000.0
+            }
+
+
+class ModelRegistry:
+    """Holds every known model version and the currently active one."""
+
+    def __init__(self, base_dir: str = DEFAULT_MODEL_DIR, default_version: str = LEGACY_VERSION):
+        self.base_dir = os.path.abspath(base_dir)
+        self.default_version = default_version
+        self.versions: Dict[str, ModelVersion] = {}
+        self._active: Optional[ModelVersion] = None
+        # (candidate, its stats) as one tuple, so a reader always gets a matching pair
+        self._shadow: Optional[Tuple[ModelVersion, ShadowStats]] = None
+        self._lock = threading.Lock()
+        # Shadow scoring never runs on the request thread
+        self._shadow_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        # The pool's queue is unbounded; a slow candidate must not pile up copies of requests
+        self._shadow_slots = threading.BoundedSemaphore(MAX_SHADOW_PENDING)
+        self.discover()
+
+    def discover(self) -> List[str]:
+        """Scan Model/ and Model/versions/<version>/ for artifact sets."""
+        found = {self.default_version: self.base_dir}
+        versions_dir = os.path.join(self.base_dir, 'versions')
+        if os.path.isdir(versions_dir):
+            for name in sorted(os.listdir(versions_dir)):
+                path = os.path.join(versions_dir, name)
+                if os.path.isdir(path):
+                    found[name] = path
+
+        with self._lock:
+            for version, path in found.items():
+                existing = self.versions.get(version)
+                if existing is None or existing.model_dir != os.path.abspath(path):
+                    self.versions[version] = ModelVersion(version, path)
+                else:
+                    existing.refresh_status()
+            if self._active is None:
+                self._active = self.versions[self.default_version]
+        return list(found.keys())
+
+    @property
+    def active(self) -> ModelVersion:
+        return self._active
+
+    def get(self, version: str) -> ModelVersion:
+        if version not in self.versions:
+            raise KeyError(f"Unknown model version: {version}")
+        return self.versions[version]
+
+    def is_available(self) -> bool:
+        """Cached availability of the active version."""
+        return self._active.is_available()
+
+    def activate(self, version: str, unload_previous: bool = False) -> Dict[str, Any]:
+        """Load a version, then make it active with a single reference swap.
+
+        Requests already running keep their reference to the previous version,
+        so nothing in flight is dropped.
+        """
+        candidate = self.get(version)
+        if not candidate.refresh_status():
+            raise FileNotFoundError(f"Model files for version {version} not found in {candidate.model_dir}")
+        candidate.load()
+
+        with self._lock:
+            previous = self._active
+            self._active = candidate
+            if self._shadow is not None and self._shadow[0] is candidate:
+                self._shadow = None
+            shadow = self._shadow
+
+        if unload_previous and previous is not candidate and (shadow is None or previous is not shadow[0]):
+            previous.unload()
+        return {"active": candidate.version, "previous": previous.version if previous else None}
+
+    def set_shadow(self, version: Optional[str], fraction: float = 0.1) -> Dict[str, Any]:
+        """Shadow-score `fraction` of requests on `version` (None disables shadowing)."""
+        if version is None:
+            with self._lock:
+                self._shadow = None
+            return {"shadow": None}
+
+        if not 0.0 < fraction <= 1.0:
+            raise ValueError("Shadow fraction must be in (0, 1]")
+        candidate = self.get(version)
+        if candidate is self._active:
+            raise ValueError("Shadow version must differ from the active version")
+        if not candidate.refresh_status():
+            raise FileNotFoundError(f"Model files for version {version} not found in {candidate.model_dir}")
+        candidate.load()
+
+        with self._lock:
+            self._shadow = (candidate, ShadowStats(version, fraction))
+        return {"shadow": version, "fraction": fraction}
+
+    def predict(self, sequences: List[str],
+                sequence_type: Union[None, str, Sequence[Optional[str]]] = None) -> Dict[str, Any]:
+        """Score on the active version and maybe shadow-score on the candidate."""
+        # One read of each reference so a concurrent swap cannot mix versions
+        active = self._active
+        shadow = self._shadow
+
+        start = time.perf_counter()
+        predictions = active.predict(sequences, sequence_type)
+        primary_seconds = time.perf_counter() - start
+
+        if shadow is not None and random.random() < shadow[1].fraction:
+            if not self._shadow_slots.acquire(blocking=False):
+                shadow[1].record_skipped()
+            else:
+                try:
+                    self._shadow_pool.submit(self._score_shadow, *shadow, list(sequences), sequence_type,
+                                             predictions, primary_seconds)
+                except RuntimeError:
+                    # Pool shut down
+                    self._shadow_slots.release()
+
+        return {"version": active.version, "predictions": predictions}
+
+    def _score_shadow(self, shadow: ModelVersion, stats: ShadowStats, sequences: List[str], sequence_type,
+                      primary: List[Dict[str, Any]], primary_seconds: float):
+        try:
+            start = time.perf_counter()
+            shadow_predictions = shadow.predict(sequences, sequence_type)
+            stats.record(primary, shadow_predictions, primary_seconds, time.perf_counter() - start)
+        except Exception:
+            stats.record_error()
+        finally:
+            self._shadow_slots.release()
+
+    def status(self) -> Dict[str, Any]:
+        """Registry state for the admin endpoints."""
+        shadow = self._shadow
+        return {
+            "active": self._active.version,
+            "shadow": shadow[1].to_dict() if shadow else None,
+            "versions": [v.describe() for v in self.versions.values()]
+        }
@@ -6,55 +6,52 @@ This script provides a REST API interface for the model predictions.
 
 import os
 import sys
+import hmac
 import json
 import traceback
-from typing import Dict, List, Any
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from typing import Dict, List, Any, Optional, Union
+
+from model_interface import MODEL_INFO, NO_VALID_SEQUENCES, REQUIRED_FILES, build_response
+from marker_router import clean_marked_sequences
+from request_profiler import profiler, requested_mode
+from model_registry import ModelRegistry
 
 # Add the Model directory to the path
 model_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'Model')
 sys.path.insert(0, model_dir)
 
-try:
-    from infer_helper import predict_sequences
-except ImportError as e:
-    print(f"Warning: Could not import infer_helper: {e}")
-    predict_sequences = None
-
-app = Flask(__name__)
-CORS(app)
+# Flask, flask_cors and infer_helper (numpy/joblib) are imported on first use so
+# `--info` and other light code paths do not pay for them.
+_app = None
 
 class ModelWrapper:
     """Wrapper class for the gene sequence prediction model."""
     
     def __init__(self):
-        self.model_loaded = False
-        self.model_info = {
-            "name": "Gene Sequence Species Classifier",
-            "version": "1.0.0",
-            "description": "Stacked ensemble model for species identification from gene sequences",
-            "supported_genes": ["COI", "16S", "18S", "ITS", "General"],
-            "model_type": "Stacked Ensemble (LightGBM + XGBoost + Meta Classifier)"
-        }
+        self.registry = ModelRegistry(model_dir)
+        self.base_info = {k: v for k, v in MODEL_INFO.items() if k != "version"}
+    
+    @property
+    def model_loaded(self) -> bool:
+        return self.registry.active.loaded
+    
+    @property
+    def model_info(self) -> Dict[str, Any]:
+        """Model description, including the currently active version."""
+        return {**self.base_info, "version": self.registry.active.version}
+    
+    def memory_report(self) -> Dict[str, Any]:
+        """Process RSS and per-artifact bytes of the loaded ensembles of the active version."""
+        from memory_accounting import rss_bytes
+        return {"process_rss_bytes": rss_bytes(), "ensembles": self.registry.active.router.memory()}
     
     def is_model_available(self) -> bool:
-        """Check if the model files are available."""
-        required_files = [
-            'stack_meta_clf.pkl',
-            'stack_label_encoder.pkl', 
-            'lgb_models_list.pkl',
-            'xgb_models_list.pkl'
-        ]
-        
-        for file in required_files:
-            file_path = os.path.join(model_dir, file)
-            if not os.path.exists(file_path):
-                return False
-        return True
+        """Check if the model files are available (cached by the registry)."""
+        return self.registry.is_available()
     
-    def predict_species(self, sequences: List[str]) -> Dict[str, Any]:
-        """Predict species from gene sequences."""
+    def predict_species(self, sequences: List[str],
+                        sequence_type: Union[None, str, List[Optional[str]]] = None) -> Dict[str, Any]:
+        """Predict species from gene sequences (one marker for the batch or one per sequence)."""
         if not self.is_model_available():
             return {
                 "success": False,
@@ -62,52 +59,22 @@ class ModelWrapper:
                 "message": "Please ensure all model files are in the Model directory"
             }
         
-        if not predict_sequences:
-            return {
-                "success": False,
-                "error": "Model inference function not available",
-                "message": "Could not import predict_sequences function"
-            }
-        
         try:
-            # Validate sequences
-            valid_sequences = []
-            for seq in sequences:
-                if seq and isinstance(seq, str) and len(seq.strip()) > 0:
-                    # Basic validation - should contain only ATGC characters
-                    seq_clean = seq.strip().upper()
-                    if all(c in 'ATGC' for c in seq_clean):
-                        valid_sequences.append(seq_clean)
+            pairs = clean_marked_sequences(sequences, sequence_type)
+            if not pairs:
+                return dict(NO_VALID_SEQUENCES)
             
-            if not valid_sequences:
+            # Make predictions on the active version, routed by marker
+            try:
+                scored = self.registry.predict([s for s, _ in pairs], [m for _, m in pairs])
+            except ImportError:
                 return {
                     "success": False,
-                    "error": "No valid sequences provided",
-                    "message": "Sequences must contain only A, T, G, C characters"
+                    "error": "Model inference function not available",
+                    "message": "Could not import predict_sequences function"
                 }
             
-            # Make predictions
-            predictions = predict_sequences(valid_sequences)
-            
-            # Format results
-            results = []
-            for i, pred in enumerate(predictions):
-                result = {
-                    "sequence_id": f"seq_{i+1}",
-                    "sequence_length": len(valid_sequences[i]),
-                    "predicted_species": pred.get('pred_label', 'Unknown'),
-                    "confidence": max(pred.get('prob_vector', [0.0])),
-                    "probability_distribution": pred.get('prob_vector', []),
-                    "sequence_preview": valid_sequences[i][:50] + "..." if len(valid_sequences[i]) > 50 else valid_sequences[i]
-                }
-                results.append(result)
-            
-            return {
-                "success": True,
-                "predictions": results,
-                "model_info": self.model_info,
-                "total_sequences": len(results)
-            }
+            return build_response(scored["predictions"], {**self.base_info, "version": scored["version"]})
             
         except Exception as e:
             return {
@@ -120,18 +87,25 @@ class ModelWrapper:
 # Global model wrapper instance
 model_wrapper = ModelWrapper()
 
-@app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
+    from flask import jsonify
     return jsonify({
         "status": "healthy",
         "model_available": model_wrapper.is_model_available(),
         "model_info": model_wrapper.model_info
     })
 
-@app.route('/predict', methods=['POST'])
+def request_markers(data: Dict[str, Any]):
+    """Per-sequence `sequenceTypes` list, else the batch-wide `sequenceType`."""
+    markers = data.get('sequenceTypes') or data.get('sequence_types')
+    if isinstance(markers, list):
+        return markers
+    return data.get('sequenceType') or data.get('sequence_type')
+
 def predict():
     """Main prediction endpoint."""
+    from flask import request, jsonify
     try:
         data = request.get_json()
         
@@ -151,7 +125,13 @@ def predict():
         if isinstance(sequences, str):
             sequences = [sequences]
         
-        result = model_wrapper.predict_species(sequences)
+        result, profile_id = profiler.call(
+            model_wrapper.predict_species, sequences, request_markers(data),
+            mode=_profile_mode(), label="predict",
+            metadata={"sequences": len(sequences), "remote_addr": request.remote_addr}
+        )
+        if profile_id:
+            result["profile_id"] = profile_id
         
         if result['success']:
             return jsonify(result)
@@ -165,24 +145,188 @@ def predict():
             "message": "Internal server error"
         }), 500
 
-@app.route('/model-info', methods=['GET'])
 def model_info():
     """Get model information."""
+    from flask import jsonify
     return jsonify({
         "model_info": model_wrapper.model_info,
         "model_available": model_wrapper.is_model_available(),
-        "required_files": [
-            'stack_meta_clf.pkl',
-            'stack_label_encoder.pkl',
-            'lgb_models_list.pkl', 
-            'xgb_models_list.pkl'
-        ]
+        "required_files": REQUIRED_FILES,
+        "memory": model_wrapper.memory_report()
     })
 
+LOOPBACK_ADDRS = ('127.0.0.1', '::1')
+
+def _admin_allowed() -> bool:
+    """Whether the request may use admin features: the admin token when one is configured, else loopback only."""
+    from flask import request
+    expected = os.environ.get('MODEL_ADMIN_TOKEN')
+    if expected:
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', ''), expected)
+    return request.remote_addr in LOOPBACK_ADDRS
+
+def _check_admin():
+    """Return an error response unless the request is allowed to use the admin endpoints."""
+    from flask import jsonify
+    if not _admin_allowed():
+        return jsonify({"success": False, "error": "Unauthorized"}), 401
+    return None
+
+def _profile_mode():
+    """Profiler requested by this request; honoured only for callers allowed on the admin endpoints."""
+    from flask import request
+    if not _admin_allowed():
+        return None
+    return requested_mode(request.headers, request.args)
+
+def admin_models():
+    """List model versions, the active one and shadow statistics."""
+    from flask import jsonify
+    denied = _check_admin()
+    if denied:
+        return denied
+    return jsonify({"success": True, **model_wrapper.registry.status()})
+
+def admin_reload():
+    """Rescan the model directory for new versions."""
+    from flask import jsonify
+    denied = _check_admin()
+    if denied:
+        return denied
+    versions = model_wrapper.registry.discover()
+    return jsonify({"success": True, "versions": versions})
+
+def admin_activate():
+    """Atomically switch the active model version."""
+    from flask import request, jsonify
+    denied = _check_admin()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    version = data.get('version')
+    if not version:
+        return jsonify({"success": False, "error": "No version provided"}), 400
+    try:
+        result = model_wrapper.registry.activate(version, unload_previous=bool(data.get('unload_previous')))
+    except KeyError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except FileNotFoundError as e:
+        # A known version whose artifact files are missing: the request cannot be served as asked
+        return jsonify({"success": False, "error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e), "message": "Activation failed"}), 500
+    return jsonify({"success": True, **result})
+
+def admin_shadow():
+    """Start or stop shadow scoring on a candidate version."""
+    from flask import request, jsonify
+    denied = _check_admin()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    try:
+        result = model_wrapper.registry.set_shadow(data.get('version'), float(data.get('fraction', 0.1)))
+    except KeyError as e:
+        return jsonify({"success": False, "error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"success": False, "error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e), "message": "Shadow setup failed"}), 500
+    return jsonify({"success": True, **result})
+
+def admin_profiles():
+    """List recent request profiles."""
+    from flask import jsonify
+    denied = _check_admin()
+    if denied:
+        return denied
+    return jsonify({"success": True, "profile_dir": profiler.profile_dir, "profiles": profiler.list()})
+
+def admin_profile(profile_id: str):
+    """Fetch one profile: metadata (default), ?format=txt, prof or html."""
+    from flask import request, jsonify, send_file
+    denied = _check_admin()
+    if denied:
+        return denied
+    kind = request.args.get('format', 'json')
+    path = profiler.path(profile_id, kind)
+    if path is None:
+        return jsonify({"success": False, "error": f"Profile not found: {profile_id} ({kind})"}), 404
+    if kind == 'json':
+        return jsonify({"success": True, **profiler.get(profile_id)})
+    return send_file(path, as_attachment=(kind == 'prof'))
+
+def get_model_info() -> Dict[str, Any]:
+    """Get model information without starting the server."""
+    return {
+        "model_info": model_wrapper.model_info,
+        "model_available": model_wrapper.is_model_available(),
+        "model_directory": os.path.abspath(model_dir),
+        "versions": [v.describe() for v in model_wrapper.registry.versions.values()]
+    }
+
+def create_app():
+    """Create the Flask application."""
+    from flask import Flask
+    from flask_cors import CORS
+
+    app = Flask(__name__)
+    CORS(app)
+    app.add_url_rule('/health', view_func=health_check, methods=['GET'])
+    app.add_url_rule('/predict', view_func=predict, methods=['POST'])
+    app.add_url_rule('/model-info', view_func=model_info, methods=['GET'])
+    app.add_url_rule('/admin/models', view_func=admin_models, methods=['GET'])
+    app.add_url_rule('/admin/models/reload', view_func=admin_reload, methods=['POST'])
+    app.add_url_rule('/admin/models/activate', view_func=admin_activate, methods=['POST'])
+    app.add_url_rule('/admin/models/shadow', view_func=admin_shadow, methods=['POST'])
+    app.add_url_rule('/admin/profiles', view_func=admin_profiles, methods=['GET'])
+    app.add_url_rule('/admin/profiles/<profile_id>', view_func=admin_profile, methods=['GET'])
+    return app
+
+def __getattr__(name):
+    """Build the Flask app lazily so `from model_wrapper import app` keeps working."""
+    global _app
+    if name == 'app':
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 if __name__ == '__main__':
+    import argparse
+    from cli_profiling import add_profile_arguments, exit_if_profiling_startup
+
+    exit_if_profiling_startup(__file__)
+
+    parser = argparse.ArgumentParser(description="Gene Sequence Prediction API")
+    parser.add_argument("--info", action="store_true", help="Show model info and exit")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind (0.0.0.0 to accept remote clients)")
+    parser.add_argument("--port", type=int, default=5000, help="Port to bind")
+    parser.add_argument("--no-debug", action="store_true", help="Disable the Flask debugger and reloader")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Serve with N pre-forked worker processes (production mode) instead of the dev server")
+    parser.add_argument("--max-requests", type=int, default=0,
+                        help="With --workers, recycle a worker after this many requests")
+    add_profile_arguments(parser, predict=False)
+    args = parser.parse_args()
+
+    if args.info:
+        print(json.dumps(get_model_info(), indent=2))
+        sys.exit(0)
+
+    if args.workers > 0:
+        from serve_prefork import serve
+        serve(host=args.host, port=args.port, workers=args.workers, max_requests=args.max_requests)
+        sys.exit(0)
+
     print("Starting Gene Sequence Prediction API...")
     print(f"Model directory: {model_dir}")
     print(f"Model available: {model_wrapper.is_model_available()}")
+    if model_wrapper.is_model_available():
+        # Load the active version up front so the first request is not a cold start
+        model_wrapper.registry.active.load()
     
     # Run the Flask app
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    create_app().run(host=args.host, port=args.port, debug=not args.no_debug)
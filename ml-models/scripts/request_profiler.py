@@ -0,0 +1,221 @@
+"""
+Opt-in per-request profiling for the prediction service.
+A request is profiled when it asks for it (X-Profile header or ?profile=1) or is
+picked by MODEL_PROFILE_SAMPLE_RATE. The call runs under cProfile (pyinstrument
+when installed and requested) and tracemalloc. Results go to a rotating local
+directory. Requests that are not profiled call straight through.
+"""
+
+import os
+import io
+import json
+import time
+import uuid
+import random
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PROFILE_DIR = os.environ.get(
+    'MODEL_PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'profiles')
+)
+# Profiles kept on disk; older ones are deleted
+PROFILE_KEEP = int(os.environ.get('MODEL_PROFILE_KEEP', 50))
+# Fraction of requests profiled without being asked
+SAMPLE_RATE = float(os.environ.get('MODEL_PROFILE_SAMPLE_RATE', 0.0))
+# Frames kept per allocation site in tracemalloc snapshots
+TRACEMALLOC_FRAMES = 10
+TOP_N = 40
+
+_TRUE_VALUES = {'1', 'true', 'yes', 'on', 'cprofile', 'pyinstrument'}
+
+
+def requested_mode(headers: Any = None, query: Any = None) -> Optional[str]:
+    """Profiler asked for by the X-Profile header or ?profile= flag, if any."""
+    value = None
+    if headers is not None:
+        value = headers.get('X-Profile')
+    if not value and query is not None:
+        value = query.get('profile')
+    if not value:
+        return None
+    value = str(value).strip().lower()
+    if value not in _TRUE_VALUES:
+        return None
+    return 'pyinstrument' if value == 'pyinstrument' else 'cprofile'
+
+
+class RequestProfiler:
+    """Runs calls under a profiler and keeps the newest reports on disk."""
+
+    def __init__(self, profile_dir: str = PROFILE_DIR, keep: int = PROFILE_KEEP,
+                 sample_rate: float = SAMPLE_RATE):
+        self.profile_dir = os.path.abspath(profile_dir)
+        self.keep = keep
+        self.sample_rate = sample_rate
+        # cProfile and tracemalloc are process-wide: one profiled call at a time
+        self._busy = threading.Lock()
+        self.skipped = 0
+
+    def select(self, mode: Optional[str] = None) -> Optional[str]:
+        """Profiler to use for this call: the requested one, a sampled cProfile, or None."""
+        if mode:
+            return mode
+        if self.sample_rate > 0.0 and random.random() < self.sample_rate:
+            return 'cprofile'
+        return None
+
+    def call(self, fn: Callable, *args, mode: Optional[str] = None, label: str = "",
+             metadata: Optional[Dict[str, Any]] = None, **kwargs) -> Tuple[Any, Optional[str]]:
+        """Run fn(*args, **kwargs), profiled when selected. Returns (result, profile_id or None)."""
+        mode = self.select(mode)
+        if mode is None:
+            return fn(*args, **kwargs), None
+        if not self._busy.acquire(blocking=False):
+            # Another request is being profiled; serve this one unprofiled
+            self.skipped += 1
+            return fn(*args, **kwargs), None
+        try:
+            return self._profile(fn, args, kwargs, mode, label, metadata or {})
+        finally:
+            self._busy.release()
+
+    def _profile(self, fn, args, kwargs, mode, label, metadata) -> Tuple[Any, str]:
+        import tracemalloc
+
+        now = time.time()
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}.{int(now * 1e6) % 1000000:06d}" \
+                     f"-{uuid.uuid4().hex[:6]}"
+        base = os.path.join(self.profile_dir, profile_id)
+        os.makedirs(self.profile_dir, exist_ok=True)
+
+        profiler = None
+        if mode == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+                profiler = Profiler()
+            except ImportError:
+                mode = 'cprofile'
+        if profiler is None:
+            import cProfile
+            profiler = cProfile.Profile()
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+
+        error = None
+        start = time.perf_counter()
+        wall_start = time.time()
+        if mode == 'pyinstrument':
+            profiler.start()
+        else:
+            profiler.enable()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            error = e
+            result = None
+        finally:
+            if mode == 'pyinstrument':
+                profiler.stop()
+            else:
+                profiler.disable()
+            duration = time.perf_counter() - start
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+        files = {}
+        if mode == 'pyinstrument':
+            files["html"] = base + '.html'
+            with open(files["html"], 'w') as f:
+                f.write(profiler.output_html())
+            report = profiler.output_text(unicode=False, color=False)
+        else:
+            import pstats
+            files["prof"] = base + '.prof'
+            profiler.dump_stats(files["prof"])
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(TOP_N)
+            report = out.getvalue()
+
+        allocations = [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_diff_bytes": stat.size_diff,
+                "count_diff": stat.count_diff
+            }
+            for stat in after.compare_to(before, 'lineno')[:TOP_N]
+        ]
+
+        files["txt"] = base + '.txt'
+        with open(files["txt"], 'w') as f:
+            f.write(report)
+
+        meta = {
+            "id": profile_id,
+            "label": label,
+            "profiler": mode,
+            "started_at": wall_start,
+            "duration_ms": duration * 1000.0,
+            "error": str(error) if error else None,
+            "peak_traced_bytes": peak,
+            "retained_traced_bytes": current,
+            "top_allocations": allocations,
+            "files": {kind: os.path.basename(path) for kind, path in files.items()},
+            **metadata
+        }
+        with open(base + '.json', 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        self._rotate()
+        if error is not None:
+            raise error
+        return result, profile_id
+
+    def _rotate(self):
+        """Delete all but the newest `keep` profiles."""
+        ids = self._ids()
+        for old in ids[:-self.keep] if self.keep > 0 else []:
+            for ext in ('.json', '.txt', '.prof', '.html'):
+                try:
+                    os.remove(os.path.join(self.profile_dir, old + ext))
+                except OSError:
+                    pass
+
+    def _ids(self) -> List[str]:
+        """Stored profile ids, oldest first (ids start with a timestamp)."""
+        if not os.path.isdir(self.profile_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.profile_dir) if name.endswith('.json'))
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored profiles, newest first."""
+        summaries = []
+        for profile_id in reversed(self._ids()):
+            meta = self.get(profile_id)
+            if meta:
+                summaries.append({k: v for k, v in meta.items() if k != "top_allocations"})
+        return summaries
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """Metadata of one profile, or None."""
+        path = self.path(profile_id, 'json')
+        if path is None:
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def path(self, profile_id: str, kind: str) -> Optional[str]:
+        """File of one profile ('json', 'txt', 'prof' or 'html'), or None."""
+        if os.path.basename(profile_id) != profile_id or kind not in ('json', 'txt', 'prof', 'html'):
+            return None
+        path = os.path.join(self.profile_dir, f"{profile_id}.{kind}")
+        return path if os.path.exists(path) else None
+
+
+# Global profiler instance
+profiler = RequestProfiler()
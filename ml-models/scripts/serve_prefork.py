@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Pre-fork production server for the gene sequence prediction API.
+Models are loaded once in the master process, the heap is frozen with
+gc.freeze() and N workers are forked so they share the model memory
+copy-on-write. Workers are recycled gracefully after a number of requests or
+on SIGHUP without dropping queued connections. Workers that keep crashing soon
+after start are respawned with an exponential backoff.
+"""
+
+import os
+import gc
+import sys
+import time
+import random
+import signal
+import socket
+import select
+from socketserver import BaseServer
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler
+from typing import Callable, Dict, Any, List, Optional
+
+# A worker that crashes within this many seconds of starting counts as crash-looping
+MIN_HEALTHY_UPTIME = 5.0
+CRASH_BACKOFF_START = 0.5
+CRASH_BACKOFF_MAX = 30.0
+
+
+class _QuietHandler(WSGIRequestHandler):
+    """Request handler without per-request stderr logging."""
+
+    access_log = False
+
+    def log_message(self, format, *args):
+        if self.access_log:
+            super().log_message(format, *args)
+
+
+class _InheritedSocketServer(WSGIServer):
+    """WSGIServer that serves on a listening socket created by the master."""
+
+    def __init__(self, listen_sock: socket.socket, handler_class=_QuietHandler):
+        BaseServer.__init__(self, listen_sock.getsockname(), handler_class)
+        self.socket = listen_sock
+        self.server_bind_from_socket()
+
+    def server_bind_from_socket(self):
+        host, port = self.socket.getsockname()[:2]
+        self.server_name = socket.getfqdn(host)
+        self.server_port = port
+        self.setup_environ()
+
+
+class PreforkServer:
+    """Master process that owns the listening socket and supervises workers."""
+
+    def __init__(self, app_factory: Callable[[], Any], host: str = '127.0.0.1', port: int = 5000,
+                 workers: int = 2, max_requests: int = 0, max_requests_jitter: int = 0,
+                 preload: Optional[Callable[[], None]] = None, backlog: int = 1024,
+                 graceful_timeout: float = 30.0, access_log: bool = False):
+        self.app_factory = app_factory
+        self.host = host
+        self.port = port
+        self.num_workers = max(1, workers)
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.preload = preload
+        self.backlog = backlog
+        self.graceful_timeout = graceful_timeout
+        self.access_log = access_log
+
+        self.app = None
+        self.listen_sock = None
+        self.workers: Dict[int, float] = {}  # pid -> start time
+        self.recycle_queue = []
+        self.recycling_pid = None
+        self.respawn_at: List[float] = []
+        self.crash_backoff = 0.0
+        self.stopping = False
+        self.stats = {"spawned": 0, "recycled": 0, "crashed": 0}
+
+    # ----- master -----
+
+    def _bind(self):
+        sock = socket.create_server((self.host, self.port), backlog=self.backlog, reuse_port=False)
+        # Non-blocking accept: workers that lose the race for a connection just go back to select()
+        sock.setblocking(False)
+        self.listen_sock = sock
+        self.port = sock.getsockname()[1]
+
+    def _preload(self):
+        """Load models and build the app once, then freeze the heap before forking."""
+        start = time.perf_counter()
+        if self.preload:
+            self.preload()
+        self.app = self.app_factory()
+        # Move everything allocated so far into the permanent generation so the
+        # cyclic GC in the workers never touches (and dirties) the shared pages.
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
+        print(f"[master {os.getpid()}] preloaded in {time.perf_counter() - start:.2f}s", flush=True)
+
+    def _spawn_worker(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._worker_main()
+            except Exception as e:
+                print(f"[worker {os.getpid()}] crashed: {e}", file=sys.stderr, flush=True)
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[pid] = time.time()
+        self.stats["spawned"] += 1
+        return pid
+
+    def _reap(self):
+        """Collect exited workers and replace them unless the master is stopping."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid not in self.workers:
+                continue
+            started = self.workers.pop(pid)
+            if pid == self.recycling_pid:
+                self.recycling_pid = None
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code == 0:
+                self.stats["recycled"] += 1
+                self.crash_backoff = 0.0
+            else:
+                self.stats["crashed"] += 1
+                if time.time() - started < MIN_HEALTHY_UPTIME:
+                    self.crash_backoff = min(self.crash_backoff * 2 or CRASH_BACKOFF_START, CRASH_BACKOFF_MAX)
+                else:
+                    self.crash_backoff = 0.0
+                print(f"[master] worker {pid} exited with {exit_code}"
+                      f"{f', respawning in {self.crash_backoff:.1f}s' if self.crash_backoff else ''}",
+                      file=sys.stderr, flush=True)
+            if not self.stopping:
+                self.respawn_at.append(time.time() + (0.0 if exit_code == 0 else self.crash_backoff))
+
+    def _respawn_due(self):
+        """Start replacement workers whose backoff has elapsed."""
+        now = time.time()
+        due = [at for at in self.respawn_at if at <= now]
+        self.respawn_at = [at for at in self.respawn_at if at > now]
+        for _ in due:
+            self._spawn_worker()
+
+    def _on_hup(self, signum, frame):
+        """Queue a rolling restart of every worker."""
+        self.recycle_queue = list(self.workers.keys())
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _advance_recycle(self):
+        """Recycle one worker at a time so capacity never drops by more than one."""
+        if self.recycling_pid is not None or not self.recycle_queue:
+            return
+        pid = self.recycle_queue.pop(0)
+        if pid in self.workers:
+            self.recycling_pid = pid
+            os.kill(pid, signal.SIGTERM)
+
+    def _shutdown(self):
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.time() + self.graceful_timeout
+        while self.workers and time.time() < deadline:
+            self._reap()
+            time.sleep(0.05)
+        for pid in list(self.workers):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self._reap()
+        self.listen_sock.close()
+
+    def run(self):
+        self._bind()
+        self._preload()
+
+        signal.signal(signal.SIGHUP, self._on_hup)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        for _ in range(self.num_workers):
+            self._spawn_worker()
+        print(f"[master {os.getpid()}] serving on http://{self.host}:{self.port} "
+              f"with {self.num_workers} workers", flush=True)
+
+        while not self.stopping:
+            self._reap()
+            self._respawn_due()
+            self._advance_recycle()
+            time.sleep(0.1)
+
+        self._shutdown()
+        print(f"[master] stopped ({self.stats})", flush=True)
+
+    # ----- worker -----
+
+    def _worker_main(self):
+        # Master signal handlers are not wanted here
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        state = {"stopping": False}
+        signal.signal(signal.SIGTERM, lambda signum, frame: state.update(stopping=True))
+
+        # Different seeds per worker (random.random() is used for shadow sampling)
+        random.seed()
+
+        _QuietHandler.access_log = self.access_log
+        server = _InheritedSocketServer(self.listen_sock)
+        server.set_app(self.app)
+
+        limit = self.max_requests
+        if limit and self.max_requests_jitter:
+            limit += random.randint(0, self.max_requests_jitter)
+
+        handled = 0
+        while not state["stopping"]:
+            try:
+                ready, _, _ = select.select([self.listen_sock], [], [], 1.0)
+            except InterruptedError:
+                continue
+            if not ready:
+                continue
+            try:
+                request, client_address = self.listen_sock.accept()
+            except (BlockingIOError, InterruptedError):
+                # Another worker took the connection
+                continue
+            request.setblocking(True)
+            if server.verify_request(request, client_address):
+                try:
+                    server.process_request(request, client_address)
+                except Exception:
+                    server.handle_error(request, client_address)
+                    server.shutdown_request(request)
+            else:
+                server.shutdown_request(request)
+            handled += 1
+            if limit and handled >= limit:
+                break
+
+
+def serve(host: str = '127.0.0.1', port: int = 5000, workers: int = 2, max_requests: int = 0,
+          max_requests_jitter: int = 0, access_log: bool = False):
+    """Serve model_wrapper's Flask app with preloaded, copy-on-write shared models."""
+    import model_wrapper
+
+    def preload():
+        registry = model_wrapper.model_wrapper.registry
+        if registry.is_available():
+            registry.active.load()
+        else:
+            print("[master] model files not found; serving without a loaded model", flush=True)
+
+    server = PreforkServer(model_wrapper.create_app, host=host, port=port, workers=workers,
+                           max_requests=max_requests, max_requests_jitter=max_requests_jitter,
+                           preload=preload, access_log=access_log)
+    server.run()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pre-fork server for the Gene Sequence Prediction API")
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind (0.0.0.0 to accept remote clients)")
+    parser.add_argument("--port", type=int, default=5000, help="Port to bind (0 picks a free port)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Number of worker processes")
+    parser.add_argument("--max-requests", type=int, default=0,
+                        help="Recycle a worker after this many requests (0 disables)")
+    parser.add_argument("--max-requests-jitter", type=int, default=0,
+                        help="Random extra requests per worker so recycles do not line up")
+    parser.add_argument("--access-log", action="store_true", help="Log every request to stderr")
+    args = parser.parse_args()
+
+    serve(host=args.host, port=args.port, workers=args.workers, max_requests=args.max_requests,
+          max_requests_jitter=args.max_requests_jitter, access_log=args.access_log)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Startup-time profiler for the Python entry points.
+Re-runs an entry point under `python -X importtime` and prints an import-time
+breakdown, so slow imports on the per-request Next.js spawn path are visible.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import subprocess
+from typing import Dict, List, Any, Optional
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$')
+
+# Arguments that select the light path every entry point must keep cheap
+LIGHT_ARGS = ['--info']
+# Modules that must never be imported on the `--info` path
+HEAVY_MODULES = ['numpy', 'pandas', 'joblib', 'sklearn', 'xgboost', 'lightgbm', 'flask', 'flask_cors']
+
+
+def parse_importtime(stderr: str) -> List[Dict[str, Any]]:
+    """Parse `-X importtime` output into a list of module timings (microseconds)."""
+    entries = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        entries.append({
+            "module": module,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            # The first level is indented by a single space after the bar
+            "depth": (len(indent) - 1) // 2
+        })
+    return entries
+
+
+def summarize_imports(entries: List[Dict[str, Any]], top: int = 15) -> Dict[str, Any]:
+    """Group import timings by top-level package."""
+    packages: Dict[str, int] = {}
+    for entry in entries:
+        if entry["depth"] != 0:
+            continue
+        package = entry["module"].split('.')[0]
+        packages[package] = packages.get(package, 0) + entry["cumulative_us"]
+
+    total_us = sum(packages.values())
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    imported = {entry["module"].split('.')[0] for entry in entries}
+    return {
+        "total_import_ms": total_us / 1000.0,
+        "modules_imported": len(entries),
+        "top_packages": [
+            {"package": name, "cumulative_ms": us / 1000.0} for name, us in ranked[:top]
+        ],
+        "heavy_modules_loaded": [name for name in HEAVY_MODULES if name in imported]
+    }
+
+
+def profile_startup(script_path: str, script_args: Optional[List[str]] = None,
+                    budget_ms: Optional[float] = None, top: int = 15) -> Dict[str, Any]:
+    """Run an entry point under `-X importtime` and return the startup breakdown."""
+    script_args = list(script_args or ['--info'])
+    command = [sys.executable, '-X', 'importtime', os.path.abspath(script_path)] + script_args
+
+    start = time.perf_counter()
+    proc = subprocess.run(command, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000.0
+
+    # Interpreter start-up alone, so the report shows what the script adds on top
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], capture_output=True)
+    baseline_ms = (time.perf_counter() - start) * 1000.0
+
+    report = summarize_imports(parse_importtime(proc.stderr), top=top)
+    # Prediction paths load the heavy modules by design; `--info` must not
+    heavy_forbidden = script_args == LIGHT_ARGS and bool(report["heavy_modules_loaded"])
+    report.update({
+        "script": os.path.abspath(script_path),
+        "args": script_args,
+        "exit_code": proc.returncode,
+        "wall_ms": wall_ms,
+        "interpreter_baseline_ms": baseline_ms,
+        "budget_ms": budget_ms,
+        "within_budget": (budget_ms is None or wall_ms <= budget_ms) and not heavy_forbidden
+    })
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """Render a startup report as a human readable table."""
+    lines = [
+        f"Startup profile: {os.path.basename(report['script'])} {' '.join(report['args'])}",
+        f"  wall time:            {report['wall_ms']:8.1f} ms",
+        f"  interpreter baseline: {report['interpreter_baseline_ms']:8.1f} ms",
+        f"  imports (cumulative): {report['total_import_ms']:8.1f} ms across {report['modules_imported']} modules",
+        "",
+        f"  {'package':<28}{'cumulative ms':>14}"
+    ]
+    for item in report["top_packages"]:
+        lines.append(f"  {item['package']:<28}{item['cumulative_ms']:>14.1f}")
+    heavy = report["heavy_modules_loaded"]
+    lines.append("")
+    lines.append(f"  heavy modules loaded: {', '.join(heavy) if heavy else 'none'}")
+    if report["args"] == LIGHT_ARGS and heavy:
+        lines.append("  heavy modules on the --info path -> FAIL")
+    if report["budget_ms"] is not None:
+        status = "OK" if report["wall_ms"] <= report["budget_ms"] else "OVER BUDGET"
+        lines.append(f"  budget: {report['budget_ms']:.0f} ms -> {status}")
+    return "\n".join(lines)
+
+
+def run_from_cli(script_path: str, argv: List[str]) -> int:
+    """Handle `--profile-startup [--startup-budget-ms N] [--json] [script args]` for an entry point."""
+    args = [a for a in argv if a != '--profile-startup']
+    budget_ms = None
+    as_json = False
+    if '--json' in args:
+        args.remove('--json')
+        as_json = True
+    if '--startup-budget-ms' in args:
+        idx = args.index('--startup-budget-ms')
+        budget_ms = float(args[idx + 1])
+        del args[idx:idx + 2]
+
+    report = profile_startup(script_path, args or ['--info'], budget_ms=budget_ms)
+    if as_json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+    return 0 if report["within_budget"] and report["exit_code"] == 0 else 1
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import-time breakdown for a Python entry point")
+    parser.add_argument("script", help="Entry point to profile, e.g. lib/model-predictor.py")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail if wall time exceeds this budget")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("script_args", nargs=argparse.REMAINDER, help="Arguments for the script (default: --info)")
+
+    args = parser.parse_args()
+    result = profile_startup(args.script, args.script_args or ['--info'], budget_ms=args.budget_ms)
+    print(json.dumps(result, indent=2) if args.json else format_report(result))
+    sys.exit(0 if result["within_budget"] and result["exit_code"] == 0 else 1)
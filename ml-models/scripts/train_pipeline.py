@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Training pipeline for the stacked-ensemble taxa classifier.
+Scripted version of the notebook recipe (LightGBM + XGBoost per CV fold, then a
+logistic-regression meta classifier on the out-of-fold predictions). Features
+come from infer_helper.featurize, the same code used at inference, and are
+cached as memory-mapped .npy files keyed by a hash of the dataset. CV folds
+train in parallel worker processes that share the cached matrix through mmap.
+
+Writes lgb_models_list.pkl, xgb_models_list.pkl, stack_meta_clf.pkl,
+stack_label_encoder.pkl and stack_oof_predictions.csv, the files
+infer_helper.predict_sequences loads.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+from model_interface import DEFAULT_MODEL_DIR, REQUIRED_FILES
+
+SEED = 42
+# Bump when infer_helper.featurize changes so stale caches are not reused
+FEATURE_VERSION = "emb256-k3-k4-scalar6-v1"
+EMBEDDING_DIM = 256
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cache', 'features')
+
+LGB_PARAMS = {
+    'objective': 'multiclass',
+    'learning_rate': 0.05,
+    'num_leaves': 128,
+    'metric': 'multi_logloss',
+    'verbosity': -1,
+    'seed': SEED
+}
+XGB_PARAMS = {
+    'objective': 'multi:softprob',
+    'eta': 0.05,
+    'max_depth': 8,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'verbosity': 0,
+    'seed': SEED
+}
+LGB_ROUNDS = 1000
+XGB_ROUNDS = 800
+EARLY_STOPPING_ROUNDS = 50
+
+
+# ----- data -----
+
+def load_dataset(reads_path: str, labels_path: Optional[str] = None,
+                 sequence_col: str = 'sequence', label_col: str = 'label') -> Tuple[List[str], List[str]]:
+    """Reads and labels from .npy pairs (as produced by the notebook QC step) or a CSV/TSV file."""
+    import numpy as np
+
+    if reads_path.endswith('.npy'):
+        if not labels_path:
+            raise ValueError("--labels is required with a .npy reads file")
+        reads = [str(s) for s in np.load(reads_path, allow_pickle=True)]
+        labels = [str(l) for l in np.load(labels_path, allow_pickle=True)]
+    else:
+        import pandas as pd
+        sep = '\t' if reads_path.endswith(('.tsv', '.txt')) else ','
+        df = pd.read_csv(reads_path, sep=sep, dtype=str, keep_default_na=False)
+        reads = df[sequence_col].tolist()
+        labels = df[label_col].tolist()
+
+    if len(reads) != len(labels):
+        raise ValueError(f"reads/labels length mismatch: {len(reads)} vs {len(labels)}")
+    return reads, labels
+
+
+def synthetic_dataset(n_classes: int = 6, per_class: int = 60, length: int = 300,
+                      seed: int = SEED) -> Tuple[List[str], List[str]]:
+    """Random reads with a class-specific base composition and motif, for offline runs."""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    bases = np.array(list('ACGT'))
+    reads, labels = [], []
+    for c in range(n_classes):
+        composition = rng.dirichlet(np.ones(4) * 4)
+        motif = ''.join(rng.choice(bases, size=8))
+        for _ in range(per_class):
+            n = int(rng.integers(length // 2, length + 1))
+            seq = ''.join(rng.choice(bases, size=n, p=composition))
+            pos = int(rng.integers(0, max(1, n - len(motif))))
+            reads.append(seq[:pos] + motif + seq[pos + len(motif):])
+            labels.append(f"synthetic_species_{c}")
+    return reads, labels
+
+
+# ----- features -----
+
+def dataset_hash(reads: List[str], embeddings_path: Optional[str] = None) -> str:
+    """Key for the feature cache: the reads, the embeddings file and the featurizer version."""
+    h = hashlib.sha256(FEATURE_VERSION.encode())
+    for seq in reads:
+        h.update(seq.encode())
+        h.update(b'\n')
+    if embeddings_path:
+        st = os.stat(embeddings_path)
+        h.update(f"{os.path.abspath(embeddings_path)}:{st.st_size}:{st.st_mtime_ns}".encode())
+    return h.hexdigest()[:16]
+
+
+def _featurize_chunk(args) -> Tuple[int, Any]:
+    from infer_helper import featurize
+    start, seqs, emb = args
+    return start, featurize(seqs, emb)
+
+
+def build_features(reads: List[str], cache_dir: str = DEFAULT_CACHE_DIR,
+                   embeddings_path: Optional[str] = None, workers: int = 1,
+                   chunk_size: int = 2048) -> Tuple[str, bool]:
+    """Path of the cached feature matrix for `reads`, building it if needed.
+
+    Returns (path, cache_hit). The matrix is written through a memmap and
+    renamed into place, so an interrupted run never leaves a partial cache file.
+    """
+    import numpy as np
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"features_{dataset_hash(reads, embeddings_path)}.npy")
+    if os.path.exists(path):
+        return path, True
+
+    emb = np.load(embeddings_path, mmap_mode='r') if embeddings_path else None
+    if emb is not None and emb.shape[0] != len(reads):
+        print(f"Warning: embeddings have {emb.shape[0]} rows for {len(reads)} reads; using zero embeddings",
+              file=sys.stderr)
+        emb = None
+
+    from infer_helper import featurize
+    n_features = featurize(['A']).shape[1]
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(len(reads), n_features))
+
+    chunks = [
+        (start, reads[start:start + chunk_size],
+         np.asarray(emb[start:start + chunk_size]) if emb is not None else None)
+        for start in range(0, len(reads), chunk_size)
+    ]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for start, block in pool.map(_featurize_chunk, chunks):
+                out[start:start + block.shape[0]] = block
+    else:
+        for chunk in chunks:
+            start, block = _featurize_chunk(chunk)
+            out[start:start + block.shape[0]] = block
+
+    out.flush()
+    del out
+    os.replace(tmp_path, path)
+    return path, False
+
+
+def sample_weights(y) -> Any:
+    """Inverse class-frequency weights, normalized to mean 1."""
+    import numpy as np
+
+    counts = np.bincount(y).astype(float)
+    counts[counts == 0] = 1.0
+    class_weights = counts.mean() / counts
+    w = class_weights[y]
+    return w / (w.mean() + 1e-12)
+
+
+# ----- training -----
+
+def _train_fold(fold: int, features_path: str, train_idx, val_idx, y, weights,
+                n_classes: int, threads: int, quick: bool) -> Dict[str, Any]:
+    """Train the LightGBM and XGBoost models for one fold (runs in a worker process)."""
+    import numpy as np
+    import lightgbm as lgb
+    import xgboost as xgb
+
+    start = time.perf_counter()
+    X = np.load(features_path, mmap_mode='r')
+    X_tr, X_val = X[train_idx], X[val_idx]
+    y_tr, y_val = y[train_idx], y[val_idx]
+    w_tr, w_val = weights[train_idx], weights[val_idx]
+    lgb_rounds, xgb_rounds = (50, 50) if quick else (LGB_ROUNDS, XGB_ROUNDS)
+
+    lgb_params = {**LGB_PARAMS, 'num_class': n_classes, 'num_threads': threads}
+    lgb_train = lgb.Dataset(X_tr, label=y_tr, weight=w_tr)
+    lgb_val = lgb.Dataset(X_val, label=y_val, weight=w_val, reference=lgb_train)
+    clf_lgb = lgb.train(lgb_params, lgb_train, num_boost_round=lgb_rounds, valid_sets=[lgb_val],
+                        callbacks=[lgb.early_stopping(stopping_rounds=EARLY_STOPPING_ROUNDS, verbose=False)])
+    p_lgb = clf_lgb.predict(X_val, num_iteration=clf_lgb.best_iteration or None)
+    lgb_seconds = time.perf_counter() - start
+
+    xgb_params = {**XGB_PARAMS, 'num_class': n_classes, 'nthread': threads}
+    dtrain = xgb.DMatrix(X_tr, label=y_tr, weight=w_tr)
+    dval = xgb.DMatrix(X_val, label=y_val, weight=w_val)
+    bst = xgb.train(xgb_params, dtrain, num_boost_round=xgb_rounds, evals=[(dval, 'eval')],
+                    early_stopping_rounds=EARLY_STOPPING_ROUNDS, verbose_eval=False)
+    best_it = getattr(bst, 'best_iteration', None)
+    p_xgb = bst.predict(dval, iteration_range=(0, best_it + 1)) if best_it is not None else bst.predict(dval)
+
+    return {
+        "fold": fold,
+        "val_idx": val_idx,
+        "lgb_model": clf_lgb,
+        "xgb_model": bst,
+        "p_lgb": p_lgb,
+        "p_xgb": p_xgb,
+        "lgb_accuracy": float((p_lgb.argmax(axis=1) == y_val).mean()),
+        "xgb_accuracy": float((p_xgb.argmax(axis=1) == y_val).mean()),
+        "lgb_seconds": lgb_seconds,
+        "seconds": time.perf_counter() - start
+    }
+
+
+def train(reads: List[str], labels: List[str], output_dir: str, cache_dir: str = DEFAULT_CACHE_DIR,
+          embeddings_path: Optional[str] = None, folds: int = 5, workers: Optional[int] = None,
+          quick: bool = False) -> Dict[str, Any]:
+    """Featurize (or reuse the cache), train the CV folds in parallel and write the artifacts."""
+    import numpy as np
+    import pandas as pd
+    import joblib
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.model_selection import StratifiedKFold
+    from sklearn.linear_model import LogisticRegression
+
+    cpus = os.cpu_count() or 1
+    # An explicit worker count is honoured (up to one per fold); the default stops at the CPU count
+    workers = max(1, min(workers, folds)) if workers else max(1, min(folds, cpus))
+    # Split the cores between fold processes so they do not oversubscribe
+    threads = max(1, cpus // workers)
+    report: Dict[str, Any] = {"sequences": len(reads), "folds": folds, "workers": workers,
+                              "threads_per_worker": threads}
+
+    start = time.perf_counter()
+    features_path, cache_hit = build_features(reads, cache_dir, embeddings_path, workers=cpus)
+    report.update(features_path=features_path, feature_cache_hit=cache_hit,
+                  featurize_seconds=time.perf_counter() - start)
+
+    le = LabelEncoder().fit(labels)
+    y = le.transform(labels)
+    n_classes = len(le.classes_)
+    weights = sample_weights(y)
+    report["classes"] = n_classes
+
+    skf = StratifiedKFold(n_splits=folds, shuffle=True, random_state=SEED)
+    splits = list(skf.split(np.zeros(len(y)), y))
+
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_train_fold, i + 1, features_path, tr, val, y, weights, n_classes, threads, quick)
+                       for i, (tr, val) in enumerate(splits)]
+            results = [f.result() for f in futures]
+    else:
+        results = [_train_fold(i + 1, features_path, tr, val, y, weights, n_classes, threads, quick)
+                   for i, (tr, val) in enumerate(splits)]
+    report["cv_seconds"] = time.perf_counter() - start
+    report["fold_results"] = [
+        {k: r[k] for k in ("fold", "lgb_accuracy", "xgb_accuracy", "lgb_seconds", "seconds")} for r in results
+    ]
+
+    oof_lgb = np.zeros((len(y), n_classes), dtype=float)
+    oof_xgb = np.zeros((len(y), n_classes), dtype=float)
+    for r in results:
+        oof_lgb[r["val_idx"]] = r["p_lgb"]
+        oof_xgb[r["val_idx"]] = r["p_xgb"]
+
+    start = time.perf_counter()
+    meta_X = np.hstack([oof_lgb, oof_xgb])
+    meta_clf = LogisticRegression(max_iter=3000, solver='lbfgs', random_state=SEED)
+    meta_clf.fit(meta_X, y)
+    oof_probs = meta_clf.predict_proba(meta_X)
+    oof_preds = oof_probs.argmax(axis=1)
+    report["meta_seconds"] = time.perf_counter() - start
+    report["oof_accuracy"] = float((oof_preds == y).mean())
+
+    os.makedirs(output_dir, exist_ok=True)
+    joblib.dump([r["lgb_model"] for r in results], os.path.join(output_dir, 'lgb_models_list.pkl'))
+    joblib.dump([r["xgb_model"] for r in results], os.path.join(output_dir, 'xgb_models_list.pkl'))
+    joblib.dump(le, os.path.join(output_dir, 'stack_label_encoder.pkl'))
+    joblib.dump(meta_clf, os.path.join(output_dir, 'stack_meta_clf.pkl'))
+    pd.DataFrame({
+        'idx': np.arange(len(y)),
+        'true_label': le.classes_[y],
+        'pred_label': le.classes_[oof_preds],
+        'pred_conf': oof_probs.max(axis=1)
+    }).to_csv(os.path.join(output_dir, 'stack_oof_predictions.csv'), index=False)
+
+    report["output_dir"] = os.path.abspath(output_dir)
+    with open(os.path.join(output_dir, 'training_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def verify(output_dir: str, reads: List[str], labels: List[str], sample: int = 50) -> Dict[str, Any]:
+    """Reload the written artifacts the way inference does and score a sample."""
+    from infer_helper import predict_sequences
+
+    missing = [name for name in REQUIRED_FILES if not os.path.exists(os.path.join(output_dir, name))]
+    if missing:
+        return {"success": False, "error": f"Missing artifacts: {', '.join(missing)}"}
+    preds = predict_sequences(reads[:sample], model_dir=output_dir)
+    correct = sum(1 for p, label in zip(preds, labels) if p['pred_label'] == label)
+    return {"success": True, "sampled": len(preds), "training_accuracy": correct / max(1, len(preds))}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the stacked-ensemble taxa classifier")
+    parser.add_argument("--reads", help="cleaned_read_records.npy, or a CSV/TSV with sequence and label columns")
+    parser.add_argument("--labels", help="cleaned_labels.npy (with a .npy --reads)")
+    parser.add_argument("--sequence-col", default="sequence", help="Sequence column for CSV input")
+    parser.add_argument("--label-col", default="label", help="Label column for CSV input")
+    parser.add_argument("--embeddings", help="Optional per-read embeddings .npy (256 columns); zeros otherwise")
+    parser.add_argument("--synthetic", action="store_true", help="Train on generated data (offline test run)")
+    parser.add_argument("--output-dir", help="Where to write the artifacts (default: Model/versions/<timestamp>)")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Feature cache directory")
+    parser.add_argument("--folds", type=int, default=5, help="Number of CV folds")
+    parser.add_argument("--workers", type=int, help="Parallel fold processes (default: one per fold, up to CPU count)")
+    parser.add_argument("--quick", action="store_true", help="Cap boosting rounds at 50 (smoke tests)")
+    parser.add_argument("--verify", action="store_true", help="Reload the artifacts and score a sample afterwards")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        reads, labels = synthetic_dataset()
+    elif args.reads:
+        reads, labels = load_dataset(args.reads, args.labels, args.sequence_col, args.label_col)
+    else:
+        parser.error("--reads or --synthetic is required")
+
+    output_dir = args.output_dir or os.path.join(DEFAULT_MODEL_DIR, 'versions', time.strftime('%Y%m%d-%H%M%S'))
+    report = train(reads, labels, output_dir, cache_dir=args.cache_dir, embeddings_path=args.embeddings,
+                   folds=args.folds, workers=args.workers, quick=args.quick)
+    if args.verify:
+        report["verify"] = verify(output_dir, reads, labels)
+    print(json.dumps({k: v for k, v in report.items() if k != "fold_results"}, indent=2))
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Detection throughput benchmark: detectors x backends x thread counts x input sizes x batch sizes.
+Each detector runs over a fixed image set and the first frames of a video clip.
+Results are written as JSON so they can be compared across commits.
+
+Every (detector, backend, threads) combination runs in its own worker process,
+with its CPUs limited to `threads`. This keeps the peak RSS figure for that
+combination alone, and it also limits runtimes that size their own thread pools.
+Detectors without weights in "Detection model" get a randomly initialised
+YOLOv8n with the same class names, seeded so runs stay comparable. Speed does
+not depend on what the weights learned.
+
+Examples:
+    python scripts/bench_detection.py
+    python scripts/bench_detection.py --detectors sub --backends torch onnx --imgsz 320 640 --batch-sizes 1 8
+    python scripts/bench_detection.py --baseline temp/bench/detection_<commit>.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(ROOT, 'Detection model')
+BENCH_DIR = os.path.join(ROOT, 'temp', 'bench')
+# Same folders the API routes load from
+DETECTORS = {'divers': 'divers', 'mines': 'mines', 'sub': 'sub'}
+DEFAULT_IMAGE_DIRS = [os.path.join(ROOT, 'proj', 'Deep_Sea-NN-main', 'data', 'test_imgs'),
+                      os.path.join(MODEL_DIR, 'sub', 'train', 'images')]
+DEFAULT_VIDEO = os.path.join(MODEL_DIR, 'sub', 'my_model', '200992-914924512_small(1).mp4')
+RANDOM_SEED = 0
+
+
+# ----- parent: what to run -----
+
+def class_names(detector: str) -> List[str]:
+    """The detector's classes from its dataset's classes.txt, or just its name."""
+    path = os.path.join(MODEL_DIR, DETECTORS.get(detector, detector), 'train', 'classes.txt')
+    if os.path.isfile(path):
+        with open(path) as f:
+            names = [line.strip() for line in f if line.strip()]
+        if names:
+            return names
+    return [detector]
+
+
+def random_weights(detector: str) -> str:
+    """A seeded, randomly initialised YOLOv8n with the detector's classes, saved under temp/bench."""
+    names = class_names(detector)
+    path = os.path.join(BENCH_DIR, f'{detector}_random.pt')
+    if os.path.isfile(path):
+        return path
+    import torch
+    from ultralytics.nn.tasks import DetectionModel
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    torch.manual_seed(RANDOM_SEED)
+    model = DetectionModel('yolov8n.yaml', nc=len(names), verbose=False)
+    model.names = dict(enumerate(names))
+    model.args = {'imgsz': 640}
+    torch.save({'model': model.half(), 'train_args': {}, 'date': None, 'version': 'random'}, path)
+    return path
+
+
+def available_backends() -> List[str]:
+    import importlib.util
+
+    backends = ['torch']
+    if importlib.util.find_spec('onnxruntime'):
+        backends += ['onnx', 'onnx-int8']
+    if importlib.util.find_spec('openvino'):
+        backends.append('openvino')
+        if importlib.util.find_spec('nncf'):
+            backends.append('openvino-int8')
+    return backends
+
+
+def image_set(dirs: List[str], limit: int) -> List[str]:
+    from detection.pipeline import list_images
+
+    paths = [p for d in dirs if os.path.isdir(d) for p in list_images(d)]
+    return paths[:limit]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_worker(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """One (detector, backend, threads) combination in a fresh process; its JSON is the last stdout line."""
+    env = dict(os.environ)
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        env[var] = str(spec["threads"])
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', json.dumps(spec)],
+                          capture_output=True, text=True, env=env, cwd=ROOT)
+    lines = proc.stdout.strip().splitlines()
+    try:
+        return json.loads(lines[-1])
+    except (IndexError, ValueError):
+        return {"error": (proc.stderr or proc.stdout).strip()[-2000:] or f"worker exited with {proc.returncode}"}
+
+
+# ----- worker: load once, sweep sizes -----
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 2 ** 20
+    except (ImportError, AttributeError):
+        return None
+
+
+def limit_cpus(threads: int) -> int:
+    """Pin this process to `threads` CPUs where the OS allows it, and size torch's pool to match."""
+    import torch
+
+    if hasattr(os, 'sched_setaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, cpus[:max(1, threads)])
+    torch.set_num_threads(max(1, threads))
+    return torch.get_num_threads()
+
+
+def load_frames(spec: Dict[str, Any]) -> Dict[str, List[Any]]:
+    import cv2
+
+    sets = {"images": [img for img in (cv2.imread(p) for p in spec["images"]) if img is not None]}
+    if spec.get("video") and spec.get("video_frames"):
+        frames = []
+        cap = cv2.VideoCapture(spec["video"])
+        while len(frames) < spec["video_frames"]:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+        sets["video"] = frames
+    return {name: frames for name, frames in sets.items() if frames}
+
+
+def time_batches(pipeline, frames: List[Any], imgsz: int, batch_size: int) -> Dict[str, Any]:
+    import numpy as np
+
+    batches = [frames[i:i + batch_size] for i in range(0, len(frames), batch_size)]
+    pipeline.detect_batch(batches[0], imgsz)  # warm-up at this size, not timed
+    latencies = []
+    start = time.perf_counter()
+    for batch in batches:
+        t0 = time.perf_counter()
+        pipeline.detect_batch(batch, imgsz)
+        latencies.append((time.perf_counter() - t0) * 1000.0)
+    elapsed = time.perf_counter() - start
+    # A frame's latency is the time until its whole batch is done
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist()
+    return {
+        "frames": len(frames),
+        "images_per_second": len(frames) / elapsed if elapsed > 0 else None,
+        "ms_per_image": elapsed * 1000.0 / len(frames),
+        "latency_ms": {"mean": float(np.mean(latencies)), "p50": p50, "p95": p95, "p99": p99}
+    }
+
+
+def worker(spec: Dict[str, Any]) -> Dict[str, Any]:
+    threads = limit_cpus(spec["threads"])
+    from detection import DetectionPipeline
+
+    frame_sets = load_frames(spec)
+    rss_before = rss_mb()
+    pipeline = DetectionPipeline(spec["weights"], device='cpu', backend=spec["backend"],
+                                 calibration_dirs=spec.get("calibration_dirs"))
+    rss_loaded = rss_mb()
+    results = []
+    for source, frames in frame_sets.items():
+        for imgsz in spec["imgsz"]:
+            for batch_size in spec["batch_sizes"]:
+                results.append({"source": source, "imgsz": imgsz, "batch_size": batch_size,
+                                **time_batches(pipeline, frames, imgsz, batch_size)})
+    return {
+        "torch_threads": threads,
+        "load_seconds": pipeline.load_seconds,
+        "model_rss_mb": rss_loaded - rss_before if rss_loaded is not None and rss_before is not None else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "results": results
+    }
+
+
+# ----- report -----
+
+def row_key(run: Dict[str, Any], result: Dict[str, Any]):
+    return (run["detector"], run["backend"], run["threads"], result["source"], result["imgsz"], result["batch_size"])
+
+
+def format_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    before = {}
+    if baseline:
+        for run in baseline.get("runs", []):
+            for result in run.get("results", []):
+                before[row_key(run, result)] = result["images_per_second"]
+    header = (f"{'detector':<10} {'backend':<14} {'thr':>3} {'source':<7} {'imgsz':>5} {'batch':>5} {'img/s':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'peak MB':>8}")
+    if baseline:
+        header += f" {'vs base':>8}"
+    lines = [header]
+    for run in report["runs"]:
+        name = f"{run['detector'] + ('*' if run['random'] else ''):<10} {run['backend']:<14} {run['threads']:>3}"
+        if "error" in run:
+            lines.append(f"{name} error: {run['error'].splitlines()[-1] if run['error'] else ''}")
+            continue
+        for r in run["results"]:
+            line = (f"{name} {r['source']:<7} {r['imgsz']:>5} {r['batch_size']:>5} {r['images_per_second']:8.2f} "
+                    f"{r['latency_ms']['p50']:8.1f} {r['latency_ms']['p95']:8.1f} {r['latency_ms']['p99']:8.1f} "
+                    f"{run['peak_rss_mb'] or 0:8.0f}")
+            if baseline:
+                old = before.get(row_key(run, r))
+                line += f" {r['images_per_second'] / old:7.2f}x" if old else f" {'-':>8}"
+            lines.append(line)
+    if any(run["random"] for run in report["runs"]):
+        lines.append("* randomly initialised weights (no .pt found)")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Detection throughput across backends, input sizes, batch sizes "
+                                                 "and thread counts")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--detectors", nargs="+", default=list(DETECTORS), help="Folders under 'Detection model'")
+    parser.add_argument("--weights", nargs="+", help="name=path weights to benchmark instead of --detectors")
+    parser.add_argument("--random", action="store_true", help="Use random weights even where a .pt exists")
+    parser.add_argument("--backends", nargs="+", help="Default: every backend whose runtime is installed")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[320, 640], help="Model input sizes")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--threads", nargs="+", type=int,
+                        help="CPU thread counts (default: 1 and all CPUs)")
+    parser.add_argument("--images", nargs="+", default=DEFAULT_IMAGE_DIRS, help="Image folders for the image set")
+    parser.add_argument("--limit", type=int, default=16, help="Images in the set (first N, sorted)")
+    parser.add_argument("--video", default=DEFAULT_VIDEO, help="Video clip ('' to skip)")
+    parser.add_argument("--video-frames", type=int, default=48, help="Frames read from the start of the clip")
+    parser.add_argument("--output", help="JSON path (default: temp/bench/detection_<commit>_<time>.json)")
+    parser.add_argument("--baseline", help="Earlier JSON to compare images/s against")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        try:
+            result = worker(json.loads(args.worker))
+        except Exception as e:
+            result = {"error": f"{type(e).__name__}: {e}"}
+        print(json.dumps(result))
+        return 0
+
+    images = image_set(args.images, args.limit)
+    video = args.video if args.video and os.path.isfile(args.video) else None
+    if not images and not video:
+        print(json.dumps({"success": False, "error": "No benchmark images or video found"}))
+        return 1
+
+    if args.weights:
+        from detection.multi import parse_weights
+        models = {name: (path, False) for name, path in parse_weights(args.weights).items()}
+    else:
+        from detection.multi import find_weights
+        models = {}
+        for detector in args.detectors:
+            found = None if args.random else find_weights(os.path.join(MODEL_DIR, DETECTORS.get(detector, detector)))
+            models[detector] = (found, False) if found else (random_weights(detector), True)
+
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    threads = args.threads or sorted({1, cpus})
+    backends = args.backends or available_backends()
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "node": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": cpus,
+        "python": platform.python_version(),
+        "images": [os.path.relpath(p, ROOT) for p in images],
+        "video": os.path.relpath(video, ROOT) if video else None,
+        "video_frames": args.video_frames if video else 0,
+        "runs": []
+    }
+    for detector, (weights, random) in models.items():
+        for backend in backends:
+            for n in threads:
+                spec = {"weights": weights, "backend": backend, "threads": n, "imgsz": args.imgsz,
+                        "batch_sizes": args.batch_sizes, "images": images, "video": video,
+                        "video_frames": args.video_frames,
+                        # INT8 exports of random weights have no dataset next to them
+                        "calibration_dirs": [d for d in args.images if os.path.isdir(d)] if random else None}
+                print(f"{detector} {backend} threads={n} ...", file=sys.stderr, flush=True)
+                run = {"detector": detector, "weights": os.path.relpath(weights, ROOT), "random": random,
+                       "backend": backend, "threads": n, **run_worker(spec)}
+                report["runs"].append(run)
+
+    output = args.output or os.path.join(BENCH_DIR, f"detection_{commit or 'nogit'}_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(format_report(report, baseline))
+    print(f"Saved {os.path.relpath(output, ROOT)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Recall gain against added cost for tiled (sliced) inference.
+Runs the detector on a YOLO-format labelled folder once on whole frames and
+once per tile size, and reports recall at IoU 0.5 (overall and for small
+objects) and milliseconds per frame at the normal confidence threshold.
+
+Example (the submarine detector has its training set in the repo):
+    python scripts/bench_tiling.py --weights "Detection model/sub/best.pt" \\
+        --images "Detection model/sub/train/images" --tiles 320 640
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from detection import DetectionPipeline
+from detection.evaluate import labels_dir_for, read_labels
+from detection.pipeline import list_images
+from detection.tiling import tile_grid
+from detection.tracker import greedy_match, iou_matrix
+
+MATCH_IOU = 0.5
+# COCO's "small": under 32x32 pixels
+SMALL_PX = 32
+
+
+def score(pipeline: DetectionPipeline, paths, labels_dir: str, small_px: int = SMALL_PX):
+    import cv2
+
+    matched = matched_small = n_gt = n_small = detections = 0
+    tiles = 0
+    elapsed = 0.0
+    frames = 0
+    for i, path in enumerate(paths):
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        if i == 0:
+            pipeline.detect(frame)  # warm-up, not timed
+        height, width = frame.shape[:2]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        gt_boxes, gt_cls = read_labels(os.path.join(labels_dir, stem + '.txt'), width, height)
+        start = time.perf_counter()
+        found = pipeline.detect(frame)
+        elapsed += time.perf_counter() - start
+        frames += 1
+        detections += len(found)
+        if pipeline.tile_size:
+            tiles += len(tile_grid(width, height, pipeline.tile_size, pipeline.tile_overlap))
+
+        small = np.sqrt(np.prod(gt_boxes[:, 2:] - gt_boxes[:, :2], axis=1)) < small_px
+        n_gt += len(gt_boxes)
+        n_small += int(small.sum())
+        if len(gt_boxes) and found:
+            pred_boxes = np.array([d.box for d in found], dtype=np.float64)
+            pred_cls = np.array([d.class_id for d in found])
+            iou = iou_matrix(gt_boxes, pred_boxes)
+            iou[gt_cls[:, None] != pred_cls[None, :]] = 0.0
+            hit = np.array([g for g, _ in greedy_match(iou, MATCH_IOU)], dtype=np.int64)
+            matched += len(hit)
+            matched_small += int(small[hit].sum()) if len(hit) else 0
+    return {
+        "frames": frames,
+        "recall": matched / n_gt if n_gt else None,
+        "small_recall": matched_small / n_small if n_small else None,
+        "objects": n_gt,
+        "small_objects": n_small,
+        "detections_per_frame": detections / frames if frames else 0.0,
+        "tiles_per_frame": tiles / frames if frames and tiles else 1.0,
+        "ms_per_frame": elapsed / frames * 1000.0 if frames else None
+    }
+
+
+def _fmt(value, spec):
+    return format(value, spec) if value is not None else '-'.rjust(int(spec.lstrip('+').split('.')[0]))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Recall gain vs. cost per frame of tiled inference")
+    parser.add_argument("--weights", required=True, help="Path to the YOLO weights (.pt)")
+    parser.add_argument("--images", required=True, help="Labelled image folder (YOLO txt labels alongside)")
+    parser.add_argument("--labels", help="Label folder (default: the 'labels' folder next to --images)")
+    parser.add_argument("--tiles", type=int, nargs="+", default=[640], help="Tile sizes to compare")
+    parser.add_argument("--tile-overlap", type=float, default=0.2)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--small-px", type=int, default=SMALL_PX, help="Objects under this size (sqrt of area) are small")
+    parser.add_argument("--limit", type=int, help="Only use the first N images")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    paths = list_images(args.images)[:args.limit] if args.limit else list_images(args.images)
+    labels_dir = args.labels or labels_dir_for(args.images)
+    pipeline = DetectionPipeline(args.weights, conf=args.conf, device='cpu', backend=args.backend)
+
+    report = {"full_frame": score(pipeline, paths, labels_dir, args.small_px)}
+    pipeline.tile_overlap = args.tile_overlap
+    for size in args.tiles:
+        pipeline.tile_size = size
+        report[f"tile_{size}"] = score(pipeline, paths, labels_dir, args.small_px)
+    base = report["full_frame"]
+    for entry in report.values():
+        if entry["recall"] is not None and base["recall"] is not None:
+            entry["recall_gain"] = entry["recall"] - base["recall"]
+        if entry["small_recall"] is not None and base["small_recall"] is not None:
+            entry["small_recall_gain"] = entry["small_recall"] - base["small_recall"]
+        entry["added_ms_per_frame"] = entry["ms_per_frame"] - base["ms_per_frame"]
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    print(f"{base['objects']} objects ({base['small_objects']} small) in {base['frames']} frames")
+    print(f"{'mode':<12} {'tiles':>5} {'recall':>7} {'gain':>7} {'small':>7} {'gain':>7} {'ms/frame':>9} {'added':>8}")
+    for name, e in report.items():
+        print(f"{name:<12} {e['tiles_per_frame']:5.1f} {_fmt(e['recall'], '7.3f')} {_fmt(e.get('recall_gain'), '+7.3f')} "
+              f"{_fmt(e['small_recall'], '7.3f')} {_fmt(e.get('small_recall_gain'), '+7.3f')} "
+              f"{e['ms_per_frame']:9.1f} {e['added_ms_per_frame']:+8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
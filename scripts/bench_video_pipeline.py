@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare sequential, pipelined and (optionally) motion-gated video detection throughput.
+Runs process_video both ways on each video (by default the samples in
+"Detection model/sub/my_model") and prints FPS, speedup and per-stage
+utilization. The first run of each video is a warm-up and is not reported.
+"""
+
+import os
+import sys
+import json
+import glob
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from detection import DEFAULT_QUEUE_SIZE, DetectionPipeline, VIDEO_EXTENSIONS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(ROOT, 'Detection model', 'sub', 'my_model')
+
+
+def sample_videos(folder: str = SAMPLE_DIR):
+    return sorted(p for p in glob.glob(os.path.join(folder, '*')) if os.path.splitext(p)[1].lower() in VIDEO_EXTENSIONS)
+
+
+def bench(pipeline: DetectionPipeline, video: str, repeats: int, queue_size: int, adaptive=None):
+    """Best-of-`repeats` timing per mode; `adaptive` adds a gated pipelined run with those options."""
+    modes = {'sequential': {"pipelined": False}, 'pipelined': {"pipelined": True}}
+    if adaptive:
+        modes['adaptive'] = {"pipelined": True, **adaptive}
+    results = {}
+    with tempfile.TemporaryDirectory() as outdir:
+        pipeline.process_video(video, outdir, pipelined=False)
+        for mode, options in modes.items():
+            best = None
+            for _ in range(repeats):
+                result = pipeline.process_video(video, outdir, queue_size=queue_size, **options)
+                timing = dict(result["timing"], frames_inferred=result["frames_inferred"])
+                if best is None or timing["fps"] > best["fps"]:
+                    best = timing
+            results[mode] = best
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sequential vs pipelined video detection throughput")
+    parser.add_argument("--weights", required=True, help="Path to the YOLO weights (.pt)")
+    parser.add_argument("--videos", nargs="+", help="Videos to run (default: the samples in Detection model/sub/my_model)")
+    parser.add_argument("--resolution", help="Resize frames to WxH before inference")
+    parser.add_argument("--device", help="Torch device (e.g. cpu, 0)")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--motion-threshold", type=float, help="Also time a motion-gated run with this threshold")
+    parser.add_argument("--stride", type=int, default=0, help="Also time a run that detects every Nth frame")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per mode; the fastest is reported")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    videos = args.videos or sample_videos()
+    if not videos:
+        print(json.dumps({"success": False, "error": "No videos found"}))
+        return 1
+    pipeline = DetectionPipeline(args.weights, resolution=args.resolution, device=args.device)
+
+    report = {}
+    for video in videos:
+        adaptive = None
+        if args.motion_threshold is not None or args.stride > 1:
+            adaptive = {"motion_threshold": args.motion_threshold, "stride": args.stride}
+        report[video] = bench(pipeline, video, args.repeats, args.queue_size, adaptive)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    for video, modes in report.items():
+        seq, pipe = modes['sequential'], modes['pipelined']
+        print(f"{os.path.basename(video)} ({seq['frames']} frames)")
+        for name, timing in modes.items():
+            util = "  ".join(f"{stage} {s['utilization'] * 100:5.1f}%" for stage, s in timing["stages"].items())
+            print(f"  {name:<10} {timing['fps']:7.2f} fps   inferred {timing['frames_inferred']:>5}   {util}")
+        print(f"  speedup    {pipe['fps'] / seq['fps']:7.2f}x pipelined")
+        if 'adaptive' in modes:
+            print(f"             {modes['adaptive']['fps'] / seq['fps']:7.2f}x adaptive")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Compare detection backends on CPU: mAP drift against PyTorch and frames per second.
+Exports each backend on first use (see detection/backends.py), scores it on a
+YOLO-format labelled folder and times single-image inference. Images the INT8
+models were calibrated on are left out of the scoring, so the drift is
+measured on images none of the backends has seen.
+
+Example (the submarine detector has its training set in the repo):
+    python scripts/compare_backends.py --weights "Detection model/sub/best.pt" \\
+        --images "Detection model/sub/train/images"
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from detection import DetectionPipeline
+from detection.backends import calibration_images, default_calibration_dirs
+from detection.evaluate import evaluate
+from detection.pipeline import list_images
+
+DEFAULT_BACKENDS = ['torch', 'onnx', 'onnx-int8', 'openvino', 'openvino-int8']
+
+
+def measure_fps(pipeline: DetectionPipeline, paths, warmup: int = 5, frames: int = 50) -> float:
+    """Single-image detect() throughput over the first images of the folder."""
+    import cv2
+
+    images = [cv2.imread(p) for p in paths[:max(1, min(frames, len(paths)))]]
+    images = [img for img in images if img is not None]
+    for img in images[:warmup]:
+        pipeline.detect(img)
+    start = time.perf_counter()
+    for img in images:
+        pipeline.detect(img)
+    elapsed = time.perf_counter() - start
+    return len(images) / elapsed if elapsed > 0 else 0.0
+
+
+def compare(weights: str, images_dir: str, backends, labels_dir=None, limit=None, device='cpu',
+            calibration_dirs=None):
+    report = {}
+    calibrated = {os.path.abspath(p) for p in calibration_images(calibration_dirs or default_calibration_dirs(weights))}
+    paths = [p for p in list_images(images_dir) if os.path.abspath(p) not in calibrated]
+    if not paths:
+        raise ValueError(f"Every image in {images_dir} is used for INT8 calibration; pass a held-out folder")
+    for backend in backends:
+        try:
+            pipeline = DetectionPipeline(weights, device=device, backend=backend, calibration_dirs=calibration_dirs)
+            accuracy = evaluate(pipeline, images_dir, labels_dir, limit, paths=paths)
+            report[backend] = {
+                "map50": accuracy["map50"],
+                "map50_95": accuracy["map50_95"],
+                "precision": accuracy["precision"],
+                "recall": accuracy["recall"],
+                "fps": measure_fps(pipeline, paths),
+                "load_seconds": pipeline.load_seconds,
+                "images": accuracy["images"],
+                "calibration_images": len(calibrated)
+            }
+        except Exception as e:
+            # A runtime that is not installed should not stop the other backends
+            report[backend] = {"error": str(e)}
+    baseline = report.get('torch', {})
+    for entry in report.values():
+        if "map50" in entry and "map50" in baseline:
+            entry["map50_drift"] = entry["map50"] - baseline["map50"]
+            entry["map50_95_drift"] = entry["map50_95"] - baseline["map50_95"]
+            entry["speedup"] = entry["fps"] / baseline["fps"] if baseline["fps"] else None
+    return report
+
+
+def format_report(report) -> str:
+    lines = [f"{'backend':<15} {'mAP50':>7} {'drift':>7} {'mAP50-95':>9} {'drift':>7} {'FPS':>7} {'speedup':>8}"]
+    for backend, entry in report.items():
+        if "error" in entry:
+            lines.append(f"{backend:<15} error: {entry['error']}")
+            continue
+        # Drift and speedup need the torch baseline in the same run
+        drift = (f"{entry['map50_drift']:+7.4f}", f"{entry['map50_95_drift']:+7.4f}") if "map50_drift" in entry \
+            else (f"{'-':>7}", f"{'-':>7}")
+        speedup = f"{entry['speedup']:7.2f}x" if entry.get("speedup") else f"{'-':>8}"
+        lines.append(f"{backend:<15} {entry['map50']:7.4f} {drift[0]} {entry['map50_95']:9.4f} {drift[1]} "
+                     f"{entry['fps']:7.2f} {speedup}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="mAP drift and CPU FPS per detection backend")
+    parser.add_argument("--weights", required=True, help="Path to the YOLO weights (.pt)")
+    parser.add_argument("--images", required=True, help="Labelled image folder (YOLO txt labels alongside)")
+    parser.add_argument("--labels", help="Label folder (default: the 'labels' folder next to --images)")
+    parser.add_argument("--backends", nargs="+", default=DEFAULT_BACKENDS)
+    parser.add_argument("--calibration-dir", action="append", help="INT8 calibration image folder")
+    parser.add_argument("--limit", type=int, help="Only score the first N images")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+
+    report = compare(args.weights, args.images, args.backends, args.labels, args.limit, args.device,
+                     args.calibration_dir)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""Headless YOLO detection for the divers, mines and submarine models."""
+
+from .pipeline import (
+    DetectionPipeline,
+    Detection,
+    IMAGE_EXTENSIONS,
+    VIDEO_EXTENSIONS,
+    detections_from_arrays,
+    list_images,
+    source_type,
+    summarize,
+)
+from .stages import DEFAULT_QUEUE_SIZE, run_pipelined, run_sequential
+
+__all__ = [
+    'DetectionPipeline',
+    'Detection',
+    'IMAGE_EXTENSIONS',
+    'VIDEO_EXTENSIONS',
+    'detections_from_arrays',
+    'list_images',
+    'source_type',
+    'summarize',
+    'DEFAULT_QUEUE_SIZE',
+    'run_pipelined',
+    'run_sequential',
+]
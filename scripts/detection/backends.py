@@ -0,0 +1,195 @@
+"""
+CPU inference backends for the YOLO detectors.
+The PyTorch weights are exported once to ONNX (run with ONNX Runtime) or
+OpenVINO IR, optionally INT8-quantized with post-training calibration on the
+detector's training/validation images. Exported models sit next to the .pt
+and are loaded through ultralytics' YOLO class, so detect() and everything
+built on it work unchanged whichever backend is selected.
+"""
+
+import os
+import zlib
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+DEFAULT_BACKEND = 'torch'
+DEFAULT_IMGSZ = 640
+CALIBRATION_IMAGES = 300
+# Every 5th image (by a hash of its name) is never calibrated on, so accuracy can be scored on it
+HOLDOUT_EVERY = 5
+
+
+def parse_backend(spec: str) -> Tuple[str, bool]:
+    """'onnx-int8' -> ('onnx', True)."""
+    name, _, precision = spec.lower().partition('-')
+    if name not in BACKENDS or precision not in ('', 'fp32', 'int8') or (name == 'torch' and precision == 'int8'):
+        raise ValueError(f"Unknown backend {spec}; use one of torch, onnx, onnx-int8, openvino, openvino-int8")
+    return name, precision == 'int8'
+
+
+def exported_path(weights: str, backend: str, int8: bool = False) -> str:
+    """Where the exported model for `backend` lives (the .pt itself for torch)."""
+    stem = os.path.splitext(weights)[0]
+    if backend == 'onnx':
+        return stem + ('_int8.onnx' if int8 else '.onnx')
+    if backend == 'openvino':
+        return stem + ('_int8_openvino_model' if int8 else '_openvino_model')
+    return weights
+
+
+def default_calibration_dirs(weights: str) -> List[str]:
+    """Training/validation image folders near the weights (e.g. Detection model/sub/train/images)."""
+    found = []
+    base = os.path.dirname(os.path.abspath(weights))
+    for root in (base, os.path.dirname(base)):
+        for split in ('train', 'valid', 'val'):
+            for candidate in (os.path.join(root, split, 'images'), os.path.join(root, 'images', split)):
+                if os.path.isdir(candidate) and candidate not in found:
+                    found.append(candidate)
+    return found
+
+
+def is_held_out(path: str) -> bool:
+    """Whether `path` belongs to the held-out split that INT8 calibration never sees."""
+    return zlib.crc32(os.path.basename(path).encode()) % HOLDOUT_EVERY == 0
+
+
+def calibration_images(dirs: List[str], limit: int = CALIBRATION_IMAGES) -> List[str]:
+    """Up to `limit` images spread evenly over the calibration folders, leaving out the held-out split."""
+    from .pipeline import list_images
+
+    paths = [p for d in dirs for p in list_images(d) if not is_held_out(p)]
+    if len(paths) > limit:
+        step = len(paths) / float(limit)
+        paths = [paths[int(i * step)] for i in range(limit)]
+    return paths
+
+
+def preprocess(image, imgsz: int = DEFAULT_IMGSZ):
+    """BGR image -> 1x3xHxW float32 RGB tensor in [0, 1], letterboxed like ultralytics."""
+    import numpy as np
+    from .batch import letterbox
+
+    padded, _, _ = letterbox(image, imgsz)
+    return np.ascontiguousarray(padded[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+def _calibration_batches(paths: List[str], imgsz: int) -> Iterator:
+    import cv2
+    for path in paths:
+        image = cv2.imread(path)
+        if image is not None:
+            yield preprocess(image, imgsz)
+
+
+def quantize_onnx(fp32_path: str, int8_path: str, images: List[str], imgsz: int = DEFAULT_IMGSZ) -> str:
+    """Static INT8 quantization (QDQ, per-channel weights) calibrated on `images`."""
+    import onnxruntime
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat, QuantType,
+                                          quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    input_name = onnxruntime.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self.batches = _calibration_batches(images, imgsz)
+
+        def get_next(self):
+            batch = next(self.batches, None)
+            return None if batch is None else {input_name: batch}
+
+    fp32_path, int8_path = os.path.abspath(fp32_path), os.path.abspath(int8_path)
+    with tempfile.TemporaryDirectory() as tmp, _working_dir(tmp):
+        prepared = os.path.join(tmp, 'prepared.onnx')
+        # Symbolic shape inference cannot resolve the dynamic batch/size axes of the export
+        quant_pre_process(fp32_path, prepared, skip_symbolic_shape=True)
+        # Only Conv/MatMul run in INT8; the detection head's concat/sigmoid ops lose too much accuracy
+        quantize_static(prepared, int8_path, Reader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                        calibrate_method=CalibrationMethod.MinMax,
+                        op_types_to_quantize=['Conv', 'MatMul'])
+    return int8_path
+
+
+@contextmanager
+def _working_dir(path: str):
+    """Run with `path` as the working directory: onnxruntime writes some temp models to the current one."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _calibration_yaml(images_dirs: List[str], names, tmp: str) -> str:
+    """A throwaway ultralytics data.yaml listing the calibration images (without the held-out split)."""
+    import yaml
+
+    images = calibration_images(images_dirs)
+    if not images:
+        raise ValueError(f"No calibration images in {', '.join(images_dirs)}")
+    listing = os.path.join(tmp, 'calibration.txt')
+    with open(listing, 'w') as f:
+        f.write('\n'.join(os.path.abspath(p) for p in images) + '\n')
+    data = {"train": listing, "val": listing, "names": dict(names)}
+    path = os.path.join(tmp, 'calibration.yaml')
+    with open(path, 'w') as f:
+        yaml.safe_dump(data, f)
+    return path
+
+
+def export(weights: str, backend: str, int8: bool = False, calibration_dirs: Optional[List[str]] = None,
+           imgsz: int = DEFAULT_IMGSZ) -> str:
+    """Export `weights` for `backend` (quantizing if int8) and return the exported path."""
+    from ultralytics import YOLO
+
+    target = exported_path(weights, backend, int8)
+    if backend == 'torch':
+        return target
+    calibration_dirs = calibration_dirs or default_calibration_dirs(weights)
+    if int8 and not calibration_dirs:
+        raise ValueError(f"INT8 needs calibration images; none found near {weights} (use --calibration-dir)")
+
+    model = YOLO(weights, task='detect')
+    if backend == 'onnx':
+        fp32 = exported_path(weights, 'onnx')
+        if not os.path.exists(fp32):
+            # dynamic axes so folder mode can batch
+            produced = model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+            if os.path.abspath(produced) != os.path.abspath(fp32):
+                shutil.move(produced, fp32)
+        if not int8:
+            return fp32
+        images = calibration_images(calibration_dirs)
+        if not images:
+            raise ValueError(f"No calibration images in {', '.join(calibration_dirs)}")
+        return quantize_onnx(fp32, target, images, imgsz)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        kwargs = {"format": 'openvino', "imgsz": imgsz, "dynamic": True}
+        if int8:
+            # NNCF post-training quantization over the calibration set
+            kwargs.update(int8=True, data=_calibration_yaml(calibration_dirs, model.names, tmp),
+                          fraction=1.0)
+        produced = model.export(**kwargs)
+    if os.path.abspath(produced) != os.path.abspath(target):
+        if os.path.exists(target):
+            shutil.rmtree(target)
+        shutil.move(produced, target)
+    return target
+
+
+def load(weights: str, backend: str = DEFAULT_BACKEND, int8: bool = False,
+         calibration_dirs: Optional[List[str]] = None, imgsz: int = DEFAULT_IMGSZ):
+    """A YOLO model running on `backend`, exporting it first if needed."""
+    from ultralytics import YOLO
+
+    path = exported_path(weights, backend, int8)
+    if not os.path.exists(path):
+        path = export(weights, backend, int8, calibration_dirs, imgsz)
+    return YOLO(path, task='detect')
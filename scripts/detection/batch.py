@@ -0,0 +1,107 @@
+"""
+Batched image-folder detection helpers.
+Images are decoded on a small thread pool ahead of inference and letterboxed
+to one square size so images of mixed sizes can share a batch; boxes are
+mapped back to each image's own coordinates afterwards.
+"""
+
+import csv
+import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_LOADERS = 4
+DEFAULT_IMGSZ = 640
+LETTERBOX_COLOR = (114, 114, 114)
+
+CSV_FIELDS = ['image', 'class_id', 'class_name', 'confidence', 'xmin', 'ymin', 'xmax', 'ymax']
+
+
+def letterbox(image, size: int = DEFAULT_IMGSZ, stride: Optional[int] = None) -> Tuple[Any, float, Tuple[int, int]]:
+    """Scale `image` to fit a size x size square and pad the rest.
+
+    With `stride`, pad only up to the next multiple of it instead of the full
+    square (ultralytics' rectangular inference; less work for wide frames).
+    Returns (padded image, scale, (pad_x, pad_y)).
+    """
+    import cv2
+
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    if (new_w, new_h) != (width, height):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    out_w, out_h = size, size
+    if stride:
+        out_w, out_h = -(-new_w // stride) * stride, -(-new_h // stride) * stride
+    pad_x, pad_y = (out_w - new_w) // 2, (out_h - new_h) // 2
+    padded = cv2.copyMakeBorder(image, pad_y, out_h - new_h - pad_y, pad_x, out_w - new_w - pad_x,
+                                cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return padded, scale, (pad_x, pad_y)
+
+
+def unletterbox(box: Tuple[int, int, int, int], scale: float, pad: Tuple[int, int],
+                shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
+    """Map a box from letterboxed coordinates back to the original image, clipped to it."""
+    height, width = shape[:2]
+    xmin, ymin, xmax, ymax = box
+    xmin = min(max((xmin - pad[0]) / scale, 0), width - 1)
+    xmax = min(max((xmax - pad[0]) / scale, 0), width - 1)
+    ymin = min(max((ymin - pad[1]) / scale, 0), height - 1)
+    ymax = min(max((ymax - pad[1]) / scale, 0), height - 1)
+    return int(xmin), int(ymin), int(xmax), int(ymax)
+
+
+def iter_prefetched(paths: List[str], load: Callable[[str], Any], workers: int = DEFAULT_LOADERS,
+                    prefetch: int = 2 * DEFAULT_BATCH_SIZE) -> Iterator[Tuple[str, Any]]:
+    """(path, load(path)) in order, with up to `prefetch` loads running ahead on `workers` threads.
+
+    A load that raises yields (path, None) so one bad file does not stop the folder.
+    """
+    def safe_load(path):
+        try:
+            return load(path)
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='image-loader') as pool:
+        pending: deque = deque()
+        paths_iter = iter(paths)
+        for path in paths_iter:
+            pending.append((path, pool.submit(safe_load, path)))
+            if len(pending) >= max(1, prefetch):
+                break
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(paths_iter, None)
+            if next_path is not None:
+                pending.append((next_path, pool.submit(safe_load, next_path)))
+            yield path, future.result()
+
+
+def batched(items: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_detections(images: List[Dict[str, Any]], csv_path: str, json_path: Optional[str] = None):
+    """One CSV row per detection (and optionally the per-image list as JSON)."""
+    with open(csv_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for image in images:
+            for det in image["detections"]:
+                writer.writerow({"image": image["input"], "class_id": det["class_id"],
+                                 "class_name": det["class_name"], "confidence": det["confidence"],
+                                 **det["box"]})
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(images, f)
@@ -0,0 +1,164 @@
+"""
+Accuracy of a DetectionPipeline on a YOLO-format labelled image folder.
+Computes precision/recall and mAP@0.5 and mAP@0.5:0.95 (all-point
+interpolated AP, as in the ultralytics validator) through the pipeline's own
+detect(), so it measures whichever backend the pipeline runs on.
+"""
+
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .pipeline import list_images
+from .tracker import iou_matrix
+
+# Low threshold so the precision/recall curve is complete
+EVAL_CONF = 0.001
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+# np.trapz was renamed in NumPy 2.0
+_trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+def labels_dir_for(images_dir: str) -> str:
+    """The YOLO labels folder next to an images folder (.../images -> .../labels)."""
+    parent, name = os.path.split(os.path.normpath(images_dir))
+    return os.path.join(parent, 'labels' if name == 'images' else name)
+
+
+def read_labels(label_path: str, width: int, height: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(boxes xyxy in pixels, class ids) from a YOLO txt file; empty if it is missing."""
+    rows = []
+    if os.path.exists(label_path):
+        with open(label_path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 5:
+                    rows.append([float(v) for v in parts[:5]])
+    if not rows:
+        return np.zeros((0, 4)), np.zeros(0, dtype=np.int64)
+    data = np.array(rows)
+    cx, cy, w, h = data[:, 1] * width, data[:, 2] * height, data[:, 3] * width, data[:, 4] * height
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return boxes, data[:, 0].astype(np.int64)
+
+
+def match_image(pred_boxes: np.ndarray, pred_conf: np.ndarray, pred_cls: np.ndarray,
+                gt_boxes: np.ndarray, gt_cls: np.ndarray,
+                iou_thresholds: np.ndarray = IOU_THRESHOLDS) -> np.ndarray:
+    """(n_pred, n_thresholds) true-positive flags; each ground-truth box matches at most once."""
+    tp = np.zeros((len(pred_boxes), len(iou_thresholds)), dtype=bool)
+    if len(pred_boxes) == 0 or len(gt_boxes) == 0:
+        return tp
+    iou = iou_matrix(pred_boxes, gt_boxes)
+    iou[pred_cls[:, None] != gt_cls[None, :]] = 0.0
+    order = np.argsort(-pred_conf)
+    for t, threshold in enumerate(iou_thresholds):
+        taken = np.zeros(len(gt_boxes), dtype=bool)
+        for i in order.tolist():
+            candidates = np.where(~taken & (iou[i] >= threshold))[0]
+            if len(candidates):
+                j = candidates[np.argmax(iou[i, candidates])]
+                taken[j] = True
+                tp[i, t] = True
+    return tp
+
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """Area under the interpolated precision/recall curve."""
+    mrec = np.concatenate([[0.0], recall, [1.0]])
+    mpre = np.concatenate([[1.0], precision, [0.0]])
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    return float(_trapezoid(np.interp(x, mrec, mpre), x))
+
+
+def summarize_matches(tp: np.ndarray, conf: np.ndarray, pred_cls: np.ndarray, gt_cls: np.ndarray,
+                      names: Dict[int, str]) -> Dict[str, Any]:
+    """mAP, precision and recall from the stacked per-prediction matches of a whole dataset."""
+    order = np.argsort(-conf)
+    tp, conf, pred_cls = tp[order], conf[order], pred_cls[order]
+    per_class: Dict[str, Any] = {}
+    ap = []
+    precisions, recalls = [], []
+    for class_id in np.unique(np.concatenate([gt_cls, pred_cls])).tolist():
+        n_gt = int((gt_cls == class_id).sum())
+        mask = pred_cls == class_id
+        if n_gt == 0:
+            continue
+        if not mask.any():
+            class_ap = np.zeros(tp.shape[1])
+            p = r = 0.0
+        else:
+            tpc = np.cumsum(tp[mask], axis=0)
+            fpc = np.cumsum(~tp[mask], axis=0)
+            recall = tpc / n_gt
+            precision = tpc / (tpc + fpc)
+            class_ap = np.array([average_precision(recall[:, t], precision[:, t]) for t in range(tp.shape[1])])
+            # Operating point at the highest-F1 confidence for IoU 0.5
+            f1 = 2 * precision[:, 0] * recall[:, 0] / np.maximum(precision[:, 0] + recall[:, 0], 1e-9)
+            best = int(np.argmax(f1))
+            p, r = float(precision[best, 0]), float(recall[best, 0])
+        ap.append(class_ap)
+        precisions.append(p)
+        recalls.append(r)
+        per_class[names.get(class_id, str(class_id))] = {
+            "instances": n_gt, "ap50": float(class_ap[0]), "ap50_95": float(class_ap.mean())
+        }
+    ap = np.array(ap) if ap else np.zeros((1, tp.shape[1]))
+    return {
+        "map50": float(ap[:, 0].mean()),
+        "map50_95": float(ap.mean()),
+        "precision": float(np.mean(precisions)) if precisions else 0.0,
+        "recall": float(np.mean(recalls)) if recalls else 0.0,
+        "per_class": per_class
+    }
+
+
+def evaluate(pipeline, images_dir: str, labels_dir: Optional[str] = None, limit: Optional[int] = None,
+             conf: float = EVAL_CONF, paths: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run `pipeline` over a labelled folder (or just `paths` in it) and score it against the labels."""
+    import cv2
+
+    labels_dir = labels_dir or labels_dir_for(images_dir)
+    paths = list_images(images_dir) if paths is None else paths
+    paths = paths[:limit] if limit else paths
+    tps: List[np.ndarray] = []
+    confs: List[np.ndarray] = []
+    classes: List[np.ndarray] = []
+    gts: List[np.ndarray] = []
+    saved_conf = pipeline.conf
+    pipeline.conf = conf
+    start = time.perf_counter()
+    try:
+        for path in paths:
+            frame = cv2.imread(path)
+            if frame is None:
+                continue
+            height, width = frame.shape[:2]
+            stem = os.path.splitext(os.path.basename(path))[0]
+            gt_boxes, gt_cls = read_labels(os.path.join(labels_dir, stem + '.txt'), width, height)
+            detections = pipeline.detect(frame)
+            boxes = np.array([d.box for d in detections], dtype=np.float64).reshape(-1, 4)
+            pred_conf = np.array([d.confidence for d in detections])
+            pred_cls = np.array([d.class_id for d in detections], dtype=np.int64)
+            tps.append(match_image(boxes, pred_conf, pred_cls, gt_boxes, gt_cls))
+            confs.append(pred_conf)
+            classes.append(pred_cls)
+            gts.append(gt_cls)
+    finally:
+        pipeline.conf = saved_conf
+    elapsed = time.perf_counter() - start
+
+    result = summarize_matches(
+        np.concatenate(tps) if tps else np.zeros((0, len(IOU_THRESHOLDS)), dtype=bool),
+        np.concatenate(confs) if confs else np.zeros(0),
+        np.concatenate(classes) if classes else np.zeros(0, dtype=np.int64),
+        np.concatenate(gts) if gts else np.zeros(0, dtype=np.int64),
+        dict(pipeline.labels)
+    )
+    result["images"] = len(tps)
+    result["eval_seconds"] = elapsed
+    return result
@@ -0,0 +1,67 @@
+"""
+Motion gate for long, mostly static videos.
+Compares a small greyscale thumbnail of each frame with the last frame the
+model actually ran on. Detection only runs when the mean absolute difference
+passes a threshold, or when `stride` frames have gone by without a detection
+pass (a floor so slow changes are not missed).
+"""
+
+from typing import Optional, Tuple
+
+# Thumbnail the gate compares; small enough to cost well under a millisecond
+GATE_SIZE = (64, 36)
+
+
+class MotionGate:
+    """Decides per frame whether to run detection.
+
+    threshold: mean absolute grey-level difference (0-255) that counts as
+    change; None disables the motion check, leaving a fixed stride.
+    stride: run detection at least every `stride` frames; 0 = no floor.
+    """
+
+    def __init__(self, threshold: Optional[float] = None, stride: int = 0):
+        self.threshold = threshold
+        self.stride = max(0, int(stride or 0))
+        self.reference = None
+        self.since_inferred = 0
+        self.decoded = 0
+        self.inferred = 0
+
+    @property
+    def active(self) -> bool:
+        return self.threshold is not None or self.stride > 1
+
+    def _thumbnail(self, frame):
+        import cv2
+        small = cv2.resize(frame, GATE_SIZE, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def check(self, frame) -> Tuple[bool, Optional[float]]:
+        """(run detection?, change score) for the next frame."""
+        self.decoded += 1
+        self.since_inferred += 1
+        score = None
+        thumb = None
+        if self.threshold is not None:
+            import cv2
+            thumb = self._thumbnail(frame)
+            if self.reference is not None:
+                score = float(cv2.absdiff(thumb, self.reference).mean())
+        run = (self.inferred == 0 or (self.stride and self.since_inferred >= self.stride)
+               or (score is not None and score >= self.threshold))
+        if run:
+            self.inferred += 1
+            self.since_inferred = 0
+            if thumb is not None:
+                self.reference = thumb
+        return run, score
+
+    def report(self):
+        return {
+            "frames_decoded": self.decoded,
+            "frames_inferred": self.inferred,
+            "inferred_fraction": self.inferred / self.decoded if self.decoded else None,
+            "motion_threshold": self.threshold,
+            "stride": self.stride
+        }
@@ -0,0 +1,114 @@
+"""
+Interactive viewer with the flags of the original per-model yolo_detect.py scripts.
+Shows results in a window: 'q' quits, 's' pauses, 'p' saves capture.png.
+"""
+
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from typing import List, Optional
+
+from .pipeline import DetectionPipeline, list_images, source_type
+from .timing import StageTimings
+
+RECORD_NAME = 'demo1.avi'
+RECORD_FPS = 30
+FPS_AVG_LEN = 200
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', help='Path to YOLO model file (example: "runs/detect/train/weights/best.pt")',
+                        required=True)
+    parser.add_argument('--source', help='Image source, can be image file ("test.jpg"), '
+                        'image folder ("test_dir"), video file ("testvid.mp4"), or index of USB camera ("usb0")',
+                        required=True)
+    parser.add_argument('--thresh', help='Minimum confidence threshold for displaying detected objects (example: "0.4")',
+                        default=0.5)
+    parser.add_argument('--resolution', help='Resolution in WxH to display inference results at (example: "640x480"), '
+                        'otherwise, match source resolution',
+                        default=None)
+    parser.add_argument('--record', help='Record results from video or webcam and save it as "demo1.avi". '
+                        'Must specify --resolution argument to record.',
+                        action='store_true')
+    parser.add_argument('--classes', help='Only show these classes, by name or index (example: "diver")',
+                        nargs='+', default=None)
+    parser.add_argument('--timings', help='Print per-stage timings as a JSON line every N seconds and at exit '
+                        '(example: "10")', type=float, default=None)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    import cv2
+
+    try:
+        kind = source_type(args.source)
+        pipeline = DetectionPipeline(args.model, conf=float(args.thresh), resolution=args.resolution,
+                                     classes=args.classes)
+    except (ValueError, FileNotFoundError) as e:
+        print(f'ERROR: {e}')
+        return 0
+
+    recorder = None
+    if args.record:
+        if kind not in ('video', 'stream', 'usb'):
+            print('Recording only works for video and camera sources. Please try again.')
+            return 0
+        if not pipeline.resolution:
+            print('Please specify resolution to record video at.')
+            return 0
+        recorder = cv2.VideoWriter(RECORD_NAME, cv2.VideoWriter_fourcc(*'MJPG'), RECORD_FPS, pipeline.resolution)
+
+    if kind in ('image', 'folder'):
+        frames = (cv2.imread(path) for path in ([args.source] if kind == 'image' else list_images(args.source)))
+    else:
+        frames = pipeline.iter_frames(args.source)
+
+    still = kind in ('image', 'folder')
+    timings = pipeline.timings = StageTimings(args.timings, lambda report: print(json.dumps(report), flush=True))
+    frame_times = deque(maxlen=FPS_AVG_LEN)
+    avg_frame_rate = 0.0
+    try:
+        for frame in timings.timed_iter('decode', iter(frames)):
+            t_start = time.perf_counter()
+            with timings.time('resize'):
+                frame = pipeline.resize(frame)
+            detections = pipeline.detect(frame)
+            with timings.time('draw'):
+                pipeline.annotate(frame, detections, None if still else avg_frame_rate)
+            with timings.time('display'):
+                cv2.imshow('YOLO detection results', frame)
+            if recorder is not None:
+                with timings.time('encode'):
+                    recorder.write(frame)
+            timings.frame_done()
+
+            # Images wait for a keypress before the next one; streams wait 5 ms
+            key = cv2.waitKey() if still else cv2.waitKey(5)
+            if key in (ord('q'), ord('Q')):
+                break
+            elif key in (ord('s'), ord('S')):
+                cv2.waitKey()
+            elif key in (ord('p'), ord('P')):
+                cv2.imwrite('capture.png', frame)
+
+            frame_times.append(time.perf_counter() - t_start)
+            avg_frame_rate = len(frame_times) / sum(frame_times)
+        else:
+            print('All images have been processed. Exiting program.' if still
+                  else 'Reached end of the video source. Exiting program.')
+    finally:
+        print(f'Average pipeline FPS: {avg_frame_rate:.2f}')
+        if args.timings:
+            print(json.dumps(timings.report()))
+        if recorder is not None:
+            recorder.release()
+        cv2.destroyAllWindows()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
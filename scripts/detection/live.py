@@ -0,0 +1,381 @@
+"""
+Live detection for cameras and streams.
+LatestFrameGrabber reads the source on its own thread as fast as it delivers
+and keeps only the newest frame. Inference therefore always starts on the
+latest frame: when the model is slower than the camera the frames in between
+are dropped (and counted), instead of queueing up and adding delay.
+LiveDetector runs detection, drawing and JPEG encoding once per frame and
+shares the result with every viewer. A viewer that cannot keep up skips to
+the newest frame and never holds back capture or inference.
+Every frame carries its capture time, so the latency from capture to the
+annotated frame being ready, and to each viewer receiving it, is measured.
+make_live_server() serves it over HTTP as MJPEG and as server-sent JSON events.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+from .pipeline import DEFAULT_FPS, DetectionPipeline, source_type
+from .timing import RollingStat, StageTimings
+
+DEFAULT_LIVE_HOST = '127.0.0.1'
+DEFAULT_LIVE_PORT = 8766
+DEFAULT_JPEG_QUALITY = 80
+# How long a viewer waits for the next frame before checking that the source is still alive
+WAIT_SECONDS = 1.0
+RECONNECT_SECONDS = 1.0
+BOUNDARY = 'frame'
+
+
+class LatestFrameGrabber:
+    """Reads `source` on a background thread and keeps only the newest frame.
+
+    Video files are played at their frame rate, and forever with loop, so a
+    recording can stand in for a live camera. Their capture time is the moment
+    the frame was due, so the decode counts towards the latency as it would
+    for a camera. A stream URL that drops after delivering frames is reopened.
+    """
+
+    def __init__(self, pipeline: DetectionPipeline, source: str, loop: bool = False):
+        self.pipeline = pipeline
+        self.source = source
+        self.kind = source_type(source)
+        if self.kind not in ('video', 'stream', 'usb', 'picamera'):
+            raise ValueError(f"Live mode needs a camera, stream URL or video file, not {self.kind} {source}")
+        self.loop = loop
+        self.cond = threading.Condition()
+        self.frame = None
+        self.captured = 0.0
+        self.seq = 0
+        self.taken = 0
+        self.dropped = 0
+        self.ended = False
+        self.error: Optional[str] = None
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='grabber', daemon=True)
+
+    def start(self) -> 'LatestFrameGrabber':
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    def _frames(self) -> Iterator[Tuple[Any, float]]:
+        """(frame, capture time) pairs from the source."""
+        if self.kind == 'stream':
+            while not self.stopped.is_set():
+                played = 0
+                for frame in self.pipeline.iter_frames(self.source):
+                    played += 1
+                    yield frame, time.perf_counter()
+                if not played:
+                    return
+                self.stopped.wait(RECONNECT_SECONDS)
+            return
+        if self.kind != 'video':
+            for frame in self.pipeline.iter_frames(self.source):
+                yield frame, time.perf_counter()
+            return
+
+        import cv2
+
+        cap = cv2.VideoCapture(self.source)
+        period = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS)
+        cap.release()
+        due = time.perf_counter()
+        while not self.stopped.is_set():
+            frames = self.pipeline.iter_frames(self.source)
+            played = 0
+            try:
+                while not self.stopped.is_set():
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        self.stopped.wait(delay)
+                    frame = next(frames, None)
+                    if frame is None:
+                        break
+                    played += 1
+                    yield frame, due
+                    # After a stall, carry on from now rather than replaying the backlog at full speed
+                    due = max(due + period, time.perf_counter() - period)
+            finally:
+                frames.close()
+            if not self.loop or not played:
+                return
+
+    def _run(self):
+        try:
+            for frame, captured in self._frames():
+                with self.cond:
+                    if self.seq > self.taken:
+                        # Nobody took the previous frame before this one replaced it
+                        self.dropped += 1
+                    self.frame = frame
+                    self.captured = captured
+                    self.seq += 1
+                    self.cond.notify_all()
+                if self.stopped.is_set():
+                    break
+            if not self.seq:
+                self.error = f"Could not read frames from {self.source}"
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            with self.cond:
+                self.ended = True
+                self.cond.notify_all()
+
+    def latest(self, after: int, timeout: float = WAIT_SECONDS) -> Optional[Tuple[int, Any, float]]:
+        """The newest frame newer than sequence number `after` as (seq, frame, capture time), or None."""
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > after or self.ended, timeout)
+            if self.seq <= after:
+                return None
+            self.taken = self.seq
+            return self.seq, self.frame, self.captured
+
+
+class LiveFrame:
+    """One annotated frame as every viewer gets it."""
+
+    __slots__ = ('seq', 'source_seq', 'captured', 'captured_at', 'ready', 'jpeg', 'detections')
+
+    def __init__(self, seq: int, source_seq: int, captured: float, ready: float, jpeg: bytes, detections):
+        self.seq = seq
+        self.source_seq = source_seq
+        self.captured = captured
+        # Wall-clock capture time, so a client on a synchronised clock can measure its own latency
+        self.captured_at = time.time() - (time.perf_counter() - captured)
+        self.ready = ready
+        self.jpeg = jpeg
+        self.detections = detections
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "source_frame": self.source_seq,
+            "captured_at": self.captured_at,
+            "latency_ms": (self.ready - self.captured) * 1000.0,
+            "count": len(self.detections),
+            "detections": [d.to_dict() for d in self.detections]
+        }
+
+
+class LiveDetector:
+    """Detects on the grabber's newest frame on one thread and shares each annotated frame with all viewers."""
+
+    def __init__(self, pipeline: DetectionPipeline, grabber: LatestFrameGrabber, track: bool = False,
+                 jpeg_quality: int = DEFAULT_JPEG_QUALITY):
+        self.pipeline = pipeline
+        self.grabber = grabber
+        self.jpeg_quality = jpeg_quality
+        self.tracker = None
+        if track:
+            from .tracker import Tracker
+            self.tracker = Tracker()
+        self.timings = pipeline.timings = StageTimings()
+        self.cond = threading.Condition()
+        self.current: Optional[LiveFrame] = None
+        self.ended = False
+        self.lock = threading.Lock()
+        self.viewers = 0
+        self.latency = {"capture_to_ready": RollingStat(), "capture_to_sent": RollingStat()}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='inference', daemon=True)
+
+    def start(self) -> 'LiveDetector':
+        self.grabber.start()
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.grabber.stop()
+
+    def _run(self):
+        import cv2
+
+        pipeline = self.pipeline
+        timings = self.timings
+        source_seq = 0
+        seq = 0
+        # Rolling frame rate over the last 50 frames, drawn on the stream
+        ready_at = deque(maxlen=50)
+        try:
+            while not self.stopped.is_set():
+                latest = self.grabber.latest(source_seq)
+                if latest is None:
+                    if self.grabber.ended:
+                        break
+                    continue
+                source_seq, frame, captured = latest
+                with timings.time('resize'):
+                    frame = pipeline.resize(frame)
+                detections = pipeline.detect(frame)
+                if self.tracker is not None:
+                    with timings.time('track'):
+                        detections = self.tracker.update(detections)
+                shown_fps = (len(ready_at) - 1) / (ready_at[-1] - ready_at[0]) if len(ready_at) > 1 else 0.0
+                with timings.time('draw'):
+                    pipeline.annotate(frame, detections, shown_fps)
+                with timings.time('encode'):
+                    ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+                if not ok:
+                    continue
+                ready = time.perf_counter()
+                ready_at.append(ready)
+                seq += 1
+                live = LiveFrame(seq, source_seq, captured, ready, encoded.tobytes(), detections)
+                with self.lock:
+                    self.latency["capture_to_ready"].add((ready - captured) * 1000.0)
+                with self.cond:
+                    self.current = live
+                    self.cond.notify_all()
+                timings.frame_done()
+        finally:
+            with self.cond:
+                self.ended = True
+                self.cond.notify_all()
+
+    def wait_frame(self, after: int, timeout: float = WAIT_SECONDS) -> Optional[LiveFrame]:
+        """The newest frame newer than `after` (a LiveFrame seq), or None on timeout or when the stream ended."""
+        with self.cond:
+            self.cond.wait_for(lambda: (self.current is not None and self.current.seq > after) or self.ended,
+                               timeout)
+            frame = self.current
+        return frame if frame is not None and frame.seq > after else None
+
+    def sent(self, frame: LiveFrame):
+        """Record that a viewer has been handed `frame`."""
+        with self.lock:
+            self.latency["capture_to_sent"].add((time.perf_counter() - frame.captured) * 1000.0)
+
+    def viewer(self, delta: int):
+        with self.lock:
+            self.viewers += delta
+
+    def stats(self) -> Dict[str, Any]:
+        grabber = self.grabber
+        with grabber.cond:
+            grabbed, dropped = grabber.seq, grabber.dropped
+        with self.lock:
+            latency = {name: stat.to_dict() for name, stat in self.latency.items()}
+            viewers = self.viewers
+        timings = self.timings.report()
+        return {
+            "success": grabber.error is None,
+            "source": grabber.source,
+            "kind": grabber.kind,
+            "frames_grabbed": grabbed,
+            "frames_dropped": dropped,
+            "frames_inferred": timings["frames"],
+            "fps": timings["fps"],
+            "viewers": viewers,
+            "latency": latency,
+            "stage_timings": timings,
+            "ended": self.ended,
+            **({"error": grabber.error} if grabber.error else {})
+        }
+
+
+VIEWER_PAGE = """<!doctype html>
+<html><head><title>Live detection</title>
+<style>body{background:#0f172a;color:#e2e8f0;font-family:sans-serif;margin:16px}img{max-width:100%}</style>
+</head><body>
+<img src="/stream.mjpg" alt="Live detections">
+<pre id="info">waiting for frames...</pre>
+<script>
+// Capture to this browser, on the clock of the machine serving the stream
+const events = new EventSource("/events")
+events.onmessage = (e) => {
+  const f = JSON.parse(e.data)
+  const names = f.detections.map((d) => d.class_name).join(", ")
+  document.getElementById("info").textContent =
+    `frame ${f.source_frame}: ${f.count} objects ${names ? "(" + names + ")" : ""}\\n` +
+    `capture to detections ${f.latency_ms.toFixed(0)} ms, capture to browser ${(Date.now() - f.captured_at * 1000).toFixed(0)} ms`
+}
+</script>
+</body></html>
+"""
+
+
+def make_live_server(live: LiveDetector, host: str = DEFAULT_LIVE_HOST,
+                     port: int = DEFAULT_LIVE_PORT) -> ThreadingHTTPServer:
+    """GET / (viewer page), /stream.mjpg (MJPEG), /events (JSON per frame, text/event-stream), /frame.jpg, /stats."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _headers(self, status: int, content_type: str, length: Optional[int] = None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Cache-Control', 'no-store')
+            # The API routes' page is served from another port
+            self.send_header('Access-Control-Allow-Origin', '*')
+            if length is not None:
+                self.send_header('Content-Length', str(length))
+            self.end_headers()
+
+        def _send(self, status: int, content_type: str, body: bytes):
+            self._headers(status, content_type, len(body))
+            self.wfile.write(body)
+
+        def _frames(self) -> Iterator[LiveFrame]:
+            """Every newest frame until the stream ends; skips whatever was produced while the last one was sent."""
+            seq = 0
+            live.viewer(1)
+            try:
+                while True:
+                    frame = live.wait_frame(seq)
+                    if frame is None:
+                        if live.ended:
+                            return
+                        continue
+                    seq = frame.seq
+                    yield frame
+                    live.sent(frame)
+            finally:
+                live.viewer(-1)
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            try:
+                if path == '/':
+                    self._send(200, 'text/html; charset=utf-8', VIEWER_PAGE.encode())
+                elif path == '/stats':
+                    self._send(200, 'application/json', json.dumps(live.stats()).encode())
+                elif path == '/frame.jpg':
+                    frame = live.current
+                    if frame is None:
+                        self._send(503, 'application/json', b'{"success": false, "error": "No frame yet"}')
+                    else:
+                        self._send(200, 'image/jpeg', frame.jpeg)
+                elif path == '/stream.mjpg':
+                    self._headers(200, f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+                    for frame in self._frames():
+                        self.wfile.write(f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                                         f'Content-Length: {len(frame.jpeg)}\r\n\r\n'.encode())
+                        self.wfile.write(frame.jpeg)
+                        self.wfile.write(b'\r\n')
+                        self.wfile.flush()
+                elif path == '/events':
+                    self._headers(200, 'text/event-stream')
+                    for frame in self._frames():
+                        self.wfile.write(f'data: {json.dumps(frame.to_dict())}\n\n'.encode())
+                        self.wfile.flush()
+                else:
+                    self._send(404, 'application/json', b'{"success": false, "error": "Not found"}')
+            except (BrokenPipeError, ConnectionResetError):
+                # The viewer went away
+                pass
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
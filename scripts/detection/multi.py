@@ -0,0 +1,158 @@
+"""
+Several detectors on one decode.
+MultiDetector loads the divers, mines and submarine models (or any set) once,
+letterboxes each frame once into a shared input tensor and runs every model on
+that tensor, concurrently by default. Detections come back merged, with class
+names namespaced by detector ('divers:diver') and class ids offset so they
+stay distinct. It is a DetectionPipeline, so the image, folder and video modes
+(pipelining, gating, tracking) work unchanged.
+"""
+
+import os
+import glob
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .backends import DEFAULT_BACKEND, parse_backend
+from .backends import load as load_backend
+from .batch import DEFAULT_IMGSZ, letterbox, unletterbox
+from .pipeline import (DEFAULT_CONF, Detection, DetectionPipeline, detections_from_arrays, parse_resolution,
+                       resolve_classes)
+
+# YOLO input sides must be multiples of the largest feature stride
+MODEL_STRIDE = 32
+
+
+def detector_name(weights: str) -> str:
+    """Default detector name: the folder under 'Detection model' ('Detection model/divers/best.pt' -> 'divers')."""
+    return os.path.basename(os.path.dirname(os.path.abspath(weights))) or os.path.splitext(os.path.basename(weights))[0]
+
+
+def find_weights(folder: str) -> Optional[str]:
+    """best.pt in `folder`, else the first .pt (how the API routes pick a detector's weights)."""
+    best = os.path.join(folder, 'best.pt')
+    if os.path.isfile(best):
+        return best
+    found = sorted(glob.glob(os.path.join(folder, '*.pt')))
+    return found[0] if found else None
+
+
+def parse_weights(specs: List[str]) -> Dict[str, str]:
+    """['divers=a.pt', 'b.pt'] -> {'divers': 'a.pt', <folder of b.pt>: 'b.pt'}."""
+    models: Dict[str, str] = {}
+    for spec in specs:
+        name, sep, path = spec.partition('=')
+        if not sep or os.path.exists(spec):
+            name, path = detector_name(spec), spec
+        if name in models:
+            raise ValueError(f"Two detectors are named {name}; use name=path")
+        models[name] = path
+    return models
+
+
+class MultiDetector(DetectionPipeline):
+    """Runs several YOLO models on the same preprocessed frames and merges their detections."""
+
+    def __init__(self, models: Dict[str, str], conf: float = DEFAULT_CONF, resolution: Optional[str] = None,
+                 device: Optional[str] = None, classes: Optional[List[str]] = None, backend: str = DEFAULT_BACKEND,
+                 calibration_dirs: Optional[List[str]] = None, imgsz: int = DEFAULT_IMGSZ,
+                 concurrent: bool = True, loaded: Optional[Dict[str, Any]] = None):
+        """`classes` takes namespaced names ('divers:diver') or merged ids.
+
+        `loaded` maps detector names to models that are already loaded (the
+        detection server's), which are used instead of loading `models` again.
+        """
+        for weights in models.values():
+            if not os.path.exists(weights):
+                raise FileNotFoundError(f"Model path is invalid or model was not found: {weights}")
+
+        self.weights = dict(models)
+        self.conf = float(conf)
+        self.resolution = parse_resolution(resolution)
+        self.device = device
+        self.backend = backend
+        self.imgsz = imgsz
+        self.tile_size = None
+        self.models: Dict[str, Any] = {}
+        self.offsets: Dict[str, int] = {}
+        self.labels: Dict[int, str] = {}
+        name, int8 = parse_backend(backend)
+        start = time.perf_counter()
+        offset = 0
+        for detector, weights in models.items():
+            model = loaded[detector] if loaded and detector in loaded else \
+                load_backend(weights, name, int8, calibration_dirs)
+            self.models[detector] = model
+            self.offsets[detector] = offset
+            for class_id, class_name in model.names.items():
+                self.labels[offset + class_id] = f"{detector}:{class_name}"
+            offset += len(model.names)
+        self.load_seconds = time.perf_counter() - start
+        self.class_ids = resolve_classes(classes, self.labels)
+        self.model = None
+        self.timings = None
+        self.pool = ThreadPoolExecutor(max_workers=len(models), thread_name_prefix='detector') \
+            if concurrent and len(models) > 1 else None
+
+    def _run_model(self, detector: str, tensor) -> List[List[Detection]]:
+        """One model over the shared tensor; detections in letterboxed coordinates, namespaced."""
+        model = self.models[detector]
+        kwargs = self._predict_kwargs(imgsz=self.imgsz)
+        # Merged class ids mean nothing to the individual models; filter after merging instead
+        kwargs.pop("classes", None)
+        results = model(tensor, **kwargs)
+        offset = self.offsets[detector]
+        per_frame = []
+        for result in results:
+            boxes = result.boxes
+            if len(boxes) == 0:
+                per_frame.append([])
+                continue
+            detections = detections_from_arrays(boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(),
+                                                boxes.cls.cpu().numpy() + offset, self.labels, self.conf,
+                                                self.class_ids)
+            per_frame.append(detections)
+        return per_frame
+
+    def detect_batch(self, frames: List[Any], imgsz: Optional[int] = None) -> List[List[Detection]]:
+        """Merged detections of every model for each frame; each frame is preprocessed once."""
+        import numpy as np
+        import torch
+
+        size = imgsz or self.imgsz
+        t0 = time.perf_counter()
+        # Same-shaped frames (video) can use the smaller stride-aligned rectangle
+        stride = MODEL_STRIDE if len({frame.shape for frame in frames}) == 1 else None
+        letterboxed = [letterbox(frame, size, stride) for frame in frames]
+        t1 = time.perf_counter()
+        batch = np.stack([padded[:, :, ::-1].transpose(2, 0, 1) for padded, _, _ in letterboxed])
+        tensor = torch.from_numpy(np.ascontiguousarray(batch)).float().div_(255.0)
+        t2 = time.perf_counter()
+
+        if self.pool is not None:
+            futures = [self.pool.submit(self._run_model, detector, tensor) for detector in self.models]
+            outputs = [f.result() for f in futures]
+        else:
+            outputs = [self._run_model(detector, tensor) for detector in self.models]
+        t3 = time.perf_counter()
+
+        merged = []
+        for i, (frame, (_, scale, pad)) in enumerate(zip(frames, letterboxed)):
+            merged.append([
+                Detection(d.class_id, d.class_name, d.confidence, unletterbox(d.box, scale, pad, frame.shape))
+                for per_model in outputs for d in per_model[i]
+            ])
+        if self.timings is not None:
+            # Wall time of each step, shared over the batch (the models may run concurrently)
+            share = 1.0 / len(frames)
+            t4 = time.perf_counter()
+            for _ in frames:
+                self.timings.add('letterbox', (t1 - t0) * share)
+                self.timings.add('preprocess', (t2 - t1) * share)
+                self.timings.add('inference', (t3 - t2) * share)
+                self.timings.add('postprocess', (t4 - t3) * share)
+        return merged
+
+    def detect(self, frame) -> List[Detection]:
+        return self.detect_batch([frame])[0]
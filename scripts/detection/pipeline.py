@@ -0,0 +1,721 @@
+"""
+Headless YOLO detection pipeline.
+Loads a model once and runs it on images, image folders and videos. Returns
+structured detections and writes annotated output. Nothing here opens a window,
+so it is safe to call from the API routes and other server-side code.
+"""
+
+import os
+import glob
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .backends import DEFAULT_BACKEND, parse_backend
+from .backends import load as load_backend
+from .batch import (DEFAULT_BATCH_SIZE, DEFAULT_IMGSZ, DEFAULT_LOADERS, batched, iter_prefetched, letterbox,
+                    unletterbox, write_detections)
+from .gating import MotionGate
+from .preview import DEFAULT_PREVIEW_FRAMES, DEFAULT_PREVIEW_WIDTH, contact_sheet, preview_indices
+from .tiling import DEFAULT_TILE_OVERLAP, nms, tile_grid
+from .stages import DEFAULT_QUEUE_SIZE, run_pipelined, run_sequential
+from .timing import StageTimings
+from .video_writer import open_writer
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp'}
+VIDEO_EXTENSIONS = {'.avi', '.mov', '.mp4', '.mkv', '.wmv', '.webm'}
+
+# Bounding box colors (Tableau 10 color scheme)
+BBOX_COLORS = [(164, 120, 87), (68, 148, 228), (93, 97, 209), (178, 182, 133), (88, 159, 106),
+               (96, 202, 231), (159, 124, 168), (169, 162, 241), (98, 118, 150), (172, 176, 184)]
+
+DEFAULT_CONF = 0.5
+DEFAULT_FPS = 30.0
+
+
+def source_type(source: str) -> str:
+    """Classify a source as 'image', 'folder', 'video', 'stream' (an RTSP/HTTP URL), 'usb' or 'picamera'."""
+    if os.path.isdir(source):
+        return 'folder'
+    if os.path.isfile(source):
+        ext = os.path.splitext(source)[1].lower()
+        if ext in IMAGE_EXTENSIONS:
+            return 'image'
+        if ext in VIDEO_EXTENSIONS:
+            return 'video'
+        raise ValueError(f"File extension {ext} is not supported.")
+    if '://' in source:
+        return 'stream'
+    if source.startswith('usb'):
+        return 'usb'
+    if source.startswith('picamera'):
+        return 'picamera'
+    raise ValueError(f"Input {source} is invalid.")
+
+
+def parse_resolution(resolution: Optional[str]) -> Optional[Tuple[int, int]]:
+    """'640x480' -> (640, 480)."""
+    if not resolution:
+        return None
+    width, height = resolution.lower().split('x')
+    return int(width), int(height)
+
+
+def list_images(folder: str) -> List[str]:
+    """Image files directly inside `folder`, sorted."""
+    return sorted(
+        path for path in glob.glob(os.path.join(folder, '*'))
+        if os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+    )
+
+
+class Detection:
+    """One detected object."""
+
+    __slots__ = ('class_id', 'class_name', 'confidence', 'box', 'track_id')
+
+    def __init__(self, class_id: int, class_name: str, confidence: float, box: Tuple[int, int, int, int],
+                 track_id: Optional[int] = None):
+        self.class_id = class_id
+        self.class_name = class_name
+        self.confidence = confidence
+        self.box = box
+        self.track_id = track_id
+
+    def to_dict(self) -> Dict[str, Any]:
+        xmin, ymin, xmax, ymax = self.box
+        result = {
+            "class_id": self.class_id,
+            "class_name": self.class_name,
+            "confidence": round(self.confidence, 4),
+            "box": {"xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax}
+        }
+        if self.track_id is not None:
+            result["track_id"] = self.track_id
+        return result
+
+
+def summarize(detections_per_frame: List[List[Detection]]) -> Dict[str, Any]:
+    """Totals and per-class counts over a sequence of frames."""
+    classes: Dict[str, int] = {}
+    total = 0
+    max_per_frame = 0
+    for detections in detections_per_frame:
+        total += len(detections)
+        max_per_frame = max(max_per_frame, len(detections))
+        for det in detections:
+            classes[det.class_name] = classes.get(det.class_name, 0) + 1
+    return {"total_detections": total, "max_per_frame": max_per_frame, "class_counts": classes}
+
+
+def detections_from_arrays(xyxy, conf, cls, labels, min_conf: float = DEFAULT_CONF,
+                           class_ids: Optional[List[int]] = None) -> List[Detection]:
+    """Detections from (N, 4) boxes, (N,) confidences and (N,) class ids.
+
+    Keeps boxes with confidence strictly above `min_conf` and, when given, a
+    class in `class_ids`. Filtering is done on whole arrays, so this is also
+    what non-ultralytics backends return their raw outputs through.
+    """
+    import numpy as np
+
+    conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+    cls = np.asarray(cls).reshape(-1).astype(np.int64)
+    keep = conf > min_conf
+    if class_ids is not None:
+        keep &= np.isin(cls, class_ids)
+    boxes = np.asarray(xyxy).reshape(-1, 4)[keep].astype(np.int64).tolist()
+    return [Detection(c, labels[c], f, tuple(b))
+            for b, f, c in zip(boxes, conf[keep].tolist(), cls[keep].tolist())]
+
+
+def resolve_classes(classes: Optional[List[str]], labels: Dict[int, str]) -> Optional[List[int]]:
+    """Class ids for a list of class names or ids (None keeps every class)."""
+    if not classes:
+        return None
+    by_name = {name.lower(): class_id for class_id, name in labels.items()}
+    ids = []
+    for item in classes:
+        item = str(item).strip()
+        if item.isdigit() and int(item) in labels:
+            ids.append(int(item))
+        elif item.lower() in by_name:
+            ids.append(by_name[item.lower()])
+        else:
+            raise ValueError(f"Unknown class {item}; the model has {', '.join(labels.values())}")
+    return sorted(set(ids))
+
+
+class DetectionPipeline:
+    """A YOLO model loaded once, with helpers for images, folders and videos."""
+
+    def __init__(self, weights: str, conf: float = DEFAULT_CONF, resolution: Optional[str] = None,
+                 device: Optional[str] = None, classes: Optional[List[str]] = None,
+                 backend: str = DEFAULT_BACKEND, calibration_dirs: Optional[List[str]] = None,
+                 tile_size: Optional[int] = None, tile_overlap: float = DEFAULT_TILE_OVERLAP,
+                 tile_full_frame: bool = True):
+        """`backend` is torch, onnx, onnx-int8, openvino or openvino-int8 (see backends.py).
+
+        With tile_size, detect() runs sliced inference (see tiling.py): overlapping
+        tile_size tiles in one batched call, plus a whole-frame pass unless
+        tile_full_frame is False, merged by NMS.
+        """
+        if not os.path.exists(weights):
+            raise FileNotFoundError(f"Model path is invalid or model was not found: {weights}")
+
+        self.weights = weights
+        self.conf = float(conf)
+        self.resolution = parse_resolution(resolution)
+        self.device = device
+        self.backend = backend
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tile_full_frame = tile_full_frame
+        name, int8 = parse_backend(backend)
+        start = time.perf_counter()
+        self.model = load_backend(weights, name, int8, calibration_dirs)
+        self.load_seconds = time.perf_counter() - start
+        self.labels = self.model.names
+        self.class_ids = resolve_classes(classes, self.labels)
+        # Set per run by the process_* methods; detect() records into it when present
+        self.timings: Optional[StageTimings] = None
+
+    # ----- single frames -----
+
+    def _predict_kwargs(self, **extra) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"verbose": False, "conf": self.conf, **extra}
+        if self.device:
+            kwargs["device"] = self.device
+        if self.class_ids is not None:
+            kwargs["classes"] = self.class_ids
+        return kwargs
+
+    def detect(self, frame) -> List[Detection]:
+        """Detections above the confidence threshold (and in the class filter) in one BGR frame."""
+        if self.tile_size:
+            return self.detect_tiled(frame)
+        results = self.model(frame, **self._predict_kwargs())
+        start = time.perf_counter()
+        detections = self.detections_from_boxes(results[0].boxes)
+        self._record_speed(results[:1], time.perf_counter() - start)
+        return detections
+
+    def _record_speed(self, results, postprocess_seconds: float = 0.0):
+        """Add the model's own preprocess/inference/postprocess times for one frame to the run's timings."""
+        if self.timings is None:
+            return
+        speed: Dict[str, float] = {}
+        for result in results:
+            for stage, ms in result.speed.items():
+                speed[stage] = speed.get(stage, 0.0) + (ms or 0.0)
+        self.timings.add_model_speed(speed, postprocess_seconds)
+
+    def detect_tiled(self, frame) -> List[Detection]:
+        """Sliced inference: every tile in one model call, merged with the whole-frame pass by NMS."""
+        import numpy as np
+
+        height, width = frame.shape[:2]
+        tiles = tile_grid(width, height, self.tile_size, self.tile_overlap)
+        crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in tiles]
+        results = list(zip(tiles, self.model(crops, **self._predict_kwargs(imgsz=self.tile_size))))
+        if self.tile_full_frame and len(tiles) > 1:
+            results.append(((0, 0, width, height), self.model(frame, **self._predict_kwargs())[0]))
+
+        start = time.perf_counter()
+        xyxy, conf, cls = [], [], []
+        for (x0, y0, _, _), result in results:
+            boxes = result.boxes
+            if len(boxes):
+                xyxy.append(boxes.xyxy.cpu().numpy() + np.array([x0, y0, x0, y0], dtype=np.float32))
+                conf.append(boxes.conf.cpu().numpy())
+                cls.append(boxes.cls.cpu().numpy())
+        detections = []
+        if xyxy:
+            xyxy, conf, cls = np.concatenate(xyxy), np.concatenate(conf), np.concatenate(cls)
+            keep = nms(xyxy, conf, cls)
+            detections = detections_from_arrays(xyxy[keep], conf[keep], cls[keep], self.labels, self.conf,
+                                                self.class_ids)
+        self._record_speed([result for _, result in results], time.perf_counter() - start)
+        return detections
+
+    def detect_batch(self, frames: List[Any], imgsz: Optional[int] = None) -> List[List[Detection]]:
+        """Detections for several same-sized frames in one forward pass."""
+        if self.tile_size:
+            # Each frame's tiles already form one batch
+            return [self.detect_tiled(frame) for frame in frames]
+        extra = {"imgsz": imgsz} if imgsz else {}
+        results = self.model(list(frames), **self._predict_kwargs(**extra))
+        per_frame = []
+        for r in results:
+            start = time.perf_counter()
+            per_frame.append(self.detections_from_boxes(r.boxes))
+            self._record_speed([r], time.perf_counter() - start)
+        return per_frame
+
+    def detections_from_boxes(self, boxes) -> List[Detection]:
+        """Convert an ultralytics Boxes object, copying each tensor to the host once."""
+        if len(boxes) == 0:
+            return []
+        return detections_from_arrays(boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy(),
+                                      boxes.cls.cpu().numpy(), self.labels, self.conf, self.class_ids)
+
+    def annotate(self, frame, detections: List[Detection], fps: Optional[float] = None):
+        """Draw boxes, labels, the object count and (for streams) the frame rate onto `frame`."""
+        import cv2
+
+        for det in detections:
+            xmin, ymin, xmax, ymax = det.box
+            color = BBOX_COLORS[det.class_id % 10]
+            cv2.rectangle(frame, (xmin, ymin), (xmax, ymax), color, 2)
+
+            label = f'{det.class_name}: {int(det.confidence * 100)}%'
+            if det.track_id is not None:
+                label = f'#{det.track_id} {label}'
+            label_size, base_line = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+            # Keep the label inside the image at the top edge
+            label_ymin = max(ymin, label_size[1] + 10)
+            cv2.rectangle(frame, (xmin, label_ymin - label_size[1] - 10),
+                          (xmin + label_size[0], label_ymin + base_line - 10), color, cv2.FILLED)
+            cv2.putText(frame, label, (xmin, label_ymin - 7), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 1)
+
+        if fps is not None:
+            cv2.putText(frame, f'FPS: {fps:0.2f}', (10, 20), cv2.FONT_HERSHEY_SIMPLEX, .7, (0, 255, 255), 2)
+        cv2.putText(frame, f'Number of objects: {len(detections)}', (10, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, .7, (0, 255, 255), 2)
+        return frame
+
+    def resize(self, frame):
+        """Resize to the configured resolution (no-op without one)."""
+        if self.resolution is None:
+            return frame
+        import cv2
+        return cv2.resize(frame, self.resolution)
+
+    # ----- sources -----
+
+    def iter_frames(self, source: str) -> Iterator[Any]:
+        """BGR frames from a video file, stream URL, USB camera ('usb0') or Picamera ('picamera0')."""
+        import cv2
+
+        kind = source_type(source)
+        if kind == 'picamera':
+            import numpy as np
+            from picamera2 import Picamera2
+            if self.resolution is None:
+                raise ValueError("Picamera sources need a resolution")
+            cap = Picamera2()
+            cap.configure(cap.create_video_configuration(main={"format": 'XRGB8888', "size": self.resolution}))
+            cap.start()
+            try:
+                while True:
+                    frame_bgra = cap.capture_array()
+                    if frame_bgra is None:
+                        return
+                    yield cv2.cvtColor(np.copy(frame_bgra), cv2.COLOR_BGRA2BGR)
+            finally:
+                cap.stop()
+
+        cap = cv2.VideoCapture(int(source[3:]) if kind == 'usb' else source)
+        if self.resolution is not None and kind == 'usb':
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.resolution[0])
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.resolution[1])
+        if kind in ('usb', 'stream'):
+            # A short driver queue means a read returns a recent frame, not one from seconds ago
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        try:
+            while True:
+                ret, frame = cap.read()
+                if not ret or frame is None:
+                    return
+                yield frame
+        finally:
+            cap.release()
+
+    def process_image(self, image_path: str, outdir: str) -> Dict[str, Any]:
+        """Detect on one image and write the annotated copy to `outdir`."""
+        import cv2
+
+        timings = self.timings = StageTimings()
+        with timings.time('decode'):
+            frame = cv2.imread(image_path)
+        if frame is None:
+            raise ValueError(f"Could not read image: {image_path}")
+        frame, detections, infer_ms = self._detect_and_draw(frame)
+
+        os.makedirs(outdir, exist_ok=True)
+        out_path = os.path.join(outdir, os.path.basename(image_path))
+        with timings.time('encode'):
+            cv2.imwrite(out_path, frame)
+        timings.frame_done()
+        return {
+            "media": "image",
+            "input": image_path,
+            "path": out_path,
+            "count": len(detections),
+            "detections": [d.to_dict() for d in detections],
+            "inference_ms": infer_ms,
+            "stage_timings": timings.report()
+        }
+
+    def process_image_bytes(self, data: bytes, ext: str = '.jpg') -> Tuple[Dict[str, Any], bytes]:
+        """process_image for an image held in memory: the result and the annotated image encoded as `ext`."""
+        import cv2
+        import numpy as np
+
+        timings = self.timings = StageTimings()
+        with timings.time('decode'):
+            frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Could not decode the uploaded image")
+        frame, detections, infer_ms = self._detect_and_draw(frame)
+        with timings.time('encode'):
+            ok, encoded = cv2.imencode(ext, frame)
+        if not ok:
+            raise ValueError(f"Could not encode the annotated image as {ext}")
+        timings.frame_done()
+        return {
+            "media": "image",
+            "count": len(detections),
+            "detections": [d.to_dict() for d in detections],
+            "inference_ms": infer_ms,
+            "stage_timings": timings.report()
+        }, encoded.tobytes()
+
+    def _detect_and_draw(self, frame):
+        """Resize, detect and annotate one still image, recording into the run's timings."""
+        with self.timings.time('resize'):
+            frame = self.resize(frame)
+        start = time.perf_counter()
+        detections = self.detect(frame)
+        infer_ms = (time.perf_counter() - start) * 1000.0
+        with self.timings.time('draw'):
+            self.annotate(frame, detections)
+        return frame, detections, infer_ms
+
+    def process_folder(self, folder: str, outdir: str, batch_size: int = DEFAULT_BATCH_SIZE,
+                       loaders: int = DEFAULT_LOADERS, imgsz: int = DEFAULT_IMGSZ,
+                       save_images: bool = True) -> Dict[str, Any]:
+        """Detect on every image in `folder` in batches.
+
+        Images are decoded on `loaders` threads ahead of inference and
+        letterboxed to imgsz so mixed sizes share a batch. Detections for the
+        folder go to detections.csv and detections.json in `outdir`, plus
+        annotated copies unless save_images is False. Copies keep their path
+        relative to `folder`; names that would still collide get a numeric
+        suffix. Copies that fail to write are listed under write_errors.
+        """
+        import cv2
+
+        timings = self.timings = StageTimings()
+
+        def load(path):
+            with timings.time('decode'):
+                frame = cv2.imread(path)
+            if frame is None:
+                return None
+            with timings.time('resize'):
+                frame = self.resize(frame)
+            if self.tile_size:
+                # Tiled inference needs the full-resolution image
+                return frame, frame, 1.0, (0, 0)
+            with timings.time('letterbox'):
+                padded, scale, pad = letterbox(frame, imgsz)
+            return frame, padded, scale, pad
+
+        os.makedirs(outdir, exist_ok=True)
+        paths = list_images(folder)
+        images: List[Dict[str, Any]] = []
+        unreadable: List[str] = []
+        infer_seconds = 0.0
+        used_names = set()
+        written = []
+
+        def output_path(path):
+            name = os.path.relpath(path, folder)
+            stem, ext = os.path.splitext(name)
+            n = 1
+            while os.path.normcase(name) in used_names:
+                name = f"{stem}_{n}{ext}"
+                n += 1
+            used_names.add(os.path.normcase(name))
+            return os.path.join(outdir, name)
+
+        def write(path, frame):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # cv2.imwrite reports failure by returning False
+            if not cv2.imwrite(path, frame):
+                raise OSError(f"Could not write {path}")
+
+        encode = timings.timed('encode', write)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-writer') as writer:
+            loaded = iter_prefetched(paths, load, loaders, prefetch=2 * batch_size)
+            for batch in batched(loaded, max(1, batch_size)):
+                unreadable.extend(path for path, item in batch if item is None)
+                batch = [(path, item) for path, item in batch if item is not None]
+                if not batch:
+                    continue
+                t0 = time.perf_counter()
+                per_image = self.detect_batch([item[1] for _, item in batch], imgsz)
+                infer_seconds += time.perf_counter() - t0
+                for (path, (frame, _, scale, pad)), detections in zip(batch, per_image):
+                    detections = [Detection(d.class_id, d.class_name, d.confidence,
+                                            unletterbox(d.box, scale, pad, frame.shape)) for d in detections]
+                    result = {"input": path, "count": len(detections),
+                              "detections": [d.to_dict() for d in detections]}
+                    if save_images:
+                        result["path"] = output_path(path)
+                        with timings.time('draw'):
+                            self.annotate(frame, detections)
+                        written.append((result["path"], writer.submit(encode, result["path"], frame)))
+                    images.append(result)
+                    timings.frame_done()
+        elapsed = time.perf_counter() - start
+        write_errors = []
+        for path, future in written:
+            try:
+                future.result()
+            except Exception as e:
+                write_errors.append({"path": path, "error": str(e)})
+
+        csv_path = os.path.join(outdir, 'detections.csv')
+        json_path = os.path.join(outdir, 'detections.json')
+        write_detections(images, csv_path, json_path)
+        classes: Dict[str, int] = {}
+        for result in images:
+            for det in result["detections"]:
+                classes[det["class_name"]] = classes.get(det["class_name"], 0) + 1
+        return {
+            "media": "folder",
+            "input": folder,
+            "path": outdir,
+            "csv_path": csv_path,
+            "detections_path": json_path,
+            "images": len(images),
+            "unreadable": unreadable,
+            "write_errors": write_errors,
+            "total_detections": sum(r["count"] for r in images),
+            "class_counts": classes,
+            "batch_size": batch_size,
+            "images_per_second": len(images) / elapsed if elapsed > 0 else None,
+            "inference_images_per_second": len(images) / infer_seconds if infer_seconds > 0 else None,
+            "stage_timings": timings.report()
+        }
+
+    def process_video(self, video_path: str, outdir: str, pipelined: bool = True,
+                      queue_size: int = DEFAULT_QUEUE_SIZE, drop_oldest: bool = False,
+                      motion_threshold: Optional[float] = None, stride: int = 0,
+                      track: bool = False, timings_interval: Optional[float] = None,
+                      on_timings: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      encoder: str = 'auto') -> Dict[str, Any]:
+        """Detect on the frames of a video and write the annotated video to `outdir`.
+
+        By default decoding, inference and encoding overlap (see stages.py);
+        drop_oldest discards frames inference cannot keep up with, for live
+        sources. With motion_threshold and/or stride (see gating.py) detection
+        only runs on changed frames or every `stride` frames, and the last
+        detections carry forward to the frames in between. With track, a
+        SORT tracker (tracker.py) gives each object an id, moves boxes along on
+        the skipped frames and counts unique objects. Per-frame detections
+        go to a JSON file next to the video; the returned dict holds the
+        summary, per-stage utilization and timings (timing.py) and frames
+        inferred against decoded. With timings_interval, on_timings also gets
+        a timing report for each interval of that many seconds. The video is
+        streamed into ffmpeg as a faststart H.264 MP4 at the source frame rate
+        when ffmpeg is available (see video_writer.py; encoder='opencv' forces
+        the mp4v writer).
+        """
+        import cv2
+        import json
+
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        cap.release()
+
+        os.makedirs(outdir, exist_ok=True)
+        base = os.path.splitext(os.path.basename(video_path))[0]
+        out_path = os.path.join(outdir, f"{base}_detections.mp4")
+        writer = None
+        frames: List[List[Detection]] = []
+        inferred: List[bool] = []
+        gate = MotionGate(motion_threshold, stride)
+        last: List[Detection] = []
+        timings = self.timings = StageTimings(timings_interval, on_timings)
+        tracker = None
+        tracker_seconds = 0.0
+        if track:
+            from .tracker import Tracker
+            tracker = Tracker()
+
+        def infer(frame):
+            nonlocal last, tracker_seconds
+            run = True
+            if gate.active:
+                with timings.time('gate'):
+                    run = gate.check(frame)[0]
+            if tracker is not None:
+                detections = self.detect(frame) if run else None
+                start = time.perf_counter()
+                last = tracker.update(detections) if run else tracker.predict()
+                elapsed = time.perf_counter() - start
+                tracker_seconds += elapsed
+                timings.add('track', elapsed)
+            elif run:
+                last = self.detect(frame)
+            return last, run
+
+        # Rolling frame rate over the last 200 written frames, drawn on the video
+        written_at = deque(maxlen=200)
+
+        def output(index, frame, result):
+            nonlocal writer
+            detections, ran = result
+            now = time.perf_counter()
+            shown_fps = (len(written_at) - 1) / (now - written_at[0]) if len(written_at) > 1 else 0.0
+            written_at.append(now)
+            with timings.time('draw'):
+                self.annotate(frame, detections, shown_fps)
+            with timings.time('encode'):
+                if writer is None:
+                    height, width = frame.shape[:2]
+                    writer = open_writer(out_path, fps, (width, height), encoder)
+                writer.write(frame)
+            frames.append(detections)
+            inferred.append(ran)
+            timings.frame_done()
+
+        capture = self.iter_frames(video_path)
+        source = timings.timed_iter('decode', capture)
+        resize = timings.timed('resize', self.resize)
+        try:
+            if pipelined:
+                timing = run_pipelined(source, resize, infer, output, queue_size, drop_oldest)
+            else:
+                timing = run_sequential(source, resize, infer, output)
+        except BaseException:
+            # Stop the encoder without letting its own failure replace the error in flight
+            if writer is not None:
+                writer.release(check=False)
+            raise
+        finally:
+            source.close()
+            capture.close()
+        if writer is not None:
+            writer.release()
+        if not frames:
+            raise ValueError(f"Could not read frames from video: {video_path}")
+
+        detections_path = os.path.join(outdir, f"{base}_detections.json")
+        with open(detections_path, 'w') as f:
+            json.dump([{"frame": i, "inferred": ran, "detections": [d.to_dict() for d in dets]}
+                       for i, (dets, ran) in enumerate(zip(frames, inferred))], f)
+
+        return {
+            "media": "video",
+            "input": video_path,
+            "path": out_path,
+            "detections_path": detections_path,
+            "encoder": writer.encoder,
+            "browser_ready": writer.browser_ready,
+            "frames": len(frames),
+            "source_fps": fps,
+            "pipeline_fps": timing["fps"],
+            "timing": timing,
+            "stage_timings": timings.report(),
+            "frames_decoded": len(frames),
+            "frames_inferred": sum(inferred),
+            "gate": gate.report() if gate.active else None,
+            **summarize(frames),
+            **({
+                "unique_counts": tracker.unique_counts(),
+                "tracks": tracker.next_id - 1,
+                "tracker_ms_per_frame": tracker_seconds / len(frames) * 1000.0
+            } if tracker is not None else {})
+        }
+
+    def preview_video(self, video_path: str, outdir: str, frames: int = DEFAULT_PREVIEW_FRAMES,
+                      width: int = DEFAULT_PREVIEW_WIDTH) -> Dict[str, Any]:
+        """Detect on `frames` evenly spaced frames and write them as one contact sheet JPEG (see preview.py).
+
+        Frames are reached by seeking, so the cost does not grow with the
+        length of the video. Without a frame count in the container, one
+        frame a second is taken from the start instead.
+        """
+        import cv2
+
+        start = time.perf_counter()
+        timings = self.timings = StageTimings()
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video: {video_path}")
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+        sampled = []
+        try:
+            if total > 0:
+                for index in preview_indices(total, frames):
+                    with timings.time('decode'):
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+                        ok, frame = cap.read()
+                    if ok and frame is not None:
+                        sampled.append((index, frame))
+            else:
+                step = max(1, round(fps))
+                index = 0
+                while len(sampled) < frames:
+                    with timings.time('decode'):
+                        ok, frame = cap.read()
+                    if not ok or frame is None:
+                        break
+                    if index % step == 0:
+                        sampled.append((index, frame))
+                    index += 1
+        finally:
+            cap.release()
+        if not sampled:
+            raise ValueError(f"Could not read frames from video: {video_path}")
+
+        samples = []
+        drawn = []
+        for index, frame in sampled:
+            frame, detections, _ = self._detect_and_draw(frame)
+            samples.append({"frame": index, "time": index / fps, "detections": [d.to_dict() for d in detections]})
+            drawn.append((frame, detections))
+            timings.frame_done()
+
+        os.makedirs(outdir, exist_ok=True)
+        base = os.path.splitext(os.path.basename(video_path))[0]
+        out_path = os.path.join(outdir, f"{base}_preview.jpg")
+        with timings.time('encode'):
+            sheet = contact_sheet([f for f, _ in drawn], [f"{s['time']:.1f}s" for s in samples], width)
+            cv2.imwrite(out_path, sheet, [cv2.IMWRITE_JPEG_QUALITY, 85])
+
+        return {
+            "media": "video",
+            "preview": True,
+            "input": video_path,
+            "path": out_path,
+            "frames_sampled": len(samples),
+            "source_frames": total or None,
+            "source_fps": fps,
+            "duration": total / fps if total > 0 else None,
+            "samples": samples,
+            "preview_seconds": time.perf_counter() - start,
+            "stage_timings": timings.report(),
+            **summarize([d for _, d in drawn])
+        }
+
+    def run(self, source: str, outdir: str, media: Optional[str] = None, folder_options: Optional[Dict[str, Any]] = None,
+            **video_options) -> Dict[str, Any]:
+        """Dispatch on the source type (or the route's `media` hint).
+
+        folder_options go to process_folder and the remaining keyword arguments to process_video.
+        """
+        kind = source_type(source) if media in (None, 'auto') else media
+        if kind == 'image':
+            return self.process_image(source, outdir)
+        if kind == 'folder':
+            return self.process_folder(source, outdir, **(folder_options or {}))
+        if kind == 'video':
+            return self.process_video(source, outdir, **video_options)
+        raise ValueError(f"Unsupported media type for headless processing: {kind}")
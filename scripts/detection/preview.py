@@ -0,0 +1,42 @@
+"""
+Video previews.
+A preview runs detection on a handful of evenly spaced frames and lays the
+annotated frames out as one contact-sheet JPEG. It costs the same few
+inferences whatever the length of the clip, so the UI can show what the
+detector sees within a second or two and leave the full annotated render
+(DetectionPipeline.process_video) for when it is asked for.
+"""
+
+from typing import Any, List, Optional
+
+DEFAULT_PREVIEW_FRAMES = 8
+DEFAULT_PREVIEW_WIDTH = 320
+DEFAULT_PREVIEW_COLUMNS = 4
+SHEET_BACKGROUND = (32, 32, 32)
+
+
+def preview_indices(total: int, count: int = DEFAULT_PREVIEW_FRAMES) -> List[int]:
+    """`count` frame indices spread evenly over `total` frames, each in the middle of its segment."""
+    count = max(1, min(count, total))
+    return [int((i + 0.5) * total / count) for i in range(count)]
+
+
+def contact_sheet(frames: List[Any], labels: Optional[List[str]] = None, width: int = DEFAULT_PREVIEW_WIDTH,
+                  columns: int = DEFAULT_PREVIEW_COLUMNS):
+    """Downscale `frames` to `width` pixels wide and tile them row by row, each with its label."""
+    import cv2
+    import numpy as np
+
+    height = max(1, round(frames[0].shape[0] * width / frames[0].shape[1]))
+    columns = max(1, min(columns, len(frames)))
+    rows = -(-len(frames) // columns)
+    sheet = np.full((rows * height, columns * width, 3), SHEET_BACKGROUND, dtype=np.uint8)
+    for i, frame in enumerate(frames):
+        # INTER_AREA keeps the thin box outlines visible when shrinking
+        tile = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        if labels:
+            cv2.putText(tile, labels[i], (6, height - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 0), 3)
+            cv2.putText(tile, labels[i], (6, height - 8), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        row, col = divmod(i, columns)
+        sheet[row * height:(row + 1) * height, col * width:(col + 1) * width] = tile
+    return sheet
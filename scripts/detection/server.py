@@ -0,0 +1,265 @@
+"""
+Warm detection service.
+DetectionService loads every detector once, warms it up and runs all
+inference on one worker thread, so a request costs only its own inference:
+there is no Python start-up, no torch import and no weights load. Images
+arrive and leave as bytes. Videos are staged in a temporary file only because
+OpenCV can only open containers by path. Each response reports how long the
+request queued behind others and how long it took to serve. A full video
+holds the inference thread for minutes, so while one is queued or running
+every other request is refused with 503 (the routes then spawn the CLI), as
+is any request beyond `max_pending` queued ones. Outputs left in
+the outdir (videos the caller copied rather than moved, previews, the
+_detections.json files) are deleted once older than `output_ttl`.
+make_server() wraps the service in a stdlib HTTP server for the API routes
+(lib/detection-client.ts).
+"""
+
+import os
+import json
+import time
+import base64
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .backends import DEFAULT_BACKEND
+from .multi import MultiDetector
+from .pipeline import DEFAULT_CONF, DetectionPipeline
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_UPLOAD_MB = 512
+# Callers pick their output up right after the response; older files in the outdir are removed
+DEFAULT_OUTPUT_TTL = 3600.0
+# Requests queued or running on the inference thread before new ones are refused
+DEFAULT_MAX_PENDING = 8
+WARMUP_SIZE = (640, 640)
+VIDEO_SUFFIXES = {'video/webm': '.webm', 'video/x-matroska': '.mkv', 'video/quicktime': '.mov',
+                  'video/x-msvideo': '.avi'}
+
+
+class RequestError(Exception):
+    """A request the service cannot serve; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class DetectionService:
+    """Resident detectors behind a single inference thread."""
+
+    def __init__(self, models: Dict[str, str], conf: float = DEFAULT_CONF, device: Optional[str] = None,
+                 backend: str = DEFAULT_BACKEND, outdir: str = 'temp/detection-server',
+                 output_ttl: float = DEFAULT_OUTPUT_TTL, max_pending: int = DEFAULT_MAX_PENDING):
+        self.models = {name: os.path.abspath(path) for name, path in models.items()}
+        self.conf = conf
+        self.device = device
+        self.backend = backend
+        self.outdir = os.path.abspath(outdir)
+        self.output_ttl = output_ttl
+        self.max_pending = max_pending
+        self.pipelines = {name: DetectionPipeline(path, conf=conf, device=device, backend=backend)
+                          for name, path in self.models.items()}
+        self.combined: Dict[Tuple[str, ...], MultiDetector] = {}
+        # The models are only ever used from this thread
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='inference')
+        self.lock = threading.Lock()
+        self.pending = 0
+        # Full videos queued or running; at most one, and nothing else is admitted meanwhile
+        self.videos = 0
+        self.served = 0
+        self.rejected = 0
+        self.started = time.time()
+        self.warmup: Dict[str, Dict[str, float]] = {
+            name: {"load_seconds": p.load_seconds} for name, p in self.pipelines.items()
+        }
+
+    def warm_up(self, runs: int = 2):
+        """Run each model on a blank frame so the first request does not pay for lazy initialisation."""
+        import numpy as np
+
+        frame = np.zeros((WARMUP_SIZE[1], WARMUP_SIZE[0], 3), dtype=np.uint8)
+        for name, pipeline in self.pipelines.items():
+            times = [self.submit(pipeline.detect, frame)[1]["service_ms"] for _ in range(max(1, runs))]
+            self.warmup[name].update(first_ms=times[0], warm_ms=times[-1])
+
+    def pipeline_for(self, names: List[str], weights: Optional[List[str]] = None) -> DetectionPipeline:
+        """The detector (or merged multi-detector) for `names`; `weights` must match what is loaded."""
+        unknown = [n for n in names if n not in self.pipelines]
+        if unknown or not names:
+            raise RequestError(f"Unknown detector {', '.join(unknown) or '(none)'}; "
+                               f"loaded: {', '.join(self.pipelines)}", 404)
+        if weights:
+            # The caller resolved its own weights; answering with other ones would be wrong, not just slow
+            for name, path in zip(names, weights):
+                if os.path.abspath(path) != self.models[name]:
+                    raise RequestError(f"Server has {self.models[name]} loaded for {name}, not {path}", 409)
+        if len(names) == 1:
+            return self.pipelines[names[0]]
+        key = tuple(names)
+        if key not in self.combined:
+            self.combined[key] = MultiDetector({n: self.models[n] for n in names}, conf=self.conf,
+                                               device=self.device, backend=self.backend,
+                                               loaded={n: self.pipelines[n].model for n in names})
+        return self.combined[key]
+
+    def submit(self, fn: Callable, *args, full_video: bool = False, **kwargs) -> Tuple[Any, Dict[str, float]]:
+        """Run `fn` on the inference thread; returns its result and the queue/service times.
+
+        Raises RequestError (503) instead of queueing behind a full video or past max_pending.
+        """
+        enqueued = time.perf_counter()
+        started = []
+
+        def job():
+            started.append(time.perf_counter())
+            return fn(*args, **kwargs)
+
+        with self.lock:
+            if self.videos or self.pending >= self.max_pending:
+                self.rejected += 1
+                raise RequestError("Busy with a full video" if self.videos else
+                                   f"Busy: {self.pending} requests pending", 503)
+            self.pending += 1
+            self.videos += full_video
+        try:
+            result = self.executor.submit(job).result()
+        finally:
+            with self.lock:
+                self.pending -= 1
+                self.videos -= full_video
+                self.served += 1
+        done = time.perf_counter()
+        return result, {"queue_ms": (started[0] - enqueued) * 1000.0, "service_ms": (done - started[0]) * 1000.0}
+
+    def detect_image(self, names: List[str], data: bytes, weights: Optional[List[str]] = None,
+                     ext: str = '.jpg') -> Tuple[Dict[str, Any], bytes]:
+        pipeline = self.pipeline_for(names, weights)
+        (result, encoded), times = self.submit(pipeline.process_image_bytes, data, ext)
+        result["server"] = times
+        return result, encoded
+
+    def detect_video(self, names: List[str], data: bytes, weights: Optional[List[str]] = None,
+                     suffix: str = '.mp4', preview: bool = False, **video_options) -> Dict[str, Any]:
+        """process_video (or preview_video) on the upload; the output is written to the service's outdir."""
+        pipeline = self.pipeline_for(names, weights)
+        os.makedirs(self.outdir, exist_ok=True)
+        self.sweep_outputs()
+        # OpenCV opens containers by path, so the upload is staged next to the output
+        fd, staged = tempfile.mkstemp(prefix='upload_', suffix=suffix, dir=self.outdir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            run = pipeline.preview_video if preview else pipeline.process_video
+            result, times = self.submit(run, staged, self.outdir, full_video=not preview, **video_options)
+        finally:
+            os.remove(staged)
+        result.pop("input", None)
+        result["server"] = times
+        return result
+
+    def sweep_outputs(self) -> int:
+        """Delete files in the outdir older than output_ttl seconds (0 keeps everything); returns how many."""
+        if self.output_ttl <= 0:
+            return 0
+        cutoff = time.time() - self.output_ttl
+        removed = 0
+        for entry in os.scandir(self.outdir):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                # Removed by someone else, or still open on Windows: the next sweep retries
+                continue
+        return removed
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "detectors": self.models,
+            "backend": self.backend,
+            "warmup": self.warmup,
+            "pending": self.pending,
+            "videos": self.videos,
+            "served": self.served,
+            "rejected": self.rejected,
+            "uptime_seconds": time.time() - self.started
+        }
+
+
+def make_server(service: DetectionService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                max_upload_mb: float = DEFAULT_MAX_UPLOAD_MB) -> ThreadingHTTPServer:
+    """GET /health; POST /detect?detectors=a,b&media=image|video[&track=1][&preview=1][&weights=..], media as the body.
+
+    Images are answered with the CLI's result JSON plus the annotated JPEG as
+    image_base64; videos with the CLI's result JSON, whose path is the
+    annotated video (or, with preview, the contact sheet) in the service's outdir.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Dict[str, Any]):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if urlparse(self.path).path == '/health':
+                self._send(200, service.health())
+            else:
+                self._send(404, {"success": False, "error": "Not found"})
+
+        def do_POST(self):
+            received = time.perf_counter()
+            url = urlparse(self.path)
+            if url.path != '/detect':
+                self._send(404, {"success": False, "error": "Not found"})
+                return
+            query = parse_qs(url.query)
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                if length <= 0:
+                    raise RequestError("Empty upload")
+                if length > max_upload_mb * 2 ** 20:
+                    raise RequestError(f"Upload larger than {max_upload_mb} MB", 413)
+                data = self.rfile.read(length)
+                names = [n for value in query.get('detectors', []) for n in value.split(',') if n]
+                weights = query.get('weights') or None
+                content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+                media = (query.get('media') or ['video' if content_type.startswith('video/') else 'image'])[0]
+                if media == 'image':
+                    result, encoded = service.detect_image(names, data, weights)
+                    result["image_base64"] = base64.b64encode(encoded).decode('ascii')
+                elif media == 'video':
+                    suffix = VIDEO_SUFFIXES.get(content_type, '.mp4')
+                    if query.get('preview', ['0'])[0] == '1':
+                        result = service.detect_video(names, data, weights, suffix, preview=True)
+                    else:
+                        result = service.detect_video(names, data, weights, suffix,
+                                                      track=query.get('track', ['0'])[0] == '1')
+                else:
+                    raise RequestError(f"Unsupported media type {media}")
+            except RequestError as e:
+                self._send(e.status, {"success": False, "error": str(e)})
+                return
+            except Exception as e:
+                self._send(500, {"success": False, "error": str(e)})
+                return
+            result["success"] = True
+            result["server"]["total_ms"] = (time.perf_counter() - received) * 1000.0
+            self._send(200, result)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
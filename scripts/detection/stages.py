@@ -0,0 +1,202 @@
+"""
+Decode -> inference -> output stages for video detection.
+run_pipelined overlaps the three stages with a decode thread and an output
+thread connected by bounded queues; inference stays on the calling thread so
+the model is only ever used from one thread. run_sequential does the same work
+in one loop and reports the same numbers, for comparison.
+"""
+
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+DEFAULT_QUEUE_SIZE = 8
+
+_END = object()
+
+
+class StageStats:
+    """Busy and blocked time for one stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def to_dict(self, wall_seconds: float) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "busy_seconds": self.busy_seconds,
+            "wait_seconds": self.wait_seconds,
+            "utilization": self.busy_seconds / wall_seconds if wall_seconds > 0 else None,
+            "ms_per_item": self.busy_seconds / self.items * 1000.0 if self.items else None
+        }
+
+
+class FrameQueue:
+    """Bounded queue; with drop_oldest a full queue discards its oldest item instead of blocking."""
+
+    def __init__(self, maxsize: int, drop_oldest: bool = False):
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max(1, maxsize))
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+
+    def put(self, item, stop: threading.Event):
+        if self.drop_oldest and item is not _END:
+            while True:
+                try:
+                    self.queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self.queue.get_nowait()
+                        self.dropped += 1
+                    except queue.Empty:
+                        pass
+        while not stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                return self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+
+def _report(mode: str, wall: float, stages, frames: int, dropped: int = 0,
+            queue_size: Optional[int] = None) -> Dict[str, Any]:
+    report = {
+        "mode": mode,
+        "frames": frames,
+        "wall_seconds": wall,
+        "fps": frames / wall if wall > 0 else None,
+        "dropped_frames": dropped,
+        "stages": {s.name: s.to_dict(wall) for s in stages}
+    }
+    if queue_size is not None:
+        report["queue_size"] = queue_size
+    return report
+
+
+def run_sequential(frames: Iterator[Any], decode: Callable[[Any], Any], infer: Callable[[Any], Any],
+                   output: Callable[[int, Any, Any], None]) -> Dict[str, Any]:
+    """Decode, infer and output each frame in turn (the original loop)."""
+    stages = [StageStats('decode'), StageStats('inference'), StageStats('output')]
+    decode_stats, infer_stats, output_stats = stages
+    start = time.perf_counter()
+    index = 0
+    while True:
+        t0 = time.perf_counter()
+        raw = next(frames, _END)
+        if raw is _END:
+            break
+        frame = decode(raw)
+        t1 = time.perf_counter()
+        result = infer(frame)
+        t2 = time.perf_counter()
+        output(index, frame, result)
+        t3 = time.perf_counter()
+        decode_stats.busy_seconds += t1 - t0
+        infer_stats.busy_seconds += t2 - t1
+        output_stats.busy_seconds += t3 - t2
+        for s in stages:
+            s.items += 1
+        index += 1
+    return _report('sequential', time.perf_counter() - start, stages, index)
+
+
+def run_pipelined(frames: Iterator[Any], decode: Callable[[Any], Any], infer: Callable[[Any], Any],
+                  output: Callable[[int, Any, Any], None], queue_size: int = DEFAULT_QUEUE_SIZE,
+                  drop_oldest: bool = False) -> Dict[str, Any]:
+    """Overlap decoding, inference and output.
+
+    `frames` is consumed on a decode thread and `output` runs on an output
+    thread; `infer` runs on the calling thread. With drop_oldest (for live
+    sources) the decode stage never waits: when inference falls behind, the
+    oldest queued frame is discarded.
+    """
+    stages = [StageStats('decode'), StageStats('inference'), StageStats('output')]
+    decode_stats, infer_stats, output_stats = stages
+    decoded = FrameQueue(queue_size, drop_oldest)
+    inferred = FrameQueue(queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def decode_loop():
+        try:
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                raw = next(frames, _END)
+                if raw is _END:
+                    break
+                frame = decode(raw)
+                t1 = time.perf_counter()
+                decode_stats.busy_seconds += t1 - t0
+                decode_stats.items += 1
+                decoded.put(frame, stop)
+                decode_stats.wait_seconds += time.perf_counter() - t1
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            decoded.put(_END, stop)
+
+    def output_loop():
+        index = 0
+        try:
+            while True:
+                t0 = time.perf_counter()
+                item = inferred.get(stop)
+                t1 = time.perf_counter()
+                output_stats.wait_seconds += t1 - t0
+                if item is _END:
+                    break
+                frame, result = item
+                output(index, frame, result)
+                output_stats.busy_seconds += time.perf_counter() - t1
+                output_stats.items += 1
+                index += 1
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=decode_loop, name='decode', daemon=True),
+               threading.Thread(target=output_loop, name='output', daemon=True)]
+    for t in threads:
+        t.start()
+
+    try:
+        while True:
+            t0 = time.perf_counter()
+            frame = decoded.get(stop)
+            t1 = time.perf_counter()
+            infer_stats.wait_seconds += t1 - t0
+            if frame is _END:
+                break
+            result = infer(frame)
+            t2 = time.perf_counter()
+            infer_stats.busy_seconds += t2 - t1
+            infer_stats.items += 1
+            inferred.put((frame, result), stop)
+            infer_stats.wait_seconds += time.perf_counter() - t2
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        inferred.put(_END, stop)
+        for t in threads:
+            t.join()
+
+    if errors:
+        raise errors[0]
+    return _report('pipelined', time.perf_counter() - start, stages, output_stats.items,
+                   decoded.dropped, queue_size)
@@ -0,0 +1,57 @@
+"""
+Sliced (SAHI-style) inference helpers for small objects in large frames.
+A frame is cut into overlapping tiles that the model sees at full resolution;
+tile boxes are shifted back to frame coordinates and merged, together with an
+optional whole-frame pass for large objects, by a class-aware NMS.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+DEFAULT_TILE_OVERLAP = 0.2
+DEFAULT_MERGE_THRESHOLD = 0.5
+
+
+def tile_grid(width: int, height: int, tile: int, overlap: float = DEFAULT_TILE_OVERLAP) -> List[Tuple[int, int, int, int]]:
+    """(x0, y0, x1, y1) tiles covering the frame, spread evenly with at least `overlap` between neighbours."""
+    def starts(length: int) -> List[int]:
+        if length <= tile:
+            return [0]
+        step = max(1, int(tile * (1.0 - overlap)))
+        count = -(-(length - tile) // step) + 1
+        return [int(round(i * (length - tile) / (count - 1))) for i in range(count)]
+
+    tile_w, tile_h = min(tile, width), min(tile, height)
+    return [(x, y, x + tile_w, y + tile_h) for y in starts(height) for x in starts(width)]
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, threshold: float = DEFAULT_MERGE_THRESHOLD,
+        metric: str = 'ios') -> np.ndarray:
+    """Indices kept by class-aware greedy NMS, highest score first.
+
+    metric 'iou' is standard NMS; 'ios' (intersection over the smaller box)
+    also removes the partial boxes an object leaves in a neighbouring tile.
+    Each step compares the kept box against all remaining boxes at once.
+    """
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # Shift each class to its own region so boxes of different classes never overlap
+    offset = classes.astype(np.float64)[:, None] * (boxes.max() + 1.0)
+    shifted = boxes + offset
+    areas = (shifted[:, 2] - shifted[:, 0]) * (shifted[:, 3] - shifted[:, 1])
+    order = np.argsort(-scores)
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        tl = np.maximum(shifted[i, :2], shifted[rest, :2])
+        br = np.minimum(shifted[i, 2:], shifted[rest, 2:])
+        inter = np.prod(np.clip(br - tl, 0, None), axis=1)
+        if metric == 'ios':
+            overlap = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-9)
+        else:
+            overlap = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[overlap < threshold]
+    return np.array(keep, dtype=np.int64)
@@ -0,0 +1,176 @@
+"""
+Per-stage timing for the detection loop.
+Every stage (decode, resize, letterbox, model preprocess, inference,
+postprocess, draw, encode, ...) keeps running statistics in constant memory:
+count, mean, min, max and a fixed log-spaced histogram that p50/p95/p99 are
+read from, so a sample costs the same on the millionth frame as on the first.
+Reports are plain dicts for the CLI JSON; live sources can also emit one
+every few seconds covering just that interval.
+"""
+
+import math
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Report order; stages not listed here follow in the order first seen
+STAGES = ['decode', 'resize', 'letterbox', 'gate', 'preprocess', 'inference', 'postprocess', 'track', 'draw',
+          'encode', 'display']
+
+# Histogram: 20 bins per decade from 1 us to 100 s, so a percentile is within ~6% of the exact value
+MIN_MS = 1e-3
+DECADES = 8
+BINS_PER_DECADE = 20
+
+
+class RollingStat:
+    """Count, mean, min, max and histogram percentiles of durations in milliseconds."""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'bins')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self.bins = [0] * (DECADES * BINS_PER_DECADE + 1)
+
+    def add(self, ms: float):
+        self.count += 1
+        self.total += ms
+        if ms < self.min:
+            self.min = ms
+        if ms > self.max:
+            self.max = ms
+        index = 0 if ms <= MIN_MS else min(len(self.bins) - 1, int(math.log10(ms / MIN_MS) * BINS_PER_DECADE) + 1)
+        self.bins[index] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q-th percentile: the geometric middle of the bin it falls in, clamped to [min, max]."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q / 100.0 * self.count))
+        seen = 0
+        for index, n in enumerate(self.bins):
+            seen += n
+            if seen >= rank:
+                value = MIN_MS * 10 ** ((index - 0.5) / BINS_PER_DECADE) if index else MIN_MS
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "total_ms": self.total,
+            "mean_ms": self.total / self.count,
+            "min_ms": self.min,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max
+        }
+
+
+class StageTimings:
+    """Per-stage RollingStats for one run, safe to record from the decode, inference and output threads.
+
+    With `interval` (seconds), frame_done() calls `emit` with a report of just
+    the frames since the previous one, for sources that never end.
+    """
+
+    def __init__(self, interval: Optional[float] = None, emit: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.interval = interval if interval and emit else None
+        self.emit = emit
+        self.lock = threading.Lock()
+        self.stats: Dict[str, RollingStat] = {}
+        self.window: Dict[str, RollingStat] = {}
+        self.started = self.window_started = time.perf_counter()
+        self.frames = self.window_frames = 0
+
+    def add(self, stage: str, seconds: float):
+        ms = seconds * 1000.0
+        with self.lock:
+            stat = self.stats.get(stage)
+            if stat is None:
+                stat = self.stats[stage] = RollingStat()
+            stat.add(ms)
+            if self.interval:
+                stat = self.window.get(stage)
+                if stat is None:
+                    stat = self.window[stage] = RollingStat()
+                stat.add(ms)
+
+    def add_model_speed(self, speed: Dict[str, float], extra_postprocess: float = 0.0):
+        """Record an ultralytics Results.speed dict (ms per image) plus our own postprocessing seconds."""
+        self.add('preprocess', speed.get('preprocess', 0.0) / 1000.0)
+        self.add('inference', speed.get('inference', 0.0) / 1000.0)
+        self.add('postprocess', speed.get('postprocess', 0.0) / 1000.0 + extra_postprocess)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def timed(self, stage: str, fn: Callable) -> Callable:
+        """`fn` wrapped so each call is recorded under `stage`."""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return wrapper
+
+    def timed_iter(self, stage: str, items: Iterator[Any]) -> Iterator[Any]:
+        """`items` with the time spent producing each one recorded under `stage` (e.g. frame decode)."""
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            self.add(stage, time.perf_counter() - start)
+            yield item
+
+    def frame_done(self):
+        """Count one finished frame and emit the interval report when it is due."""
+        report = None
+        with self.lock:
+            self.frames += 1
+            self.window_frames += 1
+            if self.interval and time.perf_counter() - self.window_started >= self.interval:
+                report = self._report(self.window, self.window_frames, self.window_started)
+                report["interval"] = True
+                self.window = {}
+                self.window_frames = 0
+                self.window_started = time.perf_counter()
+        if report is not None:
+            self.emit(report)
+
+    def report(self) -> Dict[str, Any]:
+        """The whole run so far."""
+        with self.lock:
+            return self._report(self.stats, self.frames, self.started)
+
+    @staticmethod
+    def _report(stats: Dict[str, RollingStat], frames: int, started: float) -> Dict[str, Any]:
+        seconds = time.perf_counter() - started
+        order = [s for s in STAGES if s in stats] + [s for s in stats if s not in STAGES]
+        # Mean per frame, so stages recorded per image or per tile compare fairly
+        per_frame = {s: stats[s].total / frames for s in order} if frames else {}
+        return {
+            "node": socket.gethostname(),
+            "frames": frames,
+            "seconds": seconds,
+            "fps": frames / seconds if seconds > 0 else None,
+            "bottleneck": max(per_frame, key=per_frame.get) if per_frame else None,
+            "ms_per_frame": per_frame,
+            "stages": {s: stats[s].to_dict() for s in order}
+        }
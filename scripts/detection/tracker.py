@@ -0,0 +1,185 @@
+"""
+SORT-style multi-object tracker in NumPy.
+Each track is a constant-velocity Kalman filter over (cx, cy, area, aspect);
+detections are matched to predicted tracks greedily by IoU (same class only).
+All tracks are predicted and updated as stacked arrays, so the cost per frame
+stays flat as the number of objects grows.
+
+Between detection passes (see gating.py) predict() moves the tracks seen on
+the last pass along their estimated velocity, so skipped frames still get boxes.
+"""
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .pipeline import Detection
+
+DEFAULT_IOU = 0.3
+DEFAULT_MAX_MISSES = 5
+DEFAULT_MIN_HITS = 2
+
+# Constant-velocity model over [cx, cy, s, r, vcx, vcy, vs]
+_F = np.eye(7)
+_F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+_H = np.eye(4, 7)
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 10000.0, 10000.0, 10000.0])
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU between every box in a (N, 4) and b (M, 4), as xyxy."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    tl = np.maximum(a[:, None, :2], b[None, :, :2])
+    br = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(br - tl, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def greedy_match(iou: np.ndarray, threshold: float) -> List[Tuple[int, int]]:
+    """(row, col) pairs by descending IoU, each row and column used once."""
+    if iou.size == 0:
+        return []
+    rows, cols = np.unravel_index(np.argsort(-iou, axis=None), iou.shape)
+    used_rows, used_cols = set(), set()
+    pairs = []
+    for r, c in zip(rows.tolist(), cols.tolist()):
+        if iou[r, c] < threshold:
+            break
+        if r in used_rows or c in used_cols:
+            continue
+        used_rows.add(r)
+        used_cols.add(c)
+        pairs.append((r, c))
+    return pairs
+
+
+def _to_z(boxes: np.ndarray) -> np.ndarray:
+    w = boxes[:, 2] - boxes[:, 0]
+    h = boxes[:, 3] - boxes[:, 1]
+    return np.stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w * h, w / np.maximum(h, 1e-9)], axis=1)
+
+
+def _to_xyxy(x: np.ndarray) -> np.ndarray:
+    w = np.sqrt(np.clip(x[:, 2] * x[:, 3], 0, None))
+    h = x[:, 2] / np.maximum(w, 1e-9)
+    return np.stack([x[:, 0] - w / 2, x[:, 1] - h / 2, x[:, 0] + w / 2, x[:, 1] + h / 2], axis=1)
+
+
+class Tracker:
+    """Assigns persistent ids to detections across frames.
+
+    iou: minimum IoU between a predicted track and a detection to match.
+    max_misses: detection passes a track may go unmatched before it is dropped.
+    min_hits: matches before a track counts as a unique object.
+    """
+
+    def __init__(self, iou: float = DEFAULT_IOU, max_misses: int = DEFAULT_MAX_MISSES,
+                 min_hits: int = DEFAULT_MIN_HITS):
+        self.iou = iou
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.x = np.zeros((0, 7))
+        self.p = np.zeros((0, 7, 7))
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.class_ids = np.zeros(0, dtype=np.int64)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.misses = np.zeros(0, dtype=np.int64)
+        self.confidence = np.zeros(0)
+        self.class_names: Dict[int, str] = {}
+        self.next_id = 1
+        self.counted: Dict[int, str] = {}
+
+    def _advance(self):
+        """Move every track one frame along its velocity."""
+        if len(self.x) == 0:
+            return
+        # Keep the predicted area positive
+        self.x[self.x[:, 2] + self.x[:, 6] <= 0, 6] = 0.0
+        self.x = self.x @ _F.T
+        self.p = _F @ self.p @ _F.T + _Q
+
+    def _visible(self) -> List[Detection]:
+        # Tracks matched (or started) on the latest detection pass
+        show = self.misses == 0
+        boxes = _to_xyxy(self.x[show]).round().astype(np.int64).tolist()
+        detections = []
+        for box, class_id, conf, track_id in zip(boxes, self.class_ids[show].tolist(),
+                                                 self.confidence[show].tolist(), self.ids[show].tolist()):
+            detections.append(Detection(class_id, self.class_names[class_id], conf, tuple(box), track_id))
+        return detections
+
+    def predict(self) -> List[Detection]:
+        """Tracked boxes for a frame with no detection pass."""
+        self._advance()
+        return self._visible()
+
+    def update(self, detections: List[Detection]) -> List[Detection]:
+        """Match a detection pass to the tracks; returns its detections with track ids."""
+        self._advance()
+        boxes = np.array([d.box for d in detections], dtype=np.float64).reshape(-1, 4)
+        det_classes = np.array([d.class_id for d in detections], dtype=np.int64)
+        for d in detections:
+            self.class_names[d.class_id] = d.class_name
+
+        iou = iou_matrix(_to_xyxy(self.x), boxes)
+        # Never match across classes
+        iou[self.class_ids[:, None] != det_classes[None, :]] = 0.0
+        pairs = greedy_match(iou, self.iou)
+
+        matched = np.zeros(len(self.x), dtype=bool)
+        track_ids = np.zeros(len(detections), dtype=np.int64)
+        if pairs:
+            t_idx = np.array([p[0] for p in pairs])
+            d_idx = np.array([p[1] for p in pairs])
+            z = _to_z(boxes[d_idx])
+            x, p = self.x[t_idx], self.p[t_idx]
+            s = _H @ p @ _H.T + _R
+            k = p @ _H.T @ np.linalg.inv(s)
+            self.x[t_idx] = x + np.einsum('nij,nj->ni', k, z - x @ _H.T)
+            self.p[t_idx] = (np.eye(7) - k @ _H) @ p
+            self.hits[t_idx] += 1
+            self.misses[t_idx] = 0
+            self.confidence[t_idx] = np.array([detections[i].confidence for i in d_idx.tolist()])
+            matched[t_idx] = True
+            track_ids[d_idx] = self.ids[t_idx]
+        self.misses[~matched] += 1
+
+        is_new = np.ones(len(detections), dtype=bool)
+        is_new[[p[1] for p in pairs]] = False
+        new = np.flatnonzero(is_new)
+        if len(new):
+            z = _to_z(boxes[new])
+            x = np.zeros((len(new), 7))
+            x[:, :4] = z
+            self.x = np.concatenate([self.x, x])
+            self.p = np.concatenate([self.p, np.repeat(_P0[None], len(new), axis=0)])
+            track_ids[new] = np.arange(self.next_id, self.next_id + len(new))
+            self.ids = np.concatenate([self.ids, track_ids[new]])
+            self.next_id += len(new)
+            self.class_ids = np.concatenate([self.class_ids, det_classes[new]])
+            self.hits = np.concatenate([self.hits, np.ones(len(new), dtype=np.int64)])
+            self.misses = np.concatenate([self.misses, np.zeros(len(new), dtype=np.int64)])
+            self.confidence = np.concatenate([self.confidence, [detections[i].confidence for i in new.tolist()]])
+
+        keep = self.misses <= self.max_misses
+        if not keep.all():
+            for name in ('x', 'p', 'ids', 'class_ids', 'hits', 'misses', 'confidence'):
+                setattr(self, name, getattr(self, name)[keep])
+
+        confirmed = self.hits >= self.min_hits
+        for track_id, class_id in zip(self.ids[confirmed].tolist(), self.class_ids[confirmed].tolist()):
+            self.counted.setdefault(track_id, self.class_names[class_id])
+        return [Detection(d.class_id, d.class_name, d.confidence, d.box, int(track_id))
+                for d, track_id in zip(detections, track_ids.tolist())]
+
+    def unique_counts(self) -> Dict[str, int]:
+        """Distinct confirmed objects seen so far, per class."""
+        counts: Dict[str, int] = {}
+        for name in self.counted.values():
+            counts[name] = counts.get(name, 0) + 1
+        return counts
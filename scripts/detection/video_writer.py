@@ -0,0 +1,119 @@
+"""
+Annotated video output.
+FfmpegWriter pipes raw BGR frames into an ffmpeg process that encodes a
+faststart H.264 MP4 at the source frame rate, which browsers play directly,
+so the routes no longer transcode the result. Without an ffmpeg that has
+libx264 the OpenCV mp4v writer is used, as before.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+from functools import lru_cache
+from typing import Optional, Tuple
+
+ENCODERS = ('auto', 'ffmpeg', 'opencv')
+
+# Same locations lib/video-transcode.ts looks in
+WINDOWS_FFMPEG = ['C:/Program Files/FFmpeg/bin/ffmpeg.exe', 'C:/Program Files (x86)/FFmpeg/bin/ffmpeg.exe']
+
+
+@lru_cache(maxsize=1)
+def find_ffmpeg() -> Optional[str]:
+    """FFMPEG_PATH, a standard Windows install or ffmpeg on PATH, if it can encode H.264."""
+    candidates = [os.environ.get('FFMPEG_PATH', '').strip()]
+    if os.name == 'nt':
+        candidates += WINDOWS_FFMPEG
+    candidates.append(shutil.which('ffmpeg') or '')
+    for exe in candidates:
+        if not exe or not os.path.isfile(exe):
+            continue
+        try:
+            encoders = subprocess.run([exe, '-hide_banner', '-encoders'], capture_output=True, text=True,
+                                      timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        if 'libx264' in encoders:
+            return exe
+    return None
+
+
+class FfmpegWriter:
+    """Streams frames to ffmpeg's stdin; the MP4 is complete once release() returns."""
+
+    encoder = 'ffmpeg-h264'
+    browser_ready = True
+
+    def __init__(self, path: str, fps: float, size: Tuple[int, int], ffmpeg: str, crf: int = 23,
+                 preset: str = 'veryfast'):
+        width, height = size
+        self.path = path
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen([
+            ffmpeg, '-y', '-hide_banner', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-r', f'{fps:.6g}', '-i', '-',
+            # yuv420p needs even sides
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            '-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-pix_fmt', 'yuv420p',
+            '-movflags', '+faststart', path
+        ], stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self.log)
+
+    def write(self, frame):
+        try:
+            self.process.stdin.write(memoryview(frame).cast('B') if frame.flags.c_contiguous else frame.tobytes())
+        except (BrokenPipeError, OSError):
+            self.release(check=False)
+            raise RuntimeError(f"ffmpeg stopped while writing {self.path}: {self._errors()}")
+
+    def release(self, check: bool = True):
+        """Finish the MP4; raises RuntimeError if ffmpeg failed, unless `check` is False (error paths)."""
+        if self.process.stdin and not self.process.stdin.closed:
+            try:
+                self.process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+        code = self.process.wait()
+        if check and code != 0 and not self.log.closed:
+            message = self._errors()
+            self.log.close()
+            raise RuntimeError(f"ffmpeg failed on {self.path}: {message}")
+        self.log.close()
+
+    def _errors(self) -> str:
+        if self.log.closed:
+            return ''
+        self.log.seek(0)
+        return self.log.read().decode(errors='replace').strip()[-2000:]
+
+
+class OpenCvWriter:
+    """cv2.VideoWriter (mp4v); the routes transcode its output for the browser."""
+
+    encoder = 'opencv-mp4v'
+    browser_ready = False
+
+    def __init__(self, path: str, fps: float, size: Tuple[int, int]):
+        import cv2
+
+        self.path = path
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def release(self, check: bool = True):
+        self.writer.release()
+
+
+def open_writer(path: str, fps: float, size: Tuple[int, int], encoder: str = 'auto'):
+    """A writer for `path`: ffmpeg H.264 when available ('auto') or required ('ffmpeg'), else OpenCV."""
+    if encoder not in ENCODERS:
+        raise ValueError(f"Unknown video encoder {encoder}; use {', '.join(ENCODERS)}")
+    if encoder != 'opencv':
+        ffmpeg = find_ffmpeg()
+        if ffmpeg:
+            return FfmpegWriter(path, fps, size, ffmpeg)
+        if encoder == 'ffmpeg':
+            raise ValueError("No ffmpeg with libx264 found (install it or set FFMPEG_PATH)")
+    return OpenCvWriter(path, fps, size)
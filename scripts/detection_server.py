@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Warm detection server for the /api/detection/* routes.
+Loads the divers, mines and submarine detectors once and serves detection
+over local HTTP (see detection/server.py), so each request is only the
+inference: no Python start-up, no model load and no temp files for images.
+The routes use it when it is running (lib/detection-client.ts) and spawn
+yolo_detect.py otherwise.
+
+    python scripts/detection_server.py
+    python scripts/detection_server.py --weights divers="Detection model/divers/best.pt" --port 8765
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from detection.multi import find_weights, parse_weights
+from detection.server import (DEFAULT_HOST, DEFAULT_MAX_PENDING, DEFAULT_MAX_UPLOAD_MB, DEFAULT_OUTPUT_TTL,
+                              DEFAULT_PORT, DetectionService, make_server)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Detector names as the routes send them, and their folders under "Detection model"
+DETECTORS = {'divers': 'divers', 'mines': 'mines', 'submarines': 'sub'}
+
+
+def default_models():
+    models = {}
+    for name, folder in DETECTORS.items():
+        weights = find_weights(os.path.join(ROOT, 'Detection model', folder))
+        if weights:
+            models[name] = weights
+    return models
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Warm YOLO detection server")
+    parser.add_argument("--weights", nargs="+",
+                        help="name=path weights to serve (default: divers, mines and submarines from 'Detection model')")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--conf", type=float, default=0.5, help="Minimum confidence to keep a detection")
+    parser.add_argument("--device", help="Torch device (e.g. cpu, 0)")
+    parser.add_argument("--backend", default="torch", help="torch, onnx, onnx-int8, openvino or openvino-int8")
+    parser.add_argument("--outdir", default=os.path.join(ROOT, 'temp', 'detection-server'),
+                        help="Where annotated videos are written")
+    parser.add_argument("--output-ttl-minutes", type=float, default=DEFAULT_OUTPUT_TTL / 60,
+                        help="Delete outputs in --outdir older than this (0 keeps them)")
+    parser.add_argument("--max-upload-mb", type=float, default=DEFAULT_MAX_UPLOAD_MB)
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING,
+                        help="Queued requests before new ones get 503 and the routes fall back to the CLI")
+    parser.add_argument("--no-warmup", action="store_true", help="Skip the warm-up passes at start-up")
+    args = parser.parse_args(argv)
+
+    try:
+        models = parse_weights(args.weights) if args.weights else default_models()
+        if not models:
+            raise ValueError("No .pt weights found in 'Detection model'; pass --weights name=path")
+        service = DetectionService(models, conf=args.conf, device=args.device, backend=args.backend,
+                                   outdir=args.outdir, output_ttl=args.output_ttl_minutes * 60,
+                                   max_pending=args.max_pending)
+        if not args.no_warmup:
+            service.warm_up()
+        server = make_server(service, args.host, args.port, args.max_upload_mb)
+    except Exception as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        return 1
+
+    print(json.dumps({**service.health(), "url": f"http://{args.host}:{args.port}"}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Live detection server for USB cameras, RTSP/HTTP streams and looped video files.
+Always detects on the newest frame (stale frames are dropped, see
+detection/live.py) and serves the annotated stream to any number of viewers
+with inference run once: open http://127.0.0.1:8766/ in a browser, or use
+/stream.mjpg (MJPEG), /events (JSON per frame) and /stats (frame counts and
+capture-to-viewer latency). Prints the final stats as JSON on the last stdout
+line when the source ends or on Ctrl+C.
+
+    python scripts/live_detect.py --weights "Detection model/divers/best.pt" --source usb0
+    python scripts/live_detect.py --weights "Detection model/sub/best.pt" --source rtsp://camera/stream
+    python scripts/live_detect.py --weights "Detection model/sub/best.pt" --source clip.mp4 --loop
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from detection import DetectionPipeline
+from detection.live import (DEFAULT_JPEG_QUALITY, DEFAULT_LIVE_HOST, DEFAULT_LIVE_PORT, LatestFrameGrabber,
+                            LiveDetector, make_live_server)
+from detection.multi import MultiDetector, parse_weights
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Live YOLO detection stream")
+    parser.add_argument("--weights", required=True, nargs="+",
+                        help="Path to .pt weights, or several name=path weights to run together")
+    parser.add_argument("--source", required=True,
+                        help="USB camera (usb0), Picamera (picamera0), stream URL (rtsp://...) or video file")
+    parser.add_argument("--loop", action="store_true", help="Video file: play it forever, like a camera")
+    parser.add_argument("--host", default=DEFAULT_LIVE_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_LIVE_PORT)
+    parser.add_argument("--conf", type=float, default=0.5, help="Minimum confidence to keep a detection")
+    parser.add_argument("--resolution", help="Resize frames to WxH before inference (e.g. 640x480)")
+    parser.add_argument("--device", help="Torch device (e.g. cpu, 0)")
+    parser.add_argument("--backend", default="torch", help="torch, onnx, onnx-int8, openvino or openvino-int8")
+    parser.add_argument("--classes", nargs="+", help="Only keep these classes (names or ids)")
+    parser.add_argument("--track", action="store_true", help="Track objects across frames")
+    parser.add_argument("--jpeg-quality", type=int, default=DEFAULT_JPEG_QUALITY)
+    parser.add_argument("--stats-interval", type=float,
+                        help="Print the stats as a JSON line on stderr every N seconds")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        if len(args.weights) > 1 or ('=' in args.weights[0] and not os.path.exists(args.weights[0])):
+            pipeline = MultiDetector(parse_weights(args.weights), conf=args.conf, resolution=args.resolution,
+                                     device=args.device, classes=args.classes, backend=args.backend)
+        else:
+            pipeline = DetectionPipeline(args.weights[0], conf=args.conf, resolution=args.resolution,
+                                         device=args.device, classes=args.classes, backend=args.backend)
+        live = LiveDetector(pipeline, LatestFrameGrabber(pipeline, args.source, args.loop), track=args.track,
+                            jpeg_quality=args.jpeg_quality)
+        server = make_live_server(live, args.host, args.port)
+    except Exception as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        return 1
+
+    live.start()
+    # A service manager stopping the server gets the final stats too
+    signal.signal(signal.SIGTERM, lambda *_: live.stop())
+    threading.Thread(target=server.serve_forever, name='http', daemon=True).start()
+    print(json.dumps({"success": True, "url": f"http://{args.host}:{args.port}/", "source": args.source,
+                      "model_load_seconds": pipeline.load_seconds}), flush=True)
+    last_stats = time.perf_counter()
+    try:
+        while not live.ended:
+            live.thread.join(0.5)
+            if args.stats_interval and time.perf_counter() - last_stats >= args.stats_interval:
+                last_stats = time.perf_counter()
+                # stderr, so the last stdout line stays the final result
+                print(json.dumps(live.stats()), file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        live.stop()
+        live.thread.join(5)
+        server.shutdown()
+        server.server_close()
+    stats = live.stats()
+    print(json.dumps(stats))
+    return 0 if stats["success"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Headless YOLO detection CLI used by the /api/detection/* routes.
+Runs the model on an image, image folder or video, writes the annotated output
+to --outdir and prints the result as JSON on the last stdout line
+({"success": true, "path": <annotated output>, "detections": ...}).
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from detection import DetectionPipeline, source_type
+from detection.multi import MultiDetector, parse_weights
+from detection.batch import DEFAULT_BATCH_SIZE, DEFAULT_IMGSZ, DEFAULT_LOADERS
+from detection.preview import DEFAULT_PREVIEW_FRAMES
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Headless YOLO detection")
+    parser.add_argument("--weights", required=True, nargs="+",
+                        help="Path to the YOLO weights (.pt); give several (optionally name=path) to run them "
+                             "all on one decode with merged, detector-prefixed classes")
+    parser.add_argument("--input", required=True, help="Image, image folder or video file")
+    parser.add_argument("--outdir", required=True, help="Directory for the annotated output")
+    parser.add_argument("--media", default="auto", choices=["auto", "image", "video", "folder"],
+                        help="Input type (default: from the path)")
+    parser.add_argument("--conf", type=float, default=0.5, help="Minimum confidence to keep a detection")
+    parser.add_argument("--resolution", help="Resize frames to WxH before inference (e.g. 640x480)")
+    parser.add_argument("--device", help="Torch device (e.g. cpu, 0)")
+    parser.add_argument("--backend", default="torch",
+                        help="torch, onnx, onnx-int8, openvino or openvino-int8 (exported next to the weights on first use)")
+    parser.add_argument("--calibration-dir", action="append",
+                        help="INT8: calibration image folder (default: train/valid images next to the weights)")
+    parser.add_argument("--tile", type=int,
+                        help="Sliced inference for small objects: tile size in pixels (e.g. 640)")
+    parser.add_argument("--tile-overlap", type=float, default=0.2, help="Fraction of a tile shared with its neighbour")
+    parser.add_argument("--no-full-frame", action="store_true",
+                        help="Tiled: skip the extra whole-frame pass that catches large objects")
+    parser.add_argument("--sequential-models", action="store_true",
+                        help="Several weights: run the models one after another instead of concurrently")
+    parser.add_argument("--classes", nargs="+",
+                        help="Only keep these classes (names or ids; 'divers:diver' style with several weights)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Folder: images per forward pass")
+    parser.add_argument("--loaders", type=int, default=DEFAULT_LOADERS, help="Folder: image decode threads")
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ,
+                        help="Letterbox size for folder batches and multi-detector runs")
+    parser.add_argument("--no-images", action="store_true",
+                        help="Folder: only write detections.csv/json, not annotated copies")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Video: decode, infer and encode in one loop instead of overlapping them")
+    parser.add_argument("--queue-size", type=int, default=8, help="Video: frames buffered between stages")
+    parser.add_argument("--drop-oldest", action="store_true",
+                        help="Video: drop the oldest buffered frame instead of waiting when inference falls behind")
+    parser.add_argument("--motion-threshold", type=float,
+                        help="Video: only detect on frames whose mean grey-level change (0-255) "
+                             "since the last detected frame reaches this")
+    parser.add_argument("--stride", type=int, default=0,
+                        help="Video: detect at least every Nth frame (0: no floor); detections carry forward in between")
+    parser.add_argument("--track", action="store_true",
+                        help="Video: track objects across frames and report unique counts")
+    parser.add_argument("--video-encoder", default="auto", choices=["auto", "ffmpeg", "opencv"],
+                        help="Video: ffmpeg streams a browser-ready H.264 MP4 (auto uses it when installed, "
+                             "else OpenCV mp4v)")
+    parser.add_argument("--timings-interval", type=float,
+                        help="Video: also print per-stage timings for every N seconds as a JSON line on stderr "
+                             "(the full-run timings are always in the result's stage_timings)")
+    parser.add_argument("--preview", action="store_true",
+                        help="Video: only detect on --preview-frames evenly spaced frames and write them as one "
+                             "contact sheet JPEG (a fast first look; run again without it for the annotated video)")
+    parser.add_argument("--preview-frames", type=int, default=DEFAULT_PREVIEW_FRAMES,
+                        help="Video: frames sampled for --preview")
+    return parser
+
+
+def print_timings(report) -> None:
+    # stderr, so the last stdout line stays the result the routes parse
+    print(json.dumps(report), file=sys.stderr, flush=True)
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        # Several weights, or a named one, go through the merged multi-detector
+        if len(args.weights) > 1 or ('=' in args.weights[0] and not os.path.exists(args.weights[0])):
+            if args.tile:
+                raise ValueError("--tile works with a single detector")
+            pipeline = MultiDetector(parse_weights(args.weights), conf=args.conf, resolution=args.resolution,
+                                     device=args.device, classes=args.classes, backend=args.backend,
+                                     calibration_dirs=args.calibration_dir,
+                                     imgsz=args.imgsz, concurrent=not args.sequential_models)
+        else:
+            pipeline = DetectionPipeline(args.weights[0], conf=args.conf, resolution=args.resolution,
+                                         device=args.device, classes=args.classes, backend=args.backend,
+                                         calibration_dirs=args.calibration_dir, tile_size=args.tile,
+                                         tile_overlap=args.tile_overlap, tile_full_frame=not args.no_full_frame)
+        folder_options = {"batch_size": args.batch_size, "loaders": args.loaders, "imgsz": args.imgsz,
+                          "save_images": not args.no_images}
+        if args.preview:
+            if (source_type(args.input) if args.media == 'auto' else args.media) != 'video':
+                raise ValueError("--preview works with videos")
+            result = pipeline.preview_video(args.input, args.outdir, args.preview_frames)
+        else:
+            result = pipeline.run(args.input, args.outdir, args.media, folder_options, pipelined=not args.sequential,
+                                  queue_size=args.queue_size, drop_oldest=args.drop_oldest,
+                                  motion_threshold=args.motion_threshold, stride=args.stride, track=args.track,
+                                  timings_interval=args.timings_interval, on_timings=print_timings,
+                                  encoder=args.video_encoder)
+    except Exception as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        return 1
+
+    result["success"] = True
+    result["weights"] = args.weights if len(args.weights) > 1 else args.weights[0]
+    result["model_load_seconds"] = pipeline.load_seconds
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())